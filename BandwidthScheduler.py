@@ -0,0 +1,163 @@
+try:
+    from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestPriorities = QNetworkRequest.Priority
+
+except ImportError:
+    from PyQt5.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestPriorities = QNetworkRequest
+
+from UM.Logger import Logger
+from UM.Signal import Signal, signalemitter
+
+from cura.CuraApplication import CuraApplication
+
+from enum import IntEnum
+from time import monotonic
+
+from typing import Dict, Optional
+
+
+##  The kinds of traffic to an instance, most important first
+class TrafficClass(IntEnum):
+    Command = 0
+    Poll = 1
+    Upload = 2
+    Camera = 3
+
+
+##  A token bucket: allows a number of bytes per second, with bursts of up to a quarter of a second.
+class TokenBucket:
+    MinBurst = 16 * 1024
+
+    def __init__(self) -> None:
+        self._rate = 0  # bytes per second; 0 is unlimited
+        self._tokens = 0.0
+        self._last_refill = monotonic()
+
+    def setRate(self, rate: int) -> None:
+        if rate != self._rate:
+            self._rate = rate
+            self._tokens = min(self._tokens, self._getBurst())
+
+    def getRate(self) -> int:
+        return self._rate
+
+    ##  Take up to size bytes from the bucket
+    #   \return The number of bytes that may be transferred now
+    def take(self, size: int) -> int:
+        if self._rate <= 0:
+            return size
+        self._refill()
+        allowed = min(size, int(self._tokens))
+        self._tokens -= allowed
+        return allowed
+
+    ##  Time until a reasonable amount of bytes may be transferred again, in ms
+    def getDelay(self) -> int:
+        if self._rate <= 0:
+            return 0
+        self._refill()
+        missing = min(self.MinBurst, self._getBurst()) - self._tokens
+        return max(10, int(missing * 1000 / self._rate))
+
+    def _getBurst(self) -> float:
+        return max(self.MinBurst, self._rate / 4)
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self._getBurst(), self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+
+##  Coordinates the traffic to one instance: the control commands, the status polls, G-code uploads and the
+#   camera stream all share the same link.
+#   Requests are prioritized in that order: Qt sends queued requests to a host by priority, and polls are held back
+#   while a command is in flight. Uploads and the camera stream can be capped to a number of KiB/s, and while an
+#   upload is in flight the camera stream is throttled further so it doesn't compete with the upload and the polls.
+#   There is one scheduler per host, so the camera view (which only knows the stream URL) shares it with the device.
+@signalemitter
+class BandwidthScheduler:
+    _instances = {}  # type: Dict[str, BandwidthScheduler]
+
+    _request_priorities = {
+        TrafficClass.Command: QNetworkRequestPriorities.HighPriority,
+        TrafficClass.Poll: QNetworkRequestPriorities.NormalPriority,
+        TrafficClass.Upload: QNetworkRequestPriorities.LowPriority,
+        TrafficClass.Camera: QNetworkRequestPriorities.LowPriority
+    }
+
+    uploadingChanged = Signal()
+
+    def __init__(self, host: str) -> None:
+        self._host = host
+        self._active_counts = {traffic_class: 0 for traffic_class in TrafficClass}  # type: Dict[TrafficClass, int]
+        self._upload_bucket = TokenBucket()
+        self._camera_bucket = TokenBucket()
+
+    @classmethod
+    def getInstance(cls, host: str) -> "BandwidthScheduler":
+        if host not in cls._instances:
+            cls._instances[host] = cls(host)
+        return cls._instances[host]
+
+    def getRequestPriority(self, traffic_class: TrafficClass) -> "QNetworkRequest.Priority":
+        return self._request_priorities[traffic_class]
+
+    ##  Keep track of a request until its reply has finished
+    def track(self, traffic_class: TrafficClass, reply: QNetworkReply) -> None:
+        self._active_counts[traffic_class] += 1
+        if traffic_class == TrafficClass.Upload and self._active_counts[traffic_class] == 1:
+            Logger.log("d", "Upload to %s started, throttling the camera stream", self._host)
+            self.uploadingChanged.emit()
+        reply.finished.connect(lambda: self._onReplyFinished(traffic_class))
+
+    def isUploading(self) -> bool:
+        return self._active_counts[TrafficClass.Upload] > 0
+
+    def hasPendingCommands(self) -> bool:
+        return self._active_counts[TrafficClass.Command] > 0
+
+    def _onReplyFinished(self, traffic_class: TrafficClass) -> None:
+        if self._active_counts[traffic_class] == 0:
+            return
+        self._active_counts[traffic_class] -= 1
+        if traffic_class == TrafficClass.Upload and self._active_counts[traffic_class] == 0:
+            self.uploadingChanged.emit()
+
+    ##  Take bytes from the budget of a kind of traffic. Commands and polls are never limited.
+    #   \return The number of bytes (at most size) that may be transferred now
+    def take(self, traffic_class: TrafficClass, size: int) -> int:
+        bucket = self._getBucket(traffic_class)
+        if bucket is None:
+            return size
+        return bucket.take(size)
+
+    ##  Time until a kind of traffic may continue after take() allowed less than asked for, in ms
+    def getDelay(self, traffic_class: TrafficClass) -> int:
+        bucket = self._getBucket(traffic_class)
+        if bucket is None:
+            return 0
+        return bucket.getDelay()
+
+    def _getBucket(self, traffic_class: TrafficClass) -> Optional[TokenBucket]:
+        preferences = CuraApplication.getInstance().getPreferences()
+        if traffic_class == TrafficClass.Upload:
+            self._upload_bucket.setRate(self._getRate(preferences.getValue("fabWeaver/upload_bandwidth_limit")))
+            return self._upload_bucket
+        if traffic_class == TrafficClass.Camera:
+            rate = self._getRate(preferences.getValue("fabWeaver/camera_bandwidth_limit"))
+            if self.isUploading():
+                upload_rate = self._getRate(preferences.getValue("fabWeaver/camera_bandwidth_limit_while_uploading"))
+                if upload_rate > 0 and (rate <= 0 or upload_rate < rate):
+                    rate = upload_rate
+            self._camera_bucket.setRate(rate)
+            return self._camera_bucket
+        return None
+
+    ##  Limits are set in KiB/s in the preferences
+    @staticmethod
+    def _getRate(limit) -> int:
+        try:
+            return max(0, int(limit)) * 1024
+        except (TypeError, ValueError):
+            return 0
@@ -0,0 +1,112 @@
+from UM.Logger import Logger
+from UM.Signal import Signal, signalemitter
+
+from collections import deque
+import math
+
+from typing import Any, Deque, Dict, Optional
+
+
+##  Keeps track of how well an instance answers: the round trip times of its replies (as an EWMA and as
+#   percentiles of the recent ones), the rate of failed requests and the number of failures in a row.
+#   Whether the connection is healthy changes with hysteresis: it takes several failures in a row to mark it
+#   unhealthy, and several successes in a row to mark it healthy again, so a single slow or lost reply (eg. while
+#   an upload takes the link) doesn't make the state flap.
+#   The timeout of requests follows the round trip times, as TCP does: the smoothed RTT plus four times its
+#   variation, within bounds.
+@signalemitter
+class ConnectionHealth:
+    WindowSize = 256  # replies for the percentiles and the error rate
+    Alpha = 0.125  # weight of a new sample in the smoothed RTT
+    Beta = 0.25  # weight of a new sample in the RTT variation
+
+    FailureThreshold = 3  # failures in a row to become unhealthy
+    RecoveryThreshold = 2  # successes in a row to become healthy again
+
+    DefaultTimeout = 10000  # ms, until round trip times are known
+    MinTimeout = 3000
+    MaxTimeout = 30000
+
+    healthChanged = Signal()
+
+    def __init__(self, device_id: str) -> None:
+        self._device_id = device_id
+        self._round_trip_times = deque(maxlen = self.WindowSize)  # type: Deque[float]
+        self._results = deque(maxlen = self.WindowSize)  # type: Deque[bool]
+        self._smoothed_rtt = None  # type: Optional[float]
+        self._rtt_variation = 0.0
+        self._consecutive_failures = 0
+        self._consecutive_successes = 0
+        self._healthy = True
+
+    ##  A request was answered
+    #   \param round_trip_time From sending the request until the reply had finished, in ms
+    def onSuccess(self, round_trip_time: float) -> None:
+        self._round_trip_times.append(round_trip_time)
+        self._results.append(True)
+        if self._smoothed_rtt is None:
+            self._smoothed_rtt = round_trip_time
+            self._rtt_variation = round_trip_time / 2
+        else:
+            self._rtt_variation = (1 - self.Beta) * self._rtt_variation + self.Beta * abs(self._smoothed_rtt - round_trip_time)
+            self._smoothed_rtt = (1 - self.Alpha) * self._smoothed_rtt + self.Alpha * round_trip_time
+
+        self._consecutive_failures = 0
+        self._consecutive_successes += 1
+        if not self._healthy and self._consecutive_successes >= self.RecoveryThreshold:
+            Logger.log("i", "The connection with %s has recovered", self._device_id)
+            self._healthy = True
+            self.healthChanged.emit()
+
+    ##  A request was not answered: it timed out, or the instance could not be reached
+    def onFailure(self) -> None:
+        self._results.append(False)
+        self._consecutive_successes = 0
+        self._consecutive_failures += 1
+        if self._healthy and self._consecutive_failures >= self.FailureThreshold:
+            Logger.log("w", "%d requests in a row to %s failed", self._consecutive_failures, self._device_id)
+            self._healthy = False
+            self.healthChanged.emit()
+
+    def isHealthy(self) -> bool:
+        return self._healthy
+
+    ##  The timeout for the next request, in ms
+    def getTimeout(self) -> int:
+        if self._smoothed_rtt is None:
+            return self.DefaultTimeout
+        timeout = self._smoothed_rtt + 4 * self._rtt_variation
+        return int(min(self.MaxTimeout, max(self.MinTimeout, timeout)))
+
+    ##  The smoothed round trip time, in ms; 0 while it is not known
+    def getRoundTripTime(self) -> float:
+        return self._smoothed_rtt or 0.0
+
+    ##  A percentile (0-100) of the recent round trip times, in ms; 0 while none are known
+    def getRoundTripTimePercentile(self, percentile: float) -> float:
+        if not self._round_trip_times:
+            return 0.0
+        ordered = sorted(self._round_trip_times)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    ##  The fraction of the recent requests that failed
+    def getErrorRate(self) -> float:
+        if not self._results:
+            return 0.0
+        return self._results.count(False) / len(self._results)
+
+    def getConsecutiveFailures(self) -> int:
+        return self._consecutive_failures
+
+    def getStatistics(self) -> Dict[str, Any]:
+        return {
+            "healthy": self._healthy,
+            "rtt": round(self.getRoundTripTime(), 1),
+            "rtt_p50": round(self.getRoundTripTimePercentile(50), 1),
+            "rtt_p95": round(self.getRoundTripTimePercentile(95), 1),
+            "rtt_p99": round(self.getRoundTripTimePercentile(99), 1),
+            "error_rate": round(self.getErrorRate(), 3),
+            "consecutive_failures": self._consecutive_failures,
+            "timeout": self.getTimeout()
+        }
@@ -105,7 +105,7 @@ class DiscoverFabWeaverAction(MachineAction):
         if key == "":
             key2 = global_container_stack.getMetaDataEntry("fabweaver_id")
             self._network_plugin._instances[key2]._fabWeaver_version = ""
-            self._network_plugin._instances[key2].additionalDataChanged.emit()
+            self._network_plugin._instances[key2].fabWeaverVersionChanged.emit()
 
         if global_container_stack:
             global_container_stack.setMetaDataEntry("fabweaver_id", key)
@@ -126,6 +126,12 @@ class DiscoverFabWeaverAction(MachineAction):
 
     selectedInstanceSettingsChanged = pyqtSignal()
 
+    ##  Send the current job to all of the given instances at once
+    @pyqtSlot("QVariantList")
+    def sendToPrinters(self, keys: List[str]) -> None:
+        if self._network_plugin:
+            self._network_plugin.sendToPrinters([str(key) for key in keys])
+
     @pyqtSlot(str)
     def openWebPage(self, url: str) -> None:
         QDesktopServices.openUrl(QUrl(url))
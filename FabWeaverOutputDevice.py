@@ -10,6 +10,21 @@ from UM.PluginRegistry import PluginRegistry
 from cura.CuraApplication import CuraApplication
 
 from .WebcamsModel import WebcamsModel
+from .GCodeSpool import GCodeSpool, GCodeSpoolReader, GCodeWriteJob, GCodeMeasureJob, GCodeSizeCounter, getActiveGCodeList
+from .ResumableUpload import ResumableUpload
+from .UploadIndex import UploadIndex
+from .PrintQueue import PrintQueue
+from .GCodePreflight import GCodeHeader, findMaterialMismatch
+from .BandwidthScheduler import BandwidthScheduler, TrafficClass
+from .PrinterStatus import PrinterStatus, decodePrinterStatus
+from .PollingScheduler import PollingScheduler
+from .PollingRegistry import PollingRegistry
+from .StatusStream import StatusStream
+from .TelemetryHistory import TelemetryHistory
+from .TelemetryLog import TelemetryLog
+from .ConnectionHealth import ConnectionHealth
+from .NetworkTransport import NetworkTransport
+from .ReplyDecoder import MaxReplySize, decodeJson, getReplyBuffer, isOversized, isSuccessStatus, readReplyText
 
 from cura.PrinterOutput.GenericOutputController import GenericOutputController
 from cura.PrinterOutput.PrinterOutputDevice import ConnectionState
@@ -22,39 +37,40 @@ from cura.PrinterOutput.NetworkedPrinterOutputDevice import NetworkedPrinterOutp
 USE_QT5 = False
 try:
     from PyQt6.QtNetwork import QHttpPart, QNetworkRequest, QNetworkAccessManager
-    from PyQt6.QtNetwork import QNetworkReply, QSslConfiguration, QSslSocket
-    from PyQt6.QtCore import QUrl, QTimer, pyqtSignal, pyqtProperty, pyqtSlot #, QCoreApplication
+    from PyQt6.QtNetwork import QNetworkReply
+    from PyQt6.QtCore import QUrl, QTimer, QIODevice, pyqtSignal, pyqtProperty, pyqtSlot #, QCoreApplication
     from PyQt6.QtGui import QDesktopServices    #, QImage
 
     QNetworkAccessManagerOperations = QNetworkAccessManager.Operation
     QNetworkRequestKnownHeaders = QNetworkRequest.KnownHeaders
     QNetworkRequestAttributes = QNetworkRequest.Attribute
     QNetworkReplyNetworkErrors = QNetworkReply.NetworkError
-    QSslSocketPeerVerifyModes = QSslSocket.PeerVerifyMode
 
 except ImportError:
 
     from PyQt5.QtNetwork import QHttpPart, QNetworkRequest, QNetworkAccessManager
-    from PyQt5.QtNetwork import QNetworkReply, QSslConfiguration, QSslSocket
-    from PyQt5.QtCore import QUrl, QTimer, pyqtSignal, pyqtProperty, pyqtSlot   #, QCoreApplication
+    from PyQt5.QtNetwork import QNetworkReply
+    from PyQt5.QtCore import QUrl, QTimer, QIODevice, pyqtSignal, pyqtProperty, pyqtSlot   #, QCoreApplication
     from PyQt5.QtGui import QDesktopServices
 
     QNetworkAccessManagerOperations = QNetworkAccessManager
     QNetworkRequestKnownHeaders = QNetworkRequest
     QNetworkRequestAttributes = QNetworkRequest
     QNetworkReplyNetworkErrors = QNetworkReply
-    QSslSocketPeerVerifyModes = QSslSocket
 
     USE_QT5 = True
 
+import hashlib
 import json
 import os.path
-from time import time
+import shutil
+import tempfile
+from time import monotonic, time
 import base64
 from io import StringIO, BytesIO
 from enum import IntEnum
 
-from typing import cast, Any, Callable, Dict, List, Optional, Union, TYPE_CHECKING
+from typing import cast, Any, Callable, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 if TYPE_CHECKING:
     from UM.Scene.SceneNode import SceneNode  # For typing.
     from UM.FileHandler.FileHandler import FileHandler  # For typing.
@@ -83,6 +99,8 @@ class UnifiedConnectionState(IntEnum):
 
 @signalemitter
 class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
+    MaxPollAge = 30  # s after which a poll that is still in flight is abandoned for a new one
+
     def __init__(self, instance_id: str, address: str, port: int, properties: dict, **kwargs) -> None:
         super().__init__(device_id=instance_id, address=address, properties=properties, **kwargs)
 
@@ -100,6 +118,15 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         self._fabWeaver_version = self._properties.get(b"version", b"").decode("utf-8")
 
         self._gcode_stream = StringIO()  # type: Union[StringIO, BytesIO]
+        self._gcode_spool = None  # type: Optional[GCodeSpool]
+
+        # G-code is serialized in a background job, see _startGCodeJob
+        self._gcode_job = None  # type: Optional[GCodeWriteJob]
+        self._gcode_job_chunk_count = 0
+        self._gcode_progress_timer = QTimer()
+        self._gcode_progress_timer.setInterval(250)
+        self._gcode_progress_timer.setSingleShot(False)
+        self._gcode_progress_timer.timeout.connect(self._onGCodeProgressTimer)
 
         # We start with a single extruder, but update this when we get data from fabWeaver
         self._number_of_extruders_set = True  # False
@@ -140,6 +167,12 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             self._basic_auth_data = ("basic %s" % data).encode()
             self._basic_auth_string = "%s:%s" % (basic_auth_username, basic_auth_password)
 
+        # The network manager is shared with the other instances, see _createNetworkManager
+        self._transport = NetworkTransport.getInstance()
+        # What all requests share, built once; see _createEmptyRequest
+        self._request_prototype = None  # type: Optional[QNetworkRequest]
+        self._api_urls = {}  # type: Dict[str, QUrl]
+
         # In Cura 4.x, the monitor item shows the camera stream as well as the monitor sidebar
         qml_folder = "qml_qt6" if not USE_QT5 else "qml_qt5"
         self._monitor_view_qml_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), qml_folder, "FabWeaverMonitor.qml")
@@ -152,17 +185,49 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         self.setConnectionText(i18n_catalog.i18nc("@info:status", "Connected to fabWeaver on {0}").format(self._id))
 
         self._post_gcode_reply = None
+        self._resumable_upload = None  # type: Optional[ResumableUpload]
+        self._upload_headers = {}  # type: Dict[str, str]
+
+        # G-code that is already stored on the instance is not uploaded again
+        self._upload_index = UploadIndex(self._id)
+        self._upload_digest = ""
+
+        # Jobs that are sent while the printer is busy wait in the print queue, see _processPrintQueue
+        self._print_queue = PrintQueue(self._id)
+        self._queue_file_name = ""
+        self._queue_spool = None  # type: Optional[GCodeSpool]  # that a job is being written into, see _queueGCode
+        self._print_after_upload = True  # False while a queued job is uploaded ahead of time
+
+        # Upload of G-code that is sent to several instances at once, see MultiPrinterDispatch
+        self._shared_upload_reader = None  # type: Optional[GCodeSpoolReader]
+        self._on_shared_upload_finished = None  # type: Optional[Callable[[bool, str], None]]
+
+        # Content encodings the instance accepts for uploads; None until it tells us (see _getUploadContentEncoding)
+        self._accepted_content_encodings = None  # type: Optional[List[str]]
+        self._upload_content_encoding = None  # type: Optional[str]
 
         self._progress_message = None  # type: Optional[Message]
         self._error_message = None  # type: Optional[Message]
 
-        # TODO; Add preference for update intervals
-        self._update_fast_interval = 2000
-        self._update_slow_interval = 10000
         self._update_timer = QTimer()
-        self._update_timer.setInterval(self._update_fast_interval)
         self._update_timer.setSingleShot(False)
         self._update_timer.timeout.connect(self._update)
+        # Sets the interval of the update timer from the state of the printer
+        self._polling_scheduler = PollingScheduler(self._id, self._update_timer)
+        self._update_timer.setInterval(self._polling_scheduler.getCurrentInterval())
+        # The status pushed by the instance, if it can; /printer is only polled while this is not live
+        self._status_stream = StatusStream(self, self._onStatusStreamData)
+
+        # Round trip times and failures of requests; decides whether the connection is in error
+        self._connection_health = ConnectionHealth(self._id)
+        self._connection_health.healthChanged.connect(self._onConnectionHealthChanged)
+        self._last_connection_stats_time = 0.0
+        self._last_command = ""
+        self._last_command_latency = 0.0
+
+        # Shared with the camera stream of this instance
+        self._bandwidth_scheduler = BandwidthScheduler.getInstance(self._address)
+        self._poll_deferred = False
 
         self._webcams_model = WebcamsModel(self._protocol, self._address, self.port, self._basic_auth_string)
 
@@ -171,10 +236,32 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         self._output_controller.can_pre_heat_hotends = False
         self._output_controller.can_pre_heat_bed = False
         
-        self._polling_end_points = ["printer"]
+        # The endpoints that are polled, each with its own interval, priority and decoder. Everything about the
+        # printer, its spools included, comes from /printer, which is polled on every tick of the update timer.
+        self._polling_registry = PollingRegistry()
+        self._polling_registry.register("printer", self._onRequestFinished)
+        # Every poll and every pushed status gets the next sequence number; replies older than what was applied
+        # are discarded
+        self._poll_sequence = 0
+        # Callbacks waiting for a status newer than a sequence number, see requestFreshStatus
+        self._status_waiters = []  # type: List[Tuple[int, Callable[[Optional[PrinterStatus]], None]]]
+        self._write_pending = False
 
         self._printer_available = False
         self._spoolData =  None
+        self._loaded_spools = []  # type: List[Optional[Dict[str, Any]]]  # per nozzle, for the pre-flight check of jobs
+
+        # The previous /printer reply, to only push what changed into the models (see _applyPrinterStatus)
+        self._last_status = None  # type: Optional[PrinterStatus]
+        # Validators (as request headers) and a hash of the last /printer reply, to skip replies that didn't change
+        self._status_validators = {}  # type: Dict[bytes, bytes]
+        self._status_digest = b""
+        self._status_signal_counts = {"polls": 0, "idle_polls": 0, "last_poll": 0, "total": 0}
+        # Temperatures and progress of every status received, for diagnostics of long prints. Its buffers are
+        # allocated with the first sample, so devices that never connect don't take the memory.
+        self._telemetry_history = None  # type: Optional[TelemetryHistory]
+        # ... and on disk, if the preference fabWeaver/telemetry_log is set (see connect)
+        self._telemetry_log = None  # type: Optional[TelemetryLog]
         self._openSpool = False
         self._chamberCurrent = 0
         self._chamberTarget = 0
@@ -202,18 +289,31 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
     def name(self) -> str:
         return self._name
 
-    additionalDataChanged = pyqtSignal()
+    # Every property has its own notify signal, so a change doesn't re-evaluate the bindings of all of them
+    fabWeaverVersionChanged = pyqtSignal()
+    printerNameChanged = pyqtSignal()
+    printerModelChanged = pyqtSignal()
+    addressChanged = pyqtSignal()
+    spoolDataChanged = pyqtSignal()
+    chamberCurrentChanged = pyqtSignal()
+    chamberTargetChanged = pyqtSignal()
+    isOpenSpoolChanged = pyqtSignal()
+    connectionHealthChanged = pyqtSignal()
+    connectionStatsChanged = pyqtSignal()
+    commandLatencyChanged = pyqtSignal()
+
+    ConnectionStatsInterval = 5  # s; the statistics change with every reply, but don't need to be shown that often
 
     ##  Version (as returned from the zeroConf properties or from /api/version)
-    @pyqtProperty(str, notify=additionalDataChanged)
+    @pyqtProperty(str, notify=fabWeaverVersionChanged)
     def fabWeaverVersion(self) -> str:
         return self._fabWeaver_version
 
-    @pyqtProperty(str, notify=additionalDataChanged)
+    @pyqtProperty(str, notify=printerNameChanged)
     def printerName(self) -> str:
         return self._printer_name
 
-    @pyqtProperty(str, notify=additionalDataChanged)
+    @pyqtProperty(str, notify=printerModelChanged)
     def printerModel(self) -> str:
         return self._printer_model
 
@@ -223,7 +323,7 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         return self._address
 
     ## IPadress of this instance
-    @pyqtProperty(str, notify=additionalDataChanged)
+    @pyqtProperty(str, notify=addressChanged)
     def address(self) -> str:
         return self._address
 
@@ -247,27 +347,155 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         return self._webcams_model
 
     def _update(self) -> None:
-        for end_point in self._polling_end_points:
-            self.get(end_point, self._onRequestFinished)
+        if self._bandwidth_scheduler.hasPendingCommands() and not self._poll_deferred:
+            # Let the command go first; its reply changes the status anyway. Polls are held back once at most.
+            self._poll_deferred = True
+            return
+        self._poll_deferred = False
+
+        for polled_end_point in self._polling_registry.getDueEndPoints():
+            if polled_end_point.end_point == "printer" and self._status_stream.isLive():
+                continue
+            self._poll(polled_end_point.end_point)
+
+    ##  Poll an endpoint, unless a poll of it is still in flight; then that one is waited for instead.
+    #   A poll that hangs for too long is abandoned, so the endpoint doesn't get stuck on it.
+    #   \return The sequence number of the poll in flight
+    def _poll(self, end_point: str) -> int:
+        polled_end_point = self._polling_registry.get(end_point)
+        if polled_end_point is None:
+            return 0
+        if polled_end_point.reply is not None:
+            if monotonic() - polled_end_point.sent_time < self.MaxPollAge:
+                polled_end_point.joined_count += 1
+                return polled_end_point.sequence
+            Logger.log("d", "Poll of %s on %s hangs, polling again", end_point, self._id)
+            reply = polled_end_point.reply
+            polled_end_point.onAbandoned()
+            reply.abort()
+
+        self._poll_sequence += 1
+        sequence = self._poll_sequence
+        reply = self.get(end_point, None, priority = polled_end_point.priority)
+        if reply is None:
+            return sequence
+        polled_end_point.onSent(reply, sequence)
+        reply.downloadProgress.connect(lambda bytes_received, _: self._onPollProgress(end_point, reply, bytes_received))
+        reply.finished.connect(lambda: self._onPollFinished(end_point, sequence, reply))
+        return sequence
+
+    ##  Abort a poll whose reply is larger than any reply should be, before it is buffered in full
+    def _onPollProgress(self, end_point: str, reply: QNetworkReply, bytes_received: int) -> None:
+        if reply.isRunning() and isOversized(reply, bytes_received):
+            Logger.log("w", "The reply of %s on %s is too large, aborting it", end_point, self._id)
+            reply.abort()
+
+    def _onPollFinished(self, end_point: str, sequence: int, reply: QNetworkReply) -> None:
+        polled_end_point = self._polling_registry.get(end_point)
+        if polled_end_point is None or polled_end_point.reply is not reply:
+            return  # abandoned for a newer poll, or not polled anymore
+        polled_end_point.onFinished(reply.error() == QNetworkReplyNetworkErrors.NoError)
+
+        if sequence <= polled_end_point.applied_sequence:
+            Logger.log("d", "Discarding a reply of %s that is older than the status already known", end_point)
+            polled_end_point.discarded_count += 1
+            return
+        polled_end_point.applied_sequence = sequence
+        polled_end_point.decoder(reply)
+
+        if end_point == "printer":
+            # Whoever waited for this poll and didn't get a status from it, gets none
+            self._resolveStatusWaiters(sequence, None)
+
+    ##  Call back with the status of the printer once it is known to be current: from a /printer poll that is sent
+    #   now (or joined, if one is in flight already), or pushed by the status stream after this call.
+    #   The callback gets None if the printer could not be reached.
+    def requestFreshStatus(self, callback: Callable[[Optional[PrinterStatus]], None]) -> None:
+        if self._connection_state == UnifiedConnectionState.Closed:
+            callback(None)
+            return
+        sequence = self._poll("printer")
+        if sequence > self._getAppliedStatusSequence() and not self._polling_registry.get("printer").isInFlight():
+            callback(None)  # the poll could not be sent
+            return
+        self._status_waiters.append((sequence, callback))
+
+    def _getAppliedStatusSequence(self) -> int:
+        return self._polling_registry.get("printer").applied_sequence
+
+    ##  The request counts and latencies (in ms) of every polled endpoint, by endpoint
+    def getPollingStatistics(self) -> Dict[str, Dict[str, Any]]:
+        return self._polling_registry.getStatistics()
+
+    def _resolveStatusWaiters(self, sequence: int, status: Optional[PrinterStatus]) -> None:
+        ready = [callback for waiting_for, callback in self._status_waiters if waiting_for <= sequence]
+        if not ready:
+            return
+        self._status_waiters = [waiter for waiter in self._status_waiters if waiter[0] > sequence]
+        for callback in ready:
+            callback(status)
 
-    @pyqtProperty("QVariant", notify=additionalDataChanged)
+    @pyqtProperty("QVariant", notify=spoolDataChanged)
     def spoolData(self):
         return self._spoolData
 
-    @pyqtProperty(int, notify=additionalDataChanged)
+    @pyqtProperty(int, notify=chamberCurrentChanged)
     def chamberCurrent(self) -> int:
         return self._chamberCurrent
 
-    @pyqtProperty(int, notify=additionalDataChanged)
+    @pyqtProperty(int, notify=chamberTargetChanged)
     def chamberTarget(self) -> int:
         return self._chamberTarget
 
-    @pyqtProperty(bool, notify=additionalDataChanged)
+    @pyqtProperty(bool, notify=isOpenSpoolChanged)
     def isOpenSpool(self) -> bool:
         return self._openSpool
 
+    @pyqtProperty(bool, notify=connectionHealthChanged)
+    def connectionHealthy(self) -> bool:
+        return self._connection_health.isHealthy()
+
+    ##  Smoothed round trip time of requests, in ms
+    @pyqtProperty(float, notify=connectionStatsChanged)
+    def roundTripTime(self) -> float:
+        return self._connection_health.getRoundTripTime()
+
+    @pyqtProperty(float, notify=connectionStatsChanged)
+    def roundTripTimeP95(self) -> float:
+        return self._connection_health.getRoundTripTimePercentile(95)
+
+    ##  Fraction of the recent requests that failed
+    @pyqtProperty(float, notify=connectionStatsChanged)
+    def errorRate(self) -> float:
+        return self._connection_health.getErrorRate()
+
+    ##  The last job command the instance acknowledged, and how long that took in ms (0 if none was sent yet)
+    @pyqtProperty(str, notify=commandLatencyChanged)
+    def lastCommand(self) -> str:
+        return self._last_command
+
+    @pyqtProperty(float, notify=commandLatencyChanged)
+    def lastCommandLatency(self) -> float:
+        return self._last_command_latency
+
+    ##  All statistics of the connection: round trip time and its percentiles, error rate, failures in a row and
+    #   the current request timeout
+    @pyqtProperty("QVariantMap", notify=connectionStatsChanged)
+    def connectionStats(self) -> Dict[str, Any]:
+        return self._connection_health.getStatistics()
+
     def close(self) -> None:
         self._update_timer.stop()
+        self._status_stream.stop()
+        for polled_end_point in self._polling_registry.getEndPoints():
+            reply = polled_end_point.reply
+            if reply is not None:
+                polled_end_point.reply = None
+                reply.abort()
+        self._resolveStatusWaiters(self._poll_sequence, None)
+        if self._telemetry_log is not None:
+            self._telemetry_log.close()
+            self._telemetry_log = None
 
         self.setConnectionState(cast(ConnectionState, UnifiedConnectionState.Closed))
         if self._progress_message:
@@ -277,19 +505,32 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             self._error_message.hide()
             self._error_message = None  # type: Optional[Message]
 
-        self._polling_end_points = [point for point in self._polling_end_points if not point.startswith("files/")]
+        if not self._isUploading():
+            self._cancelGCodeJob()
+            self._releaseGCodeSpool()
+
+        for polled_end_point in self._polling_registry.getEndPoints():
+            if polled_end_point.end_point.startswith("files/"):
+                self._polling_registry.unregister(polled_end_point.end_point)
 
     ##  Start requesting data from the instance
     def connect(self) -> None:
         self._createNetworkManager()
+        self._request_prototype = None  # pick up changed transport preferences
+        self._transport.warmUpCommandConnection(self._protocol, self._address, self._port)
 
         self.setConnectionState(cast(ConnectionState, UnifiedConnectionState.Connecting))
         self._update()  # Manually trigger the first update, as we don't want to wait a few secs before it starts.
 
         Logger.log("d", "Connection with instance %s with url %s started", self._id, self._base_url)
         self._update_timer.start()
+        if CuraApplication.getInstance().getPreferences().getValue("fabWeaver/status_stream"):
+            self._status_stream.start()
+        if CuraApplication.getInstance().getPreferences().getValue("fabWeaver/telemetry_log") and self._telemetry_log is None:
+            self._telemetry_log = TelemetryLog(self._id)
 
         self._last_response_time = None  # type: Optional[float]
+        self._forgetPrinterStatus()
         self._setAcceptsCommands(False)
         self.setConnectionText(i18n_catalog.i18nc("@info:status", "Connecting to fabWeaver on {0}").format(self._id))
 
@@ -329,13 +570,6 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         # Make sure post-processing plugin are run on the gcode
         self.writeStarted.emit(self)
 
-        gcode_writer = cast(MeshWriter, PluginRegistry.getInstance().getPluginObject("GCodeWriter"))
-        self._gcode_stream = StringIO()
-
-        if not gcode_writer.write(self._gcode_stream, None):
-            Logger.log("e", "GCodeWrite failed: %s" % gcode_writer.getInformation())
-            return
-
         if self._error_message:
             self._error_message.hide()
             self._error_message = None  # type: Optional[Message]
@@ -344,18 +578,50 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             self._progress_message.hide()
             self._progress_message = None  # type: Optional[Message]
 
-        error_string = ""
         if self.activePrinter.state not in ["idle", ""]:
-            Logger.log("d", "Tried starting a print, but current state is %s" % self.activePrinter.state)
-            if self.activePrinter.state == "offline":
-                error_string = i18n_catalog.i18nc("@info:status", "The printer is offline. Unable to start a new job.")
-            else:
-                error_string = i18n_catalog.i18nc("@info:status", "fabWeaver is busy. Unable to start a new job.")
-        else:
-            self._update() # check current _printer_available
-            if not self._printer_available:
-                Logger.log("d", "Tried starting a print, but current printer is not available")
-                error_string = i18n_catalog.i18nc("@info:status", "is not available. Unable to start a new job.")
+            self._startWrite(self._getWriteError(self.activePrinter.state))
+            return
+
+        if self._write_pending:
+            return  # already waiting for the status of the printer
+        # The printer may have been taken since the last poll; decide on its current status
+        self._write_pending = True
+        self.requestFreshStatus(self._onFreshStatusForWrite)
+
+    def _onFreshStatusForWrite(self, status: Optional[PrinterStatus]) -> None:
+        self._write_pending = False
+        self._startWrite(self.getWriteError(status))
+
+    ##  Why a new job can't be printed now, judged on a fresh status (see requestFreshStatus)
+    #   \return An error string, or an empty string if the printer can take the job
+    def getWriteError(self, status: Optional[PrinterStatus]) -> str:
+        if status is None:
+            return self._getWriteError("offline")
+        if status.printer_state not in ["idle", ""]:
+            return self._getWriteError(status.printer_state)
+        if not self._printer_available:
+            Logger.log("d", "Tried starting a print, but current printer is not available")
+            return i18n_catalog.i18nc("@info:status", "is not available. Unable to start a new job.")
+        return ""
+
+    ##  Whether a new job goes into the print queue instead of being sent now
+    #   \param error_string Why the job can't be printed now, see getWriteError
+    def shouldQueueJob(self, error_string: str) -> bool:
+        return bool(CuraApplication.getInstance().getPreferences().getValue("fabWeaver/queue_jobs")) and \
+            bool(error_string or not self._print_queue.isEmpty() or self._isUploading())
+
+    def _getWriteError(self, printer_state: str) -> str:
+        Logger.log("d", "Tried starting a print, but current state is %s" % printer_state)
+        if printer_state == "offline":
+            return i18n_catalog.i18nc("@info:status", "The printer is offline. Unable to start a new job.")
+        return i18n_catalog.i18nc("@info:status", "fabWeaver is busy. Unable to start a new job.")
+
+    ##  Send the G-code, queue it if the printer can't take it now, or show why it can't be sent
+    def _startWrite(self, error_string: str) -> None:
+        if self.shouldQueueJob(error_string):
+            # The job can't be printed right now; it is sent as soon as the printer is available
+            self._queueGCode()
+            return
 
         if error_string:
             if self._error_message:
@@ -364,23 +630,244 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             self._error_message.show()
             return
 
-        self._sendPrintJob()
+        self._writeGCode(self._getUploadContentEncoding())
 
-    def _sendPrintJob(self) -> None:
-        global_container_stack = CuraApplication.getInstance().getGlobalContainerStack()
-        if not global_container_stack:
+    ##  Write the G-code into the print queue in a background job
+    def _queueGCode(self) -> None:
+        if self._gcode_job is not None:
+            # Only one job is written at a time; the one that is being written may be streamed to the printer already
+            self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Still preparing the previous job. Please try again in a moment."))
+            return
+        self._queue_file_name = self._getJobFileName()
+        try:
+            spool = GCodeSpool(directory = self._print_queue.getDirectory())
+        except OSError:
+            Logger.logException("e", "Could not create a spool file in the print queue")
+            self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Unable to add the job to the fabWeaver print queue."))
             return
 
-        CuraApplication.getInstance().getController().setActiveStage("MonitorStage")
-        # cancel any ongoing preheat timer before starting a print
+        self._showProgressMessage(i18n_catalog.i18nc("@info:status", "Adding the job to the fabWeaver print queue"))
+        self._queue_spool = spool
+        self._startGCodeJob(spool, self._onGCodeQueued)
+
+    ##  Whether a job is being written into the print queue
+    def _isQueueingGCode(self) -> bool:
+        return self._gcode_job is not None and self._gcode_job.getStream() is self._queue_spool
+
+    def _onGCodeQueued(self, job: GCodeWriteJob) -> None:
+        spool = cast(GCodeSpool, job.getStream())
+        if spool is self._queue_spool:
+            self._queue_spool = None
+        if not self._finishGCodeJob(job):
+            spool.remove()
+            return
+
+        self._print_queue.add(self._queue_file_name, spool.getPath(), spool.getDigest(), spool.getHeader().toDict())
+        if self._progress_message:
+            self._progress_message.hide()
+            self._progress_message = None  # type:Optional[Message]
+        Message(
+            i18n_catalog.i18nc("@info:status", "{0} was added to the print queue of fabWeaver on {1}. Jobs waiting: {2}").format(
+                self._queue_file_name, self._id, self._print_queue.getJobCount()),
+            title=i18n_catalog.i18nc("@label", "fabWeaver")
+        ).show()
+
+    ##  Send the next queued job once the printer is ready, or upload it ahead of time while the printer is busy
+    def _processPrintQueue(self, printer_state: str) -> None:
+        if self._print_queue.isEmpty() or self._isUploading() or self._gcode_job is not None:
+            return
+
+        if printer_state == "idle" and self._printer_available:
+            self._dispatchQueuedJob()
+        elif printer_state == "printing" and CuraApplication.getInstance().getPreferences().getValue("fabWeaver/pre_upload_queued_jobs"):
+            self._preUploadQueuedJob()
+
+    def _dispatchQueuedJob(self) -> None:
+        job = self._print_queue.pop()
+        if job is None:
+            return
+
+        # The materials may have changed since the job was queued; check them against the current status
+        error_string = self.findMaterialMismatch(GCodeHeader.fromDict(job.get("header")))
+        if error_string:
+            try:
+                os.remove(job["spool"])
+            except OSError:
+                Logger.logException("w", "Could not remove the G-code of queued job %s", job["file_name"])
+            self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Queued job {0} was not sent: {1}").format(job["file_name"], error_string))
+            return
+
+        self._releaseGCodeSpool()
         try:
-            self._printers[0].stopPreheatTimers()
-        except AttributeError:
-            # stopPreheatTimers was added after Cura 3.3 beta
-            pass
+            self._gcode_spool = GCodeSpool(path = job["spool"])
+        except OSError:
+            Logger.logException("e", "The G-code of queued job %s is gone", job["file_name"])
+            return
+
+        Logger.log("i", "Sending queued job %s to fabWeaver on %s", job["file_name"], self._id)
+        self._upload_content_encoding = None
+        self._upload_digest = job["digest"]
+        self._print_after_upload = True
+        if job["uploaded"]:
+            self._printStoredGCode(job["file_name"])
+            return
+
+        self._file_name = job["file_name"]
+        self._showProgressMessage(i18n_catalog.i18nc("@info:status", "Sending queued job {0} to fabWeaver").format(self._file_name))
+        self._uploadGCode()
+
+    ##  Upload the next queued job while the printer is still busy, so only the print command is left when it is ready.
+    #   If the instance refuses the upload (eg. because it does not have the storage for it), the job is
+    #   uploaded when the printer is ready instead.
+    def _preUploadQueuedJob(self) -> None:
+        job = self._print_queue.peek()
+        if job is None or job["uploaded"] or job["upload_failed"]:
+            return
+        active_print_job = self.activePrinter.activePrintJob if self.activePrinter else None
+        if active_print_job and active_print_job.name == job["file_name"]:
+            return  # don't overwrite the file that is being printed
+        if self.findMaterialMismatch(GCodeHeader.fromDict(job.get("header"))):
+            # The material may still be changed before the printer is ready; it is checked again then
+            self._print_queue.setUploaded(job["spool"], False)
+            return
+
+        try:
+            spool = GCodeSpool(path = job["spool"], owned = False)  # the file stays in the queue
+        except OSError:
+            Logger.logException("e", "The G-code of queued job %s is gone", job["file_name"])
+            return
+
+        Logger.log("i", "Uploading queued job %s to fabWeaver on %s ahead of time", job["file_name"], self._id)
+        self._releaseGCodeSpool()
+        self._gcode_spool = spool
+        self._file_name = job["file_name"]
+        self._upload_content_encoding = None
+        self._upload_digest = job["digest"]
+        self._print_after_upload = False
+        self._uploadGCode()
+
+    ##  Write the G-code to a spool file in a background job and upload it.
+    #   Uncompressed G-code is uploaded while it is being written. Compressed G-code is uploaded once it is
+    #   complete, because its size is not known in advance.
+    def _writeGCode(self, content_encoding: Optional[str] = None) -> None:
+        if self._isQueueingGCode():
+            # Only one job is written at a time, and the one for the print queue must not be dropped
+            self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Still preparing the previous job. Please try again in a moment."))
+            return
+        self._cancelGCodeJob()
+        self._releaseGCodeSpool()
+        self._gcode_stream = StringIO()
+        self._upload_content_encoding = content_encoding
+        self._print_after_upload = True
+
+        self._showProgressMessage(i18n_catalog.i18nc("@info:status", "Preparing data for fabWeaver"))
+
+        # Measure the G-code first, from the chunks of the backend (see GCodeMeasureJob). The size allows the upload
+        # to be started with a fixed Content-Length while the G-code is still being written to the spool by a
+        # background job. Only if uploads of G-code the instance already has are skipped, the G-code is hashed too,
+        # to tell whether it has.
+        skip_duplicate_uploads = CuraApplication.getInstance().getPreferences().getValue("fabWeaver/skip_duplicate_uploads")
+        self._startGCodeJob(GCodeSizeCounter(digest = bool(skip_duplicate_uploads)), self._onGCodeMeasured)
+
+    def _onGCodeMeasured(self, job: GCodeWriteJob) -> None:
+        if not self._finishGCodeJob(job):
+            return
+
+        size_counter = cast(GCodeSizeCounter, job.getStream())
+        self._upload_digest = size_counter.getDigest()
+
+        # Reject a job the printer would refuse anyway, before uploading all of it
+        error_string = self.findMaterialMismatch(size_counter.getHeader())
+        if error_string:
+            if self._progress_message:
+                self._progress_message.hide()
+                self._progress_message = None  # type:Optional[Message]
+            self._showErrorMessage(error_string)
+            return
+
+        if CuraApplication.getInstance().getPreferences().getValue("fabWeaver/skip_duplicate_uploads"):
+            stored_file_name = self._upload_index.getFileName(self._upload_digest)
+            if stored_file_name is not None:
+                CuraApplication.getInstance().getController().setActiveStage("MonitorStage")
+                self._printStoredGCode(stored_file_name)
+                return
+
+        # Spool the G-code to disk so large jobs don't have to be held in memory while uploading.
+        # If no temporary file can be created, fall back to rendering the G-code in memory.
+        try:
+            self._gcode_spool = GCodeSpool(content_encoding = self._upload_content_encoding)
+        except OSError:
+            Logger.logException("w", "Could not create a spool file for the G-code, keeping it in memory instead")
+            self._upload_content_encoding = None
+            self._startGCodeJob(self._gcode_stream, self._onGCodeWrittenToMemory)
+            return
+
+        if self._upload_content_encoding is None:
+            self._gcode_spool.setExpectedSize(size_counter.getSize())
+
+        self._startGCodeJob(self._gcode_spool, self._onGCodeSpoolJobFinished)
+
+        if self._upload_content_encoding is None:
+            self._sendPrintJob()
+
+    def _onGCodeWrittenToMemory(self, job: GCodeWriteJob) -> None:
+        if self._finishGCodeJob(job):
+            self._sendPrintJob()
+
+    ##  Serialize the G-code into stream in a background job; on_finished is called on the main thread
+    def _startGCodeJob(self, stream: Union[GCodeSpool, GCodeSizeCounter, StringIO], on_finished: Callable[[GCodeWriteJob], None]) -> None:
+        gcode_writer = cast(MeshWriter, PluginRegistry.getInstance().getPluginObject("GCodeWriter"))
+        if isinstance(stream, GCodeSizeCounter):
+            self._gcode_job = GCodeMeasureJob(gcode_writer, stream)  # type: GCodeWriteJob
+        else:
+            self._gcode_job = GCodeWriteJob(gcode_writer, stream)
+        self._gcode_job.finished.connect(on_finished)
+        self._gcode_job.start()
+        self._gcode_job_chunk_count = self._getGCodeChunkCount()
+        self._gcode_progress_timer.start()
+
+    ##  Bookkeeping for a finished GCodeWriteJob
+    #   \return Whether the job succeeded and is still relevant
+    def _finishGCodeJob(self, job: GCodeWriteJob) -> bool:
+        if job is not self._gcode_job or job.isCancelled():
+            return False  # cancelled in the meantime
+        self._gcode_job = None
+        self._gcode_progress_timer.stop()
+
+        if not job.getResult():
+            Logger.log("e", "GCodeWrite failed: %s" % job.getWriter().getInformation())
+            if job.getStream() is self._gcode_spool:
+                self._abortUpload()
+                self._releaseGCodeSpool()
+            if self._progress_message:
+                self._progress_message.hide()
+                self._progress_message = None  # type:Optional[Message]
+            self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver."))
+            return False
+        return True
+
+    def _cancelGCodeJob(self) -> None:
+        if self._gcode_job is not None:
+            self._gcode_job.cancel()
+            self._gcode_job = None
+        self._gcode_progress_timer.stop()
+
+    ##  Number of chunks GCodeWriter will write for the active build plate (see GCodeWriter.write)
+    def _getGCodeChunkCount(self) -> int:
+        return len(getActiveGCodeList() or [])
+
+    def _onGCodeProgressTimer(self) -> None:
+        if self._gcode_job is None or not self._progress_message or self._isUploading() or self._gcode_job_chunk_count <= 0:
+            return  # while uploading, the upload progress is shown instead
+        progress = min(99, self._gcode_job.getWriteCount() * 100 / self._gcode_job_chunk_count)
+        self._progress_message.setProgress(progress)
+
+    def _showProgressMessage(self, text: str) -> None:
+        if self._progress_message:
+            self._progress_message.hide()
 
         self._progress_message = Message(
-            i18n_catalog.i18nc("@info:status", "Sending data to fabWeaver"),
+            text,
             title=i18n_catalog.i18nc("@label", "fabWeaver"),
             progress=-1, lifetime=0, dismissable=False, use_inactivity_timer=False
         )
@@ -392,40 +879,316 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         self._progress_message.actionTriggered.connect(self._cancelSendGcode)
         self._progress_message.show()
 
+    ##  The instance already has this G-code stored; start printing it without uploading it again
+    def _printStoredGCode(self, file_name: str) -> None:
+        Logger.log("i", "fabWeaver on %s already has this G-code stored as %s, skipping the upload", self._id, file_name)
+        if self._progress_message:
+            self._progress_message.hide()
+            self._progress_message = None  # type:Optional[Message]
+        try:
+            self._printers[0].stopPreheatTimers()
+        except AttributeError:
+            # stopPreheatTimers was added after Cura 3.3 beta
+            pass
+
+        self._file_name = file_name
+        # Registered like any other callback, so it replaces the one an earlier print command of this file left
+        reply = self.patch("resources/" + self._file_name + "?action=print", "", on_finished=self._onStoredGCodePrintFinished)
+        if reply is None:
+            self._releaseGCodeSpool()
+            return
+        # Replies without an HTTP status are not handed to the callback
+        reply.finished.connect(lambda: self._onStoredGCodePrintFailed(reply))
+
+    def _onStoredGCodePrintFailed(self, reply: QNetworkReply) -> None:
+        if reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute) is not None:
+            return  # handled by _onStoredGCodePrintFinished
+        Logger.log("e", "Could not start printing %s on fabWeaver on %s: %s", self._file_name, self._id, reply.errorString())
+        self._releaseGCodeSpool()
+        self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver: {0}").format(reply.errorString()))
+
+    def _onStoredGCodePrintFinished(self, reply: QNetworkReply) -> None:
+        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+        if http_status_code == 404:
+            # The file has been removed from the instance in the meantime
+            Logger.log("w", "fabWeaver on %s no longer has %s, uploading the G-code again", self._id, self._file_name)
+            self._upload_index.remove(self._upload_digest)
+            if self._gcode_spool is not None:
+                # A queued job, which still has its G-code spooled
+                self._showProgressMessage(i18n_catalog.i18nc("@info:status", "Sending data to fabWeaver"))
+                self._uploadGCode()
+            else:
+                self._writeGCode(self._getUploadContentEncoding())
+            return
+
+        self._releaseGCodeSpool()
+        self._onRequestFinished(reply)
+
+    ##  Pick the content encoding for the next upload, if compressed uploads are enabled in the preferences.
+    #   If the instance did not tell which encodings it accepts, gzip is tried; a 415 reply makes us fall back to
+    #   uncompressed uploads for this instance.
+    def _getUploadContentEncoding(self) -> Optional[str]:
+        if not CuraApplication.getInstance().getPreferences().getValue("fabWeaver/compress_uploads"):
+            return None
+        if self._accepted_content_encodings is None:
+            return "gzip"
+        for content_encoding in GCodeSpool.ContentEncodings:
+            if content_encoding in self._accepted_content_encodings:
+                return content_encoding
+        return None
+
+    ##  Parse an Accept-Encoding header sent by the instance
+    def _setAcceptedContentEncodings(self, header: str) -> None:
+        content_encodings = []  # type: List[str]
+        for item in header.split(","):
+            name, _, parameters = item.strip().lower().partition(";")
+            if parameters.replace(" ", "") in ["q=0", "q=0.0"]:
+                continue
+            content_encodings.append(name.strip())
+        self._accepted_content_encodings = content_encodings
+
+    ##  Called on the main thread when the G-code has been written to the spool
+    def _onGCodeSpoolJobFinished(self, job: GCodeWriteJob) -> None:
+        if job.getStream() is not self._gcode_spool:
+            # The upload has finished or was cancelled in the meantime; the job is done all the same
+            if job is self._gcode_job:
+                self._gcode_job = None
+                self._gcode_progress_timer.stop()
+            return
+
+        if self._finishGCodeJob(job) and not self._isUploading():
+            self._sendPrintJob()  # the spool is compressed, so its size is known only now
+
+    def _sendPrintJob(self) -> None:
+        global_container_stack = CuraApplication.getInstance().getGlobalContainerStack()
+        if not global_container_stack:
+            return
+
+        CuraApplication.getInstance().getController().setActiveStage("MonitorStage")
+        # cancel any ongoing preheat timer before starting a print
+        try:
+            self._printers[0].stopPreheatTimers()
+        except AttributeError:
+            # stopPreheatTimers was added after Cura 3.3 beta
+            pass
+
+        self._showProgressMessage(i18n_catalog.i18nc("@info:status", "Sending data to fabWeaver"))
+
+        self._file_name = self._getJobFileName()
+        self._print_after_upload = True
+        self._uploadGCode()
+
+    def _getJobFileName(self) -> str:
         print_info = CuraApplication.getInstance().getPrintInformation()
         job_name = print_info.jobName.strip()
         if job_name == "":
             job_name = "untitled_print"
         extension = "gcode"
-        self._file_name = "%s.%s" % (os.path.basename(job_name), extension)
+        return "%s.%s" % (os.path.basename(job_name), extension)
+
+    ##  Upload the G-code (from the spool, or from memory) as self._file_name
+    def _uploadGCode(self) -> None:
+        # Whatever was stored under this name is overwritten now
+        self._upload_index.removeFileName(self._file_name)
+        self._print_queue.clearUploaded(self._file_name)
+
+        self._upload_headers = {}  # type: Dict[str, str]
+        if self._gcode_spool is None:
+            gcode_body = self._gcode_stream.getvalue()
+            if isinstance(gcode_body, str):
+                # encode StringIO result to bytes
+                gcode_body = gcode_body.encode()
+            self._postGCode(gcode_body)
+            self._gcode_stream = StringIO()  # type: Union[StringIO, BytesIO]
+            return
+
+        if self._upload_content_encoding is not None:
+            self._upload_headers["Content-Encoding"] = self._upload_content_encoding
+
+        if CuraApplication.getInstance().getPreferences().getValue("fabWeaver/resumable_uploads"):
+            self._resumable_upload = ResumableUpload(
+                self, self._gcode_spool, "resources/" + self._file_name, self._upload_headers,
+                on_finished=self._onUploadFinished, on_progress=self._onUploadProgress,
+                on_unsupported=self._onResumableUploadUnsupported, on_failed=self._onUploadFailed
+            )
+            self._resumable_upload.start()
+            return
 
-        ##  Create parts (to be placed inside multipart)
-        gcode_body = self._gcode_stream.getvalue()
-        if isinstance(gcode_body, str):
-            # encode StringIO result to bytes
-            gcode_body = gcode_body.encode()
+        self._postGCodeSpool()
+
+    ##  Upload the spooled G-code in a single request
+    def _postGCodeSpool(self) -> None:
+        # Stream the upload straight from the spool file, while it is still being written
+        gcode_body = self._gcode_spool.openDevice()
+        if gcode_body is None:
+            if self._progress_message:
+                self._progress_message.hide()
+            self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver."))
+            self._releaseGCodeSpool()
+            return
+        self._postGCode(gcode_body)
 
+    def _postGCode(self, gcode_body: Union[QIODevice, bytes]) -> None:
         try:
-            self._post_gcode_reply = self.post("resources/" + self._file_name  + "?override=true", gcode_body,
-            on_finished=self._onUploadFinished, on_progress=self._onUploadProgress)
+            # Handled on the finished signal of the reply, so a reply without an HTTP status is handled too
+            reply = self.post("resources/" + self._file_name  + "?override=true", gcode_body,
+            on_finished=None, on_progress=self._onUploadProgress, headers=self._upload_headers)
+            if reply is None:
+                self._onUploadFailed("No network manager")
+                return
+            self._post_gcode_reply = reply
+            reply.finished.connect(lambda: self._onUploadFinished(reply))
         except Exception as e:
-            self._progress_message.hide()
+            if self._progress_message:
+                self._progress_message.hide()
             self._error_message = Message(
                 i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver."),
                 title=i18n_catalog.i18nc("@label", "fabWeaver error")
             )
             self._error_message.show()
             Logger.log("e", "An exception occurred in network connection: %s" % str(e))
+            self._releaseGCodeSpool()
+
+    ##  The instance does not support chunked uploads; upload the G-code in a single request instead
+    def _onResumableUploadUnsupported(self) -> None:
+        Logger.log("w", "fabWeaver on %s does not support resumable uploads, sending the G-code in one request", self._id)
+        self._resumable_upload = None
+        self._postGCodeSpool()
+
+    ##  Delete the spooled G-code of the last job (if any)
+    def _releaseGCodeSpool(self) -> None:
+        if self._gcode_spool is not None:
+            self._gcode_spool.remove()
+            self._gcode_spool = None
+
+    ##  Check whether the materials a job was sliced for are loaded in the printer, as reported by its last poll.
+    #   This is what the instance checks (replying 406) after the upload.
+    #   \return A description of the mismatch, or an empty string
+    def findMaterialMismatch(self, header: GCodeHeader) -> str:
+        if self._openSpool:
+            return ""  # any material may be loaded
+        error_string = findMaterialMismatch(header, self._loaded_spools)
+        if error_string:
+            Logger.log("w", "Job does not match the materials in fabWeaver on %s: %s", self._id, error_string)
+        return error_string
 
-        self._gcode_stream = StringIO()  # type: Union[StringIO, BytesIO]
+    ##  Add G-code that was spooled once for several instances (see MultiPrinterDispatch) to the print queue.
+    #   The queue gets a copy, as the spool stays owned by the caller.
+    #   \return Whether the job was queued
+    def queueSharedGCode(self, spool: GCodeSpool, file_name: str) -> bool:
+        try:
+            handle, path = tempfile.mkstemp(prefix = "fabweaver_", suffix = ".gcode", dir = self._print_queue.getDirectory())
+            os.close(handle)
+            shutil.copyfile(spool.getPath(), path)
+        except OSError:
+            Logger.logException("e", "Could not add the job to the print queue of fabWeaver on %s", self._id)
+            return False
+        self._print_queue.add(file_name, path, spool.getDigest(), spool.getHeader().toDict())
+        Logger.log("i", "Queued %s for fabWeaver on %s. Jobs waiting: %d", file_name, self._id, self._print_queue.getJobCount())
+        return True
+
+    ##  Upload G-code that was spooled once for several instances (see MultiPrinterDispatch) and print it.
+    #   Every instance streams from its own reader on the shared spool, so the G-code is on disk only once and
+    #   memory use doesn't grow with the number of instances. The spool stays owned by the caller.
+    #   \param on_finished Called with whether the job was started, and an error string if it wasn't
+    #   \return Whether the upload was started
+    def sendSharedGCode(self, spool: GCodeSpool, file_name: str,
+                        on_finished: Callable[[bool, str], None], on_progress: Callable[[int, int], None]) -> bool:
+        if self._isUploading() or self._shared_upload_reader is not None or self._gcode_job is not None:
+            Logger.log("w", "fabWeaver on %s is busy sending another job", self._id)
+            return False
+
+        reader = spool.openReader()
+        if reader is None:
+            return False
+
+        self._shared_upload_reader = reader
+        self._on_shared_upload_finished = on_finished
+        self._file_name = file_name
+        self._upload_index.removeFileName(file_name)
+        self._print_queue.clearUploaded(file_name)
+        # Handled on the finished signal of the reply, so a reply without an HTTP status is handled too
+        reply = self.post("resources/" + file_name + "?override=true", reader, on_finished=None, on_progress=on_progress)
+        if reply is None:
+            self._closeSharedUpload()
+            return False
+        self._post_gcode_reply = reply
+        reply.finished.connect(lambda: self._onSharedUploadFinished(reply))
+        return True
+
+    ##  Stop the upload of shared G-code, without calling back
+    def abortSharedUpload(self) -> None:
+        if self._shared_upload_reader is None:
+            return
+        self._on_shared_upload_finished = None
+        self._abortUpload()
+        self._closeSharedUpload()
+
+    def _closeSharedUpload(self) -> None:
+        if self._shared_upload_reader is not None:
+            self._shared_upload_reader.close()
+            self._shared_upload_reader = None
+        self._post_gcode_reply = None  # type:Optional[QNetworkReply]
+
+    def _onSharedUploadFinished(self, reply: QNetworkReply) -> None:
+        if reply.error() == QNetworkReplyNetworkErrors.OperationCanceledError or reply is not self._post_gcode_reply:
+            return
+        spool = self._shared_upload_reader.getSpool() if self._shared_upload_reader is not None else None
+        self._closeSharedUpload()
+        on_finished = self._on_shared_upload_finished
+        self._on_shared_upload_finished = None
+
+        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+        error_string = ""
+        if isSuccessStatus(http_status_code):
+            Logger.log("d", "fabWeaver on %s stored the shared job %s", self._id, self._file_name)
+            if spool is not None:
+                self._upload_index.add(spool.getDigest(), self._file_name)
+            self.patch("resources/" + self._file_name + "?action=print", "", on_finished=self._onRequestFinished)
+        elif http_status_code is None:
+            error_string = reply.errorString()
+        elif http_status_code == 409:
+            error_string = i18n_catalog.i18nc("@info:error", "fabWeaver a file with the same name.")
+        elif http_status_code == 400:
+            error_string = i18n_catalog.i18nc("@info:error", "Unabailable Printer.")
+        elif http_status_code == 406:
+            error_string = i18n_catalog.i18nc("@info:error", "Material mismatch.")
+        else:
+            error_string = readReplyText(reply)
+            if not error_string:
+                error_string = reply.attribute(QNetworkRequestAttributes.HttpReasonPhraseAttribute)
+
+        if error_string:
+            Logger.log("e", "FabWeaverOutputDevice got an error uploading to %s: %s", reply.url().toString(), error_string)
+        if on_finished is not None:
+            on_finished(not error_string, error_string)
 
     def _cancelSendGcode(self, message: Message, action_id: str) -> None:
         self._progress_message = None  # type:Optional[Message]
         if message:
             message.hide()
 
+        self._cancelGCodeJob()
+        if not self._print_after_upload:
+            return  # a queued job is being uploaded in the background; leave it be
+
+        if self._abortUpload():
+            Logger.log("d", "Stopped upload because the user pressed cancel.")
+            self.delete("resources/" + self._file_name, on_finished=self._onDeleteFinished)
+        self._releaseGCodeSpool()
+
+    def _isUploading(self) -> bool:
+        return self._post_gcode_reply is not None or self._resumable_upload is not None
+
+    ##  Stop the running upload, if any
+    #   \return Whether an upload was running
+    def _abortUpload(self) -> bool:
+        if self._resumable_upload is not None:
+            self._resumable_upload.abort()
+            self._resumable_upload = None
+            return True
+
         if self._post_gcode_reply:
-            Logger.log("d", "Stopping upload because the user pressed cancel.")
             try:
                 self._post_gcode_reply.uploadProgress.disconnect(self._onUploadProgress)
             except TypeError:
@@ -433,43 +1196,299 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
 
             self._post_gcode_reply.abort()
             self._post_gcode_reply = None  # type:Optional[QNetworkReply]
+            return True
 
-            self.delete("resources/" + self._file_name, on_finished=self._onDeleteFinished)
+        return False
 
+    ##  Send a job command (pause, resume, stop) on the command lane: right away, with the highest priority, and on a
+    #   connection of its own (see NetworkTransport), so it doesn't wait behind polls or an upload. The time until the
+    #   instance acknowledges it is shown in the monitor.
     def _sendJobCommand(self, command: str) -> None:
-        self._sendCommandToApi("printer/control", command)
+        self._validateManager()
+        request = self._createEmptyRequest("printer/control", traffic_class = TrafficClass.Command)
+        timeout = self._connection_health.getTimeout()
+        self._setRequestTimeout(request, timeout)
+        self._last_request_time = time()
+
+        reply = self._transport.getCommandManager().post(request, json.dumps({"op": command}).encode())
+        sent_time = monotonic()
+        reply.finished.connect(lambda: self._onJobCommandFinished(reply, command, sent_time))
+        self._transport.track(reply)
+        self._bandwidth_scheduler.track(TrafficClass.Command, reply)
+        self._trackHealth(reply, timeout)
+        self._polling_scheduler.onCommand()
         Logger.log("d", "Sent job command to fabWeaver instance: %s", command)
 
-    def _sendCommandToApi(self, end_point: str, commands: Union[Dict[str, Any], str, List[str]]) -> None:
-        if isinstance(commands, dict):
-            data = json.dumps(commands)
-        elif isinstance(commands, list):
-            data = json.dumps({"op": commands})#commands": commands})
+    def _onJobCommandFinished(self, reply: QNetworkReply, command: str, sent_time: float) -> None:
+        latency = (monotonic() - sent_time) * 1000
+        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+        if not http_status_code:
+            Logger.log("w", "Job command %s was not delivered to %s: %s", command, self._id, reply.errorString())
+            self._showErrorMessage(i18n_catalog.i18nc("@info:error", "Could not send the command to fabWeaver on {0}.").format(self._id))
+            return
+
+        if http_status_code < 300:
+            Logger.log("d", "Job command %s acknowledged by %s in %d ms", command, self._id, latency)
+            self._last_command = command
+            self._last_command_latency = latency
+            self.commandLatencyChanged.emit()
+        self._onRequestFinished(reply)
+
+        # Keep the command connection open for the next command
+        self._transport.warmUpCommandConnection(self._protocol, self._address, self._port)
+
+    ##  Handle the printer status, polled from /printer or pushed by the status stream
+    def _onPrinterStatus(self, printer: PrinterOutputModel, json_data: Any) -> None:
+        self._setPrinterReachable()
+        status = decodePrinterStatus(json_data)
+        self._applyPrinterStatus(printer, status)
+        self._recordTelemetry(status)
+        self._polling_scheduler.onStatus(status)
+        self._processPrintQueue(status.printer_state)
+        self._resolveStatusWaiters(self._getAppliedStatusSequence(), status)
+
+    ##  Handle a /printer reply that is the same as the previous one (304, or an identical body)
+    #   \return False if the previous status is not known anymore, so the reply has to be handled in full
+    def _onPrinterStatusUnchanged(self) -> bool:
+        if self._last_status is None:
+            return False
+        self._setPrinterReachable()
+        self._status_signal_counts["polls"] += 1
+        self._status_signal_counts["idle_polls"] += 1
+        self._status_signal_counts["last_poll"] = 0
+        self._recordTelemetry(self._last_status)
+        self._polling_scheduler.onStatus(self._last_status)
+        self._processPrintQueue(self._last_status.printer_state)
+        self._resolveStatusWaiters(self._getAppliedStatusSequence(), self._last_status)
+        return True
+
+    def _setPrinterReachable(self) -> None:
+        if not self.acceptsCommands:
+            self._setAcceptsCommands(True)
+            self.setConnectionText(i18n_catalog.i18nc("@info:status", "Connected to fabWeaver on {0}").format(self._id))
+
+        if self._connection_state == UnifiedConnectionState.Connecting:
+            self.setConnectionState(cast(ConnectionState, UnifiedConnectionState.Connected))
+
+    ##  Forget the last status, so the next one is fetched and pushed into the models in full
+    def _forgetPrinterStatus(self) -> None:
+        self._last_status = None  # type: Optional[PrinterStatus]
+        self._status_validators = {}
+        self._status_digest = b""
+
+    ##  A conditional /printer poll was answered with 304, but the status it refers to is not known anymore: fetch it
+    #   in full right away. Whoever waits for a fresh status waits for that poll, instead of getting none.
+    def _repollPrinterStatus(self, reply: QNetworkReply) -> None:
+        request = reply.request()
+        if not request.hasRawHeader(b"If-None-Match") and not request.hasRawHeader(b"If-Modified-Since"):
+            return  # an unconditional request should never be answered with 304; don't keep asking
+        sequence = self._poll("printer")
+        if self._polling_registry.get("printer").isInFlight():
+            self._status_waiters = [(max(waiting_for, sequence), callback) for waiting_for, callback in self._status_waiters]
+
+    ##  Remember the validators of a /printer reply, to send a conditional request next time
+    def _updateStatusValidators(self, reply: QNetworkReply) -> None:
+        self._status_validators = {}
+        if reply.hasRawHeader(b"ETag"):
+            self._status_validators[b"If-None-Match"] = bytes(reply.rawHeader(b"ETag"))
+        if reply.hasRawHeader(b"Last-Modified"):
+            self._status_validators[b"If-Modified-Since"] = bytes(reply.rawHeader(b"Last-Modified"))
+
+    def _onStatusStreamData(self, json_data: Dict[str, Any]) -> None:
+        self._last_response_time = time()
+        # A poll that is in flight now may answer with an older status; the pushed one is newer
+        self._poll_sequence += 1
+        self._polling_registry.get("printer").applied_sequence = self._poll_sequence
+        # What was polled before says nothing about the pushed status
+        self._status_validators = {}
+        self._status_digest = b""
+        if not self._printers:
+            self._createPrinterList()
+        self._onPrinterStatus(self._printers[0], json_data)
+
+    ##  Open a long-lived GET request for a stream of Server-Sent Events (see StatusStream).
+    #   The caller handles the reply itself.
+    def openStream(self, url: str) -> Optional[QNetworkReply]:
+        self._validateManager()
+        if not self._manager:
+            Logger.log("e", "No network manager was created to open the stream with.")
+            return None
+
+        request = self._createEmptyRequest(url, content_type = None, traffic_class = TrafficClass.Poll)
+        request.setRawHeader(b"Accept", b"text/event-stream")
+        request.setRawHeader(b"Cache-Control", b"no-cache")
+        reply = self._manager.get(request)
+        self._transport.track(reply)
+        return reply
+
+    ##  Update the printer and its active print job from a decoded /printer reply.
+    #   Only what changed since the previous reply is pushed into the models, so an idle printer doesn't make the
+    #   monitor re-evaluate its bindings every poll. The number of signals caused is counted per poll.
+    def _applyPrinterStatus(self, printer: PrinterOutputModel, status: PrinterStatus) -> None:
+        previous = self._last_status
+        self._last_status = status
+        signal_count = 0
+
+        if status.printer_name is not None and status.printer_name != self._printer_name:
+            self._printer_name = status.printer_name
+            self.printerNameChanged.emit()
+            signal_count += 1
+        if status.printer_model is not None and status.printer_model != self._printer_model:
+            self._printer_model = status.printer_model
+            self.printerModelChanged.emit()
+            signal_count += 1
+
+        if status.has_fdm:
+            if status.nozzles is not None:
+                if not self._number_of_extruders_set:
+                    self._number_of_extruders = len(status.nozzles)
+
+                    if self._number_of_extruders > 1:
+                        # Recreate list of printers to match the new _number_of_extruders
+                        self._createPrinterList()
+                        printer = self._printers[0]
+                        previous = None  # the new models know nothing yet
+
+                    if self._number_of_extruders > 0:
+                        self._number_of_extruders_set = True
+
+                if status.open_material != self._openSpool:
+                    self._openSpool = status.open_material
+                    self.isOpenSpoolChanged.emit()
+                    signal_count += 1
+                if status.spools != self._spoolData:
+                    self._spoolData = status.spools
+                    self.spoolDataChanged.emit()
+                    signal_count += 1
+                if status.chamber_temperature != self._chamberCurrent:
+                    self._chamberCurrent = status.chamber_temperature
+                    self.chamberCurrentChanged.emit()
+                    signal_count += 1
+                if status.chamber_temperature_target != self._chamberTarget:
+                    self._chamberTarget = status.chamber_temperature_target
+                    self.chamberTargetChanged.emit()
+                    signal_count += 1
+
+                # Check for hotend temperatures
+                previous_nozzles = previous.nozzles if previous is not None and previous.nozzles is not None else []
+                for index, nozzle in enumerate(status.nozzles[:self._number_of_extruders]):
+                    previous_nozzle = previous_nozzles[index] if index < len(previous_nozzles) else None
+                    if previous_nozzle == nozzle:
+                        continue
+                    extruder = printer.extruders[index]
+                    if previous_nozzle is None or previous_nozzle.temperature_target != nozzle.temperature_target:
+                        extruder.updateTargetHotendTemperature(nozzle.temperature_target)
+                        signal_count += 1
+                    if previous_nozzle is None or previous_nozzle.temperature != nozzle.temperature:
+                        extruder.updateHotendTemperature(nozzle.temperature)
+                        signal_count += 1
+
+                    if nozzle.loaded_spool is not None and (previous_nozzle is None or previous_nozzle.loaded_spool != nozzle.loaded_spool):
+                        material = nozzle.loaded_spool.get("material")
+                        color = nozzle.loaded_spool.get("filament_color")
+                        materialOutModel = MaterialOutputModel(guid = "", type = material if material is not None else -1,
+                                                               color = color if color is not None else -1, brand = "Generic", name = "Sindoh")
+                        extruder.updateActiveMaterial(materialOutModel)
+                        signal_count += 1
+
+                self._loaded_spools = [nozzle.loaded_spool for nozzle in status.nozzles]
+
+            # Check for bed temperatures
+            if previous is None or previous.bed_temperature != status.bed_temperature:
+                printer.updateBedTemperature(status.bed_temperature)
+                signal_count += 1
+            if previous is None or previous.bed_temperature_target != status.bed_temperature_target:
+                printer.updateTargetBedTemperature(status.bed_temperature_target)
+                signal_count += 1
+
+        if previous is None or previous.printer_state != status.printer_state:
+            printer.updateState(status.printer_state)
+            signal_count += 1
+
+        if printer.activePrintJob is None:
+            print_job = PrintJobOutputModel(output_controller=self._output_controller)
+            printer.updateActivePrintJob(print_job)
+            signal_count += 1
+            previous = None  # the new job knows nothing yet
         else:
-            data = json.dumps({"op": commands})#command": commands})
-        self.post(end_point, data, self._onRequestFinished)
+            print_job = printer.activePrintJob
+
+        if previous is None or previous.job_state != status.job_state:
+            print_job.updateState(status.job_state)
+            signal_count += 1
+        if previous is None or previous.job_total_time != status.job_total_time:
+            print_job.updateTimeTotal(status.job_total_time)
+            signal_count += 1
+        if previous is None or previous.job_elapsed_time != status.job_elapsed_time:
+            print_job.updateTimeElapsed(status.job_elapsed_time)
+            signal_count += 1
+
+        # printer available
+        if status.available is not None:
+            self._printer_available = status.available
+
+        if previous is None or previous.job_name != status.job_name:
+            print_job.updateName(status.job_name)
+            signal_count += 1
+
+        if status.version is not None and status.version != self._fabWeaver_version:
+            self._fabWeaver_version = status.version
+            self.fabWeaverVersionChanged.emit()
+            signal_count += 1
+
+        self._status_signal_counts["polls"] += 1
+        self._status_signal_counts["last_poll"] = signal_count
+        self._status_signal_counts["total"] += signal_count
+        if signal_count == 0:
+            self._status_signal_counts["idle_polls"] += 1
+
+    ##  Counters of the model updates caused by status polls: the number of polls, of polls that changed nothing,
+    #   and of signals caused by the last poll and by all polls
+    def getStatusSignalCounts(self) -> Dict[str, int]:
+        return dict(self._status_signal_counts)
+
+    def _recordTelemetry(self, status: PrinterStatus) -> None:
+        now = time()
+        self.getTelemetryHistory().append(now, status)
+        if self._telemetry_log is not None:
+            self._telemetry_log.append(now, status)
+
+    ##  The temperatures and job progress reported by the printer over time
+    def getTelemetryHistory(self) -> TelemetryHistory:
+        if self._telemetry_history is None:
+            capacity = CuraApplication.getInstance().getPreferences().getValue("fabWeaver/telemetry_history_capacity")
+            try:
+                capacity = int(capacity)
+            except (TypeError, ValueError):
+                Logger.log("w", "Invalid telemetry history capacity %r, using %d samples", capacity, TelemetryHistory.DefaultCapacity)
+                capacity = TelemetryHistory.DefaultCapacity
+            self._telemetry_history = TelemetryHistory(capacity)
+        return self._telemetry_history
+
+    ##  The log of the status on disk, if it is kept
+    def getTelemetryLog(self) -> Optional[TelemetryLog]:
+        return self._telemetry_log
 
     ##  Handler for all requests that have finished.
     def _onRequestFinished(self, reply: QNetworkReply) -> None:
         if reply.error() == QNetworkReplyNetworkErrors.TimeoutError:
+            if self._bandwidth_scheduler.isUploading() and reply.operation() == QNetworkAccessManagerOperations.GetOperation:
+                # The upload takes the link; it tells whether the instance is there by its progress
+                Logger.log("d", "A status poll timed out while uploading to the instance")
+                return
+            # Whether the connection is in error is up to the health monitor, see _onConnectionHealthChanged
             Logger.log("w", "Received a timeout on a request to the instance")
-            self._connection_state_before_timeout = self._connection_state
-            self.setConnectionState(cast(ConnectionState, UnifiedConnectionState.Error))
+            self._polling_scheduler.onError()
             return
 
-        if self._connection_state_before_timeout and reply.error() == QNetworkReplyNetworkErrors.NoError:
-            #  There was a timeout, but we got a correct answer again.
-            if self._last_response_time:
-                Logger.log("d", "We got a response from the instance after %s of silence", time() - self._last_response_time)
-            self.setConnectionState(self._connection_state_before_timeout)
-            self._connection_state_before_timeout = None
-
         if reply.error() == QNetworkReplyNetworkErrors.NoError:
             self._last_response_time = time()
 
         http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
         if not http_status_code:
             # Received no or empty reply
+            if reply.operation() == QNetworkAccessManagerOperations.GetOperation:
+                self._polling_scheduler.onError()
             return
 
         if reply.operation() == QNetworkAccessManagerOperations.GetOperation:
@@ -482,181 +1501,39 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
                 if not printer:
                     Logger.log("e", "There is no active printer")
                     return
-                update_pace = self._update_slow_interval
+
+                if http_status_code == 304:
+                    if not self._onPrinterStatusUnchanged():
+                        self._forgetPrinterStatus()
+                        self._repollPrinterStatus(reply)
+                    return
 
                 if http_status_code == 200:
-                    update_pace = self._update_fast_interval
+                    if reply.hasRawHeader(b"Accept-Encoding"):
+                        self._setAcceptedContentEncodings(bytes(reply.rawHeader(b"Accept-Encoding")).decode("utf-8"))
 
-                    if not self.acceptsCommands:
-                        self._setAcceptsCommands(True)
-                        self.setConnectionText(i18n_catalog.i18nc("@info:status", "Connected to fabWeaver on {0}").format(self._id))
+                    self._updateStatusValidators(reply)
+                    body = getReplyBuffer(reply)
+                    # Without validators, an identical body still doesn't need to be parsed again
+                    digest = hashlib.blake2b(body, digest_size = 16).digest()
+                    if digest == self._status_digest and self._onPrinterStatusUnchanged():
+                        return
+                    self._status_digest = digest
 
-                    if self._connection_state == UnifiedConnectionState.Connecting:
-                        self.setConnectionState(cast(ConnectionState, UnifiedConnectionState.Connected))
                     try:
-                        json_data = json.loads(bytes(reply.readAll()).decode("utf-8"))
-                    except json.decoder.JSONDecodeError:
+                        if len(body) > MaxReplySize:
+                            raise ValueError("reply of %d bytes" % len(body))
+                        json_data = decodeJson(body)
+                    except ValueError:
                         Logger.log("w", "Received invalid JSON from fabWeaver instance.")
                         json_data = {}
 
-                    if "display_name" in json_data:
-                        self._printer_name = json_data["display_name"]
-
-                    if "model" in json_data:
-                        self._printer_model = json_data["model"]
-
-                    if "fdm" in json_data:
-                        if "nozzle" in json_data["fdm"]:
-                            if not self._number_of_extruders_set:
-                                self._number_of_extruders = len(json_data["fdm"]["nozzle"])
-
-                                if self._number_of_extruders > 1:
-                                    # Recreate list of printers to match the new _number_of_extruders
-                                    self._createPrinterList()
-                                    printer = self._printers[0]
-
-                                if self._number_of_extruders > 0:
-                                    self._number_of_extruders_set = True
-
-                            self._openSpool = json_data["open_material"]
-                            self._spoolData = json_data["fdm"]["spool"]
-                            self._chamberCurrent = json_data["fdm"]["chamber_temperature"]
-                            self._chamberTarget = json_data["fdm"]["chamber_temperature_target"]
-
-                            # Check for hotend temperatures
-                            for index in range(0, self._number_of_extruders):
-                                extruder = printer.extruders[index]
-                                hotend_temperatures = json_data["fdm"]["nozzle"][index]
-                                target_temperature = hotend_temperatures["temperature_target"] if hotend_temperatures["temperature_target"] is not None else -1
-                                actual_temperature = hotend_temperatures["temperature"] if hotend_temperatures["temperature"] is not None else -1
-                                extruder.updateTargetHotendTemperature(target_temperature)
-                                extruder.updateHotendTemperature(actual_temperature)
-
-                                isLoadedSpool = hotend_temperatures["spool_connect"] if hotend_temperatures["spool_connect"] is not None else -1
-                                if isLoadedSpool == 1 :
-                                    loaded_spoolno = hotend_temperatures["loaded_spoolno"] if hotend_temperatures["loaded_spoolno"] is not None else -1
-                                    if loaded_spoolno >= 0 and loaded_spoolno < 4 :
-                                        loaded_spool = json_data["fdm"]["spool"][loaded_spoolno]
-                                        material = loaded_spool["material"] if loaded_spool["material"] is not None else -1
-                                        color = loaded_spool["filament_color"] if loaded_spool["filament_color"] is not None else -1
-                                        materialOutModel = MaterialOutputModel(guid = "", type = material, color = color, brand = "Generic", name = "Sindoh")
-                                        extruder.updateActiveMaterial(materialOutModel)
-
-                        # Check for bed temperatures
-                        if "bed_temperature" in json_data["fdm"]:
-                            actual_temperature = json_data["fdm"]["bed_temperature"] if json_data["fdm"]["bed_temperature"] is not None else -1
-                            printer.updateBedTemperature(actual_temperature)
-                        else:
-                            printer.updateBedTemperature(-1)
-
-                        if "bed_temperature_target" in json_data["fdm"]:
-                            target_temperature = json_data["fdm"]["bed_temperature_target"] if json_data["fdm"]["bed_temperature_target"] is not None else -1
-                            printer.updateTargetBedTemperature(target_temperature)
-                        else:
-                            printer.updateTargetBedTemperature(0)
-
-                    # status
-                    printer_state = "offline"
-                    print_job_state = "offline"
-                    if "status" in json_data:
-                        state = json_data["status"]
-                        if state == "error":
-                            printer_state = "error"
-                            print_job_state = "error"
-                        elif state == "pausing":
-                            printer_state = "paused"
-                            print_job_state = "pausing"
-                        elif state == "paused":
-                            printer_state = "paused"
-                            print_job_state = "paused"
-                        elif state == "printing":
-                            printer_state = "printing"
-                            print_job_state = "printing"
-                        elif state == "endingAlert":
-                            printer_state = "printing"
-                            print_job_state = "wait_cleanup"
-                        elif state == "ready":
-                            printer_state = "idle"
-                            print_job_state = "ready"
-                        elif state == "resuming":
-                            printer_state = "printing"
-                            print_job_state = "resuming"
-                        elif state == "preparing":
-                            printer_state = "printing"
-                            print_job_state = "preparing"
-                        elif state == "chamberHeating" or state == "cancelablePreparing":
-                            printer_state = "printing"
-                            print_job_state = "pre_print"
-                        elif state == "cancelling":
-                            printer_state = "printing"
-                            print_job_state = "abort"
-                        elif state == "jobExtruderJog":
-                            printer_state = "printing"
-                            print_job_state = "notPrintable"
-                        elif state == "notPrintableScreen" or state == "noSpool" or state == "notLoaded" or state == "levelingNeeded" or state == "updating" or \
-                        state == "restoring" or state == "loading" or state == "unloading" or state == "swUpdate" or state == "install" or state == "extruderJog" or\
-                        state == "topDoorOpen" or state == "frontDoorOpen" or state == "userPopup" or state == "zoffset" or state == "cartridgeChanging" or \
-                        state == "noFilament" or state == "xyzJog" or state == "nozzleCleaning" or state == "leveling" or state == "warning" or state == "userPopup" :
-                            printer_state = "aborted"
-                            print_job_state = "abort"
-                        elif state == "unknown":
-                            pass
-                        else:
-                            Logger.log("w", "Encountered unexpected printer, job state: %s" % state)
-
-                    printer.updateState(printer_state)
-
-                    if printer.activePrintJob is None:
-                        print_job = PrintJobOutputModel(output_controller=self._output_controller)
-                        printer.updateActivePrintJob(print_job)
-                    else:
-                        print_job = printer.activePrintJob
-
-                    print_job.updateState(print_job_state)
-
-                    # print_time = json_data["job_running_time"]
-                    # completion = json_data["job_progress"]
-                    # print_time_left = json_data["job_left_time"]
-                    # if print_time:
-                    #     print_job.updateTimeElapsed(print_time)
-
-                    #     print_time_left = json_data["job_left_time"]
-                    #     if print_time_left:  # not 0 or None or ""
-                    #         print_job.updateTimeTotal(print_time + print_time_left)
-                    #     elif completion:  # not 0 or None or ""
-                    #         print_job.updateTimeTotal(print_time / (completion / 100))
-                    #     else:
-                    #         print_job.updateTimeTotal(0)
-                    # else:
-                    #     print_job.updateTimeElapsed(0)
-                    #     print_job.updateTimeTotal(0)
-
-                    total_time = json_data["job_running_time"]
-                    print_time_left = json_data["job_left_time"]
-                    completion = json_data["job_progress"]
-                    if total_time:
-                        print_job.updateTimeTotal(total_time)
-                        if print_time_left :
-                            print_job.updateTimeElapsed(total_time - print_time_left)
-                        elif completion :
-                            print_job.updateTimeElapsed(total_time * (completion / 100))
-                        else:
-                            print_job.updateTimeElapsed(0)
-                    else:
-                        print_job.updateTimeTotal(0)
-                        print_job.updateTimeElapsed(0)
-
-                    # printer available
-                    if "available" in json_data:
-                        self._printer_available = True if json_data["available"] == "available" else False
-
-                    print_job.updateName(json_data["job_name"])
-
-                    if "version" in json_data:
-                        self._fabWeaver_version = json_data["version"]
-                        self.additionalDataChanged.emit()
-
-                elif http_status_code == 401 or http_status_code == 403:
+                    self._onPrinterStatus(printer, json_data)
+                    return
+
+                self._polling_scheduler.onError()
+
+                if http_status_code == 401 or http_status_code == 403:
                     self._setOffline(printer, i18n_catalog.i18nc(
                         "@info:status", "fabWeaver on {0} does not allow access to the printer state").format(self._id)
                     )
@@ -682,9 +1559,6 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
                     self._setOffline(printer)
                     Logger.log("w", "Received an unexpected status code: %d", http_status_code)
 
-                if update_pace != self._update_timer.interval():
-                    self._update_timer.setInterval(update_pace)
-
         elif reply.operation() == QNetworkAccessManagerOperations.CustomOperation:
             if self._api_prefix + "resources" in reply.url().toString():  # Result from /resources command:
                 if http_status_code == 200:
@@ -711,7 +1585,7 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
                 error_string = i18n_catalog.i18nc("@info:error", "You are not allowed to access fabWeaver with the configured API key.")
             else:
                 # Received another error reply
-                error_string = bytes(reply.readAll()).decode("utf-8")
+                error_string = readReplyText(reply)
                 if not error_string:
                     error_string = reply.attribute(QNetworkRequestAttributes.HttpReasonPhraseAttribute)
 
@@ -744,17 +1618,49 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             self._progress_message.setProgress(0)
 
     def _onUploadFinished(self, reply: QNetworkReply) -> None:
-        reply.uploadProgress.disconnect(self._onUploadProgress)
+        try:
+            reply.uploadProgress.disconnect(self._onUploadProgress)
+        except TypeError:
+            pass  # Already disconnected when the upload was cancelled
+        if reply.error() == QNetworkReplyNetworkErrors.OperationCanceledError:
+            return
+
+        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+        if http_status_code is None:
+            self._onUploadFailed(reply.errorString())
+            return
+
+        self._post_gcode_reply = None  # type:Optional[QNetworkReply]
+        self._resumable_upload = None  # type: Optional[ResumableUpload]
+        spool_path = self._gcode_spool.getPath() if self._gcode_spool is not None else ""
+        self._releaseGCodeSpool()
+
+        if not self._print_after_upload:
+            # A queued job was uploaded ahead of time; it is printed once the printer is ready
+            self._print_after_upload = True
+            uploaded = isSuccessStatus(http_status_code)
+            if uploaded:
+                self._upload_index.add(self._upload_digest, self._file_name)
+            else:
+                Logger.log("w", "Could not upload queued job %s ahead of time (%s), it is uploaded when the printer is ready", self._file_name, http_status_code)
+            self._print_queue.setUploaded(spool_path, uploaded)
+            return
 
         if self._progress_message:
             self._progress_message.hide()
             self._progress_message = None  # type:Optional[Message]
 
-        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+        if http_status_code == 415 and self._upload_content_encoding is not None:
+            # The instance does not understand the compressed upload; send it again without compression
+            Logger.log("w", "fabWeaver on %s does not accept %s encoded uploads, sending uncompressed G-code", self._id, self._upload_content_encoding)
+            self._accepted_content_encodings = []
+            self._writeGCode(None)
+            return
 
         error_string = ""
-        if http_status_code == 200:
+        if isSuccessStatus(http_status_code):
             Logger.log("d", "fabWeaver resources(print) command accepted")
+            self._upload_index.add(self._upload_digest, self._file_name)
 
         elif http_status_code >= 400:
             if http_status_code == 409:
@@ -765,7 +1671,7 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
                 error_string = i18n_catalog.i18nc("@info:error", "Material mismatch.")
             else:
                 # Received another error reply
-                error_string = bytes(reply.readAll()).decode("utf-8")
+                error_string = readReplyText(reply)
                 if not error_string:
                     error_string = reply.attribute(QNetworkRequestAttributes.HttpReasonPhraseAttribute)
 
@@ -779,6 +1685,25 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         # send print command
         self.patch("resources/" + self._file_name + "?action=print", "", on_finished=self._onRequestFinished)
 
+    ##  The upload failed without an answer from the instance: it could not be reached, or the connection dropped
+    def _onUploadFailed(self, error_string: str) -> None:
+        self._post_gcode_reply = None  # type:Optional[QNetworkReply]
+        self._resumable_upload = None  # type: Optional[ResumableUpload]
+        spool_path = self._gcode_spool.getPath() if self._gcode_spool is not None else ""
+        self._releaseGCodeSpool()
+        Logger.log("e", "Upload of %s to fabWeaver on %s failed: %s", self._file_name, self._id, error_string)
+
+        if not self._print_after_upload:
+            # A queued job that was uploaded ahead of time; it is uploaded again when the printer is ready
+            self._print_after_upload = True
+            self._print_queue.setUploaded(spool_path, False)
+            return
+
+        if self._progress_message:
+            self._progress_message.hide()
+            self._progress_message = None  # type:Optional[Message]
+        self._showErrorMessage(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver: {0}").format(error_string))
+
     def _onDeleteFinished(self, reply: QNetworkReply) -> None:
 
         http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
@@ -796,7 +1721,7 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
                 error_string = i18n_catalog.i18nc("@info:error", "Material mismatch.")
             else:
                 # Received another error reply
-                error_string = bytes(reply.readAll()).decode("utf-8")
+                error_string = readReplyText(reply)
                 if not error_string:
                     error_string = reply.attribute(QNetworkRequestAttributes.HttpReasonPhraseAttribute)
 
@@ -830,6 +1755,7 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         if not printer:
             Logger.log("e", "There is no active printer")
             return
+        self._forgetPrinterStatus()  # the models no longer match it
         if printer.state != "offline":
             printer.updateState("offline")
             if printer.activePrintJob:
@@ -837,6 +1763,51 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             self.setConnectionText(reason)
             Logger.log("w", reason)
 
+    ##  Time a request until its reply has finished, for the health of the connection
+    def _trackHealth(self, reply: QNetworkReply, timeout: int) -> None:
+        sent_time = monotonic()
+        reply.finished.connect(lambda: self._onTrackedReplyFinished(reply, sent_time, timeout))
+
+    def _onTrackedReplyFinished(self, reply: QNetworkReply, sent_time: float, timeout: int) -> None:
+        elapsed = (monotonic() - sent_time) * 1000
+        if reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute):
+            self._connection_health.onSuccess(elapsed)  # any answer, an error status too, means the link works
+        else:
+            error = reply.error()
+            timed_out = error == QNetworkReplyNetworkErrors.TimeoutError or \
+                        (error == QNetworkReplyNetworkErrors.OperationCanceledError and elapsed >= timeout)
+            if error == QNetworkReplyNetworkErrors.OperationCanceledError and not timed_out:
+                return  # aborted on purpose
+            if timed_out and self._bandwidth_scheduler.isUploading() and reply.operation() == QNetworkAccessManagerOperations.GetOperation:
+                return  # the upload takes the link; a slow poll says nothing about the instance
+            self._connection_health.onFailure()
+
+        if monotonic() - self._last_connection_stats_time >= self.ConnectionStatsInterval:
+            self._last_connection_stats_time = monotonic()
+            self.connectionStatsChanged.emit()
+
+    def _onConnectionHealthChanged(self) -> None:
+        if self._connection_state == UnifiedConnectionState.Closed:
+            return
+        if not self._connection_health.isHealthy():
+            self._connection_state_before_timeout = self._connection_state
+            self.setConnectionState(cast(ConnectionState, UnifiedConnectionState.Error))
+        elif self._connection_state_before_timeout:
+            if self._last_response_time:
+                Logger.log("d", "We got a response from the instance after %s of silence", time() - self._last_response_time)
+            self.setConnectionState(self._connection_state_before_timeout)
+            self._connection_state_before_timeout = None
+        self.connectionHealthChanged.emit()
+        self.connectionStatsChanged.emit()
+
+    ##  Abort a request that takes longer than the round trip times suggest it should
+    @staticmethod
+    def _setRequestTimeout(request: QNetworkRequest, timeout: int) -> None:
+        try:
+            request.setTransferTimeout(timeout)
+        except AttributeError:
+            pass  # Qt before 5.15; polls are still abandoned after MaxPollAge
+
     def _showErrorMessage(self, error_string: str) -> None:
         if self._error_message:
             self._error_message.hide()
@@ -846,8 +1817,27 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
     def _openFabWeaver(self, message: Message, action_id: str) -> None:
         QDesktopServices.openUrl(QUrl(self._base_url))
 
-    def _createEmptyRequest(self, target: str, content_type: Optional[str] = "application/json") -> QNetworkRequest:
-        request = QNetworkRequest(QUrl(self._api_url + target))
+    MaxCachedUrls = 64  # uploads go to a URL per file name; don't keep those forever
+
+    ##  Create a request to the API of the instance, as a copy of a prototype that has everything requests share
+    #   (the SSL configuration and the headers). QNetworkRequest is implicitly shared, so copying the prototype is
+    #   cheap, while creating the SSL configuration and encoding the headers for every poll is not.
+    def _createEmptyRequest(self, target: str, content_type: Optional[str] = "application/json",
+                            traffic_class: TrafficClass = TrafficClass.Command) -> QNetworkRequest:
+        request = QNetworkRequest(self._getRequestPrototype())
+        request.setUrl(self._getApiUrl(target))
+        request.setPriority(self._bandwidth_scheduler.getRequestPriority(traffic_class))
+
+        if content_type is not None:
+            request.setHeader(QNetworkRequestKnownHeaders.ContentTypeHeader, content_type)
+
+        return request
+
+    def _getRequestPrototype(self) -> QNetworkRequest:
+        if self._request_prototype is not None:
+            return self._request_prototype
+
+        request = QNetworkRequest(QUrl(self._api_url))
         try:
             request.setAttribute(QNetworkRequestAttributes.FollowRedirectsAttribute, True)
         except AttributeError:
@@ -855,19 +1845,39 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             pass
         request.setRawHeader(b"User-Agent", self._user_agent.encode())
 
-        if content_type is not None:
-            request.setHeader(QNetworkRequestKnownHeaders.ContentTypeHeader, content_type)
-
-        # ignore SSL errors (eg for self-signed certificates)
-        ssl_configuration = QSslConfiguration.defaultConfiguration()
-        ssl_configuration.setPeerVerifyMode(QSslSocketPeerVerifyModes.VerifyNone)
-        request.setSslConfiguration(ssl_configuration)
+        # SSL configuration (which ignores SSL errors, eg for self-signed certificates), HTTP/2 and connection limits
+        self._transport.prepareRequest(request)
 
         if self._basic_auth_data:
             request.setRawHeader(b"Authorization", self._basic_auth_data)
 
+        self._request_prototype = request
         return request
 
+    def _getApiUrl(self, target: str) -> QUrl:
+        url = self._api_urls.get(target)
+        if url is None:
+            if len(self._api_urls) >= self.MaxCachedUrls:
+                self._api_urls = {}
+            url = self._api_urls[target] = QUrl(self._api_url + target)
+        return url
+
+    ##  Overridden from NetworkedPrinterOutputDevice: all instances share the network manager of the plugin (see
+    #   NetworkTransport), so connections are reused. Replies are handled per request, see
+    #   _registerOnFinishedCallback, as the finished signal of the manager would hand the replies of all instances to
+    #   every device.
+    def _createNetworkManager(self) -> None:
+        self._manager = self._transport.getManager()
+        self._last_manager_create_time = time()
+
+        if self._properties.get(b"temporary", b"false") != b"true":
+            self._checkCorrectGroupName(self._id, self._name)
+
+    def _registerOnFinishedCallback(self, reply: QNetworkReply, on_finished: Optional[Callable[[QNetworkReply], None]]) -> None:
+        super()._registerOnFinishedCallback(reply, on_finished)
+        reply.finished.connect(lambda: self._handleOnFinished(reply))
+        self._transport.track(reply)
+
     # This is a patched version from NetworkedPrinterOutputdevice, which adds "form_data" instead of "form-data"
     def _createFormPart(self, content_header: str, data: bytes, content_type: Optional[str] = None) -> QHttpPart:
         part = QHttpPart()
@@ -883,47 +1893,82 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
 
     ## Overloaded from NetworkedPrinterOutputDevice.get() to be permissive of
     #  self-signed certificates
-    def get(self, url: str, on_finished: Optional[Callable[[QNetworkReply], None]]) -> None:
+    def get(self, url: str, on_finished: Optional[Callable[[QNetworkReply], None]],
+            priority: Optional["QNetworkRequest.Priority"] = None) -> Optional[QNetworkReply]:
         self._validateManager()
 
-        request = self._createEmptyRequest(url)
+        request = self._createEmptyRequest(url, traffic_class = TrafficClass.Poll)
+        if priority is not None:
+            request.setPriority(priority)
+        timeout = self._connection_health.getTimeout()
+        self._setRequestTimeout(request, timeout)
+        if url == "printer":
+            for header, value in self._status_validators.items():
+                request.setRawHeader(header, value)
         self._last_request_time = time()
 
         if not self._manager:
             Logger.log("e", "No network manager was created to execute the GET call with.")
-            return
+            return None
 
         reply = self._manager.get(request)
         self._registerOnFinishedCallback(reply, on_finished)
+        self._trackHealth(reply, timeout)
+        return reply
 
     ## Overloaded from NetworkedPrinterOutputDevice.post() to backport https://github.com/Ultimaker/Cura/pull/4678
     #  and allow self-signed certificates
-    def post(self, url: str, data: Union[str, bytes],
+    #  data can also be an opened QIODevice, which is then streamed instead of copied into memory
+    def post(self, url: str, data: Union[str, bytes, QIODevice],
              on_finished: Optional[Callable[[QNetworkReply], None]],
-             on_progress: Optional[Callable[[int, int], None]] = None) -> QNetworkReply:
+             on_progress: Optional[Callable[[int, int], None]] = None,
+             headers: Optional[Dict[str, str]] = None) -> QNetworkReply:
         self._validateManager()
 
-        request = self._createEmptyRequest(url)
+        # G-code goes to resources/, everything else is a command
+        traffic_class = TrafficClass.Upload if isinstance(data, QIODevice) or url.startswith("resources/") else TrafficClass.Command
+        request = self._createEmptyRequest(url, traffic_class = traffic_class)
+        if headers:
+            for key, value in headers.items():
+                request.setRawHeader(key.encode(), value.encode())
         self._last_request_time = time()
 
         if not self._manager:
             Logger.log("e", "Could not find manager.")
             return
 
-        body = data if isinstance(data, bytes) else data.encode()  # type: bytes
-        reply = self._manager.post(request, body)
+        timeout = self._connection_health.getTimeout()
+        if traffic_class != TrafficClass.Upload:
+            self._setRequestTimeout(request, timeout)
+
+        if isinstance(data, QIODevice):
+            request.setHeader(QNetworkRequestKnownHeaders.ContentLengthHeader, data.size())
+            if isinstance(data, GCodeSpoolReader):
+                data.setScheduler(self._bandwidth_scheduler)
+            if data.isSequential():
+                # Stream the data as it becomes available, instead of buffering the whole device first
+                request.setAttribute(QNetworkRequestAttributes.DoNotBufferUploadDataAttribute, True)
+            reply = self._manager.post(request, data)
+        else:
+            body = data if isinstance(data, bytes) else data.encode()  # type: bytes
+            reply = self._manager.post(request, body)
         if on_progress is not None:
             reply.uploadProgress.connect(on_progress)
         self._registerOnFinishedCallback(reply, on_finished)
+        self._bandwidth_scheduler.track(traffic_class, reply)
+        if traffic_class != TrafficClass.Upload:
+            self._trackHealth(reply, timeout)  # an upload takes as long as the G-code is large
 
         return reply
 
     def patch(self, url: str, data: Union[str, bytes],
              on_finished: Optional[Callable[[QNetworkReply], None]],
-             on_progress: Optional[Callable[[int, int], None]] = None) -> None:
+             on_progress: Optional[Callable[[int, int], None]] = None) -> Optional[QNetworkReply]:
         self._validateManager()
 
         request = self._createEmptyRequest(url)
+        timeout = self._connection_health.getTimeout()
+        self._setRequestTimeout(request, timeout)
         self._last_request_time = time()
 
         if not self._manager:
@@ -935,6 +1980,9 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         if on_progress is not None:
             reply.uploadProgress.connect(on_progress)
         self._registerOnFinishedCallback(reply, on_finished)
+        self._bandwidth_scheduler.track(TrafficClass.Command, reply)
+        self._trackHealth(reply, timeout)
+        return reply
 
     def delete(self, url: str, on_finished: Optional[Callable[[QNetworkReply], None]]) -> None:
         """Sends a delete request to the given path.
@@ -945,6 +1993,8 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
         self._validateManager()
 
         request = self._createEmptyRequest(url)
+        timeout = self._connection_health.getTimeout()
+        self._setRequestTimeout(request, timeout)
         self._last_request_time = time()
 
         if not self._manager:
@@ -952,4 +2002,6 @@ class FabWeaverOutputDevice(NetworkedPrinterOutputDevice):
             return
 
         reply = self._manager.deleteResource(request)
-        self._registerOnFinishedCallback(reply, on_finished)
\ No newline at end of file
+        self._registerOnFinishedCallback(reply, on_finished)
+        self._bandwidth_scheduler.track(TrafficClass.Command, reply)
+        self._trackHealth(reply, timeout)
\ No newline at end of file
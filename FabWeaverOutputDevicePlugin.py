@@ -1,5 +1,8 @@
 from UM.OutputDevice.OutputDevicePlugin import OutputDevicePlugin
 from .FabWeaverOutputDevice import FabWeaverOutputDevice
+from .MultiPrinterDispatch import MultiPrinterDispatch
+from .NetworkTransport import NetworkTransport
+from .TelemetryHistory import TelemetryHistory
 
 from UM.Signal import Signal, signalemitter
 from UM.Application import Application
@@ -8,7 +11,7 @@ from UM.Logger import Logger
 import json
 import re
 
-from typing import Any, Dict, TYPE_CHECKING
+from typing import Any, Dict, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from cura.PrinterOutput.PrinterOutputModel import PrinterOutputModel
@@ -21,6 +24,9 @@ class FabWeaverOutputDevicePlugin(OutputDevicePlugin):
     def __init__(self) -> None:
         super().__init__()
         self._instances = {} # type: Dict[str, FabWeaverOutputDevice]
+        self._dispatches = [] # type: List[MultiPrinterDispatch]
+        # The network manager all instances and camera streams share, so connections are reused
+        self._transport = NetworkTransport.getInstance()
 
         # Because the model needs to be created in the same thread as the QMLEngine, we use a signal.
         self.addInstanceSignal.connect(self.addInstance)
@@ -30,6 +36,23 @@ class FabWeaverOutputDevicePlugin(OutputDevicePlugin):
         # Load custom instances from preferences
         self._preferences = Application.getInstance().getPreferences()
         self._preferences.addPreference("fabWeaver/manual_instances", "{}")
+        self._preferences.addPreference("fabWeaver/compress_uploads", False)
+        self._preferences.addPreference("fabWeaver/resumable_uploads", False)
+        self._preferences.addPreference("fabWeaver/skip_duplicate_uploads", False)
+        self._preferences.addPreference("fabWeaver/uploaded_gcode", "{}")
+        self._preferences.addPreference("fabWeaver/queue_jobs", True)
+        self._preferences.addPreference("fabWeaver/pre_upload_queued_jobs", True)
+        # Bandwidth limits in KiB/s, 0 is unlimited
+        self._preferences.addPreference("fabWeaver/upload_bandwidth_limit", 0)
+        self._preferences.addPreference("fabWeaver/camera_bandwidth_limit", 0)
+        self._preferences.addPreference("fabWeaver/camera_bandwidth_limit_while_uploading", 64)
+        # Polling intervals in ms, see PollingScheduler
+        self._preferences.addPreference("fabWeaver/polling_intervals", "{}")
+        self._preferences.addPreference("fabWeaver/status_stream", True)
+        self._preferences.addPreference("fabWeaver/telemetry_log", False)
+        # Samples of the status kept in memory per instance (see TelemetryHistory)
+        self._preferences.addPreference("fabWeaver/telemetry_history_capacity", TelemetryHistory.DefaultCapacity)
+        self._preferences.addPreference("fabWeaver/http2", False)
 
         try:
             self._manual_instances = json.loads(self._preferences.getValue("fabWeaver/manual_instances"))
@@ -95,6 +118,23 @@ class FabWeaverOutputDevicePlugin(OutputDevicePlugin):
     def getInstances(self) -> Dict[str, Any]:
         return self._instances
 
+    ##  Requests, new connections and TLS handshakes to every host, see NetworkTransport
+    def getTransportStatistics(self) -> Dict[str, Dict[str, Any]]:
+        return self._transport.getStatistics()
+
+    ##  Send the current job to several instances at once. The G-code is serialized only once, and uploaded to
+    #   all instances concurrently from the same spool file.
+    def sendToPrinters(self, instance_ids: List[str]) -> None:
+        devices = [self._instances[key] for key in instance_ids if key in self._instances]
+        if not devices:
+            Logger.log("w", "None of the instances %s are known, nothing to send", instance_ids)
+            return
+
+        self._dispatches = [dispatch for dispatch in self._dispatches if not dispatch.isFinished()]
+        dispatch = MultiPrinterDispatch(devices)
+        self._dispatches.append(dispatch)
+        dispatch.start()
+
     def reCheckConnections(self) -> None:
         global_container_stack = Application.getInstance().getGlobalContainerStack()
         if not global_container_stack:
@@ -0,0 +1,157 @@
+from UM.i18n import i18nCatalog
+from UM.Logger import Logger
+from UM.Settings.ContainerRegistry import ContainerRegistry
+
+from cura.CuraApplication import CuraApplication
+
+import re
+
+from typing import Any, Dict, List, Optional
+
+i18n_catalog = i18nCatalog("cura")
+
+
+##  Collects the header of a G-code stream (the comments before the first command), as it is written.
+#   From the header it tells which extruders the job uses and which materials it was sliced for, so the job can
+#   be checked against the printer before it is uploaded.
+class GCodeHeader:
+    MaxSize = 64 * 1024  # stop looking for the end of the header after this many bytes
+
+    _extruder_train_regex = re.compile(r"EXTRUDER_TRAIN\.(\d+)\.MATERIAL\.(GUID|VOLUME_USED):(.*)")
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._size = 0
+        self._complete = False
+
+        self._material_guids = {}  # type: Dict[int, str]
+        self._material_used = {}  # type: Dict[int, float]
+
+    ##  Feed the next chunk of G-code
+    def write(self, data: str) -> None:
+        if self._complete:
+            return
+        self._size += len(data)
+        self._buffer += data
+        lines = self._buffer.split("\n")
+        self._buffer = lines.pop()  # the last line may be incomplete
+        for line in lines:
+            if not self._parseLine(line.strip()):
+                self._complete = True
+                self._buffer = ""
+                return
+        if self._size > self.MaxSize:
+            Logger.log("w", "No end of the G-code header found in the first %d bytes", self.MaxSize)
+            self._complete = True
+            self._buffer = ""
+
+    def isComplete(self) -> bool:
+        return self._complete
+
+    ##  The extruders that extrude anything in this job. If the header doesn't tell, the list is empty.
+    def getUsedExtruders(self) -> List[int]:
+        return sorted(index for index, amount in self._material_used.items() if amount > 0)
+
+    ##  The GUIDs of the materials the job was sliced for, per extruder, if the header has them
+    def getMaterialGuids(self) -> Dict[int, str]:
+        return self._material_guids
+
+    ##  What the pre-flight check needs of the header, to keep it with a queued job
+    def toDict(self) -> Dict[str, Any]:
+        return {
+            "material_guids": {str(index): guid for index, guid in self._material_guids.items()},
+            "material_used": {str(index): amount for index, amount in self._material_used.items()}
+        }
+
+    ##  The header of a queued job, as saved by toDict. Jobs queued without one get an empty header.
+    @classmethod
+    def fromDict(cls, data: Any) -> "GCodeHeader":
+        header = cls()
+        header._complete = True
+        if not isinstance(data, dict):
+            return header
+        try:
+            header._material_guids = {int(index): str(guid) for index, guid in data.get("material_guids", {}).items()}
+            header._material_used = {int(index): float(amount) for index, amount in data.get("material_used", {}).items()}
+        except (AttributeError, TypeError, ValueError):
+            Logger.log("w", "Ignoring the invalid G-code header of a queued job")
+            header._material_guids = {}
+            header._material_used = {}
+        return header
+
+    ##  \return False at the end of the header
+    def _parseLine(self, line: str) -> bool:
+        if not line:
+            return True
+        if not line.startswith(";"):
+            return False  # the first command
+        comment = line[1:].strip()
+        if comment == "END_OF_HEADER":
+            return False
+
+        match = self._extruder_train_regex.match(comment)
+        if match:
+            index = int(match.group(1))
+            if match.group(2) == "GUID":
+                self._material_guids[index] = match.group(3).strip()
+            else:
+                self._material_used[index] = self._parseFloat(match.group(3))
+        elif comment.startswith("Filament used:"):
+            # eg. ";Filament used: 1.23456m, 0m", one entry per extruder
+            for index, amount in enumerate(comment[len("Filament used:"):].split(",")):
+                self._material_used.setdefault(index, self._parseFloat(amount.strip().rstrip("m")))
+        return True
+
+    @staticmethod
+    def _parseFloat(value: str) -> float:
+        try:
+            return float(value)
+        except ValueError:
+            return 0
+
+
+##  Check the materials a job needs against the spools the printer reported to have loaded.
+#   \param loaded_spools The spool loaded in each nozzle, as reported by /printer (None if none is loaded)
+#   \return A description of the mismatch, or an empty string if the job can be printed as far as is known
+def findMaterialMismatch(header: GCodeHeader, loaded_spools: List[Optional[Dict[str, Any]]]) -> str:
+    if not loaded_spools:
+        return ""  # nothing is known about the printer yet; leave it to the printer
+
+    used_extruders = header.getUsedExtruders() or [0]
+    for index in used_extruders:
+        if index >= len(loaded_spools):
+            return i18n_catalog.i18nc("@info:error", "The job uses extruder {0}, but the printer has {1}.").format(index + 1, len(loaded_spools))
+
+        spool = loaded_spools[index]
+        if spool is None:
+            return i18n_catalog.i18nc("@info:error", "No material is loaded in extruder {0}.").format(index + 1)
+
+        loaded_material = spool.get("material")
+        if not isinstance(loaded_material, str) or not loaded_material:
+            continue  # the printer does not know the material of this spool
+        job_material = _getJobMaterial(header, index)
+        if job_material and _normalizeMaterial(job_material) != _normalizeMaterial(loaded_material):
+            return i18n_catalog.i18nc("@info:error", "Extruder {0} is loaded with {1}, but the job was sliced for {2}.").format(index + 1, loaded_material, job_material)
+    return ""
+
+
+##  The material type (eg. "PLA") the job was sliced for in an extruder: from the GUID in the header if it has
+#   one, from the active extruder otherwise
+def _getJobMaterial(header: GCodeHeader, index: int) -> str:
+    guid = header.getMaterialGuids().get(index)
+    if guid:
+        materials = ContainerRegistry.getInstance().findInstanceContainersMetadata(type = "material", GUID = guid)
+        if materials:
+            return materials[0].get("material", "")
+
+    global_container_stack = CuraApplication.getInstance().getGlobalContainerStack()
+    if global_container_stack is None:
+        return ""
+    extruders = global_container_stack.extruderList
+    if index >= len(extruders):
+        return ""
+    return extruders[index].material.getMetaDataEntry("material", "")
+
+
+def _normalizeMaterial(material: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", material.lower())
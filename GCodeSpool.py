@@ -0,0 +1,388 @@
+try:
+    from PyQt6.QtCore import QIODevice, QTimer
+    QIODeviceOpenModes = QIODevice.OpenModeFlag
+
+except ImportError:
+    from PyQt5.QtCore import QIODevice, QTimer
+    QIODeviceOpenModes = QIODevice
+
+from UM.Job import Job
+from UM.Logger import Logger
+from UM.Mesh.MeshWriter import MeshWriter
+from UM.Signal import Signal, signalemitter
+
+from cura.CuraApplication import CuraApplication
+
+from .GCodePreflight import GCodeHeader
+from .BandwidthScheduler import BandwidthScheduler, TrafficClass
+
+import hashlib
+import os
+import tempfile
+import threading
+import zlib
+
+from typing import IO, List, Optional, Union
+
+
+##  A write-only, file-like sink for GCodeWriter that spools the encoded G-code to a temporary file.
+#   The upload is streamed from the spool by a GCodeSpoolReader, so the G-code never has to be held in memory
+#   as a whole. The spool can be read while it is still being written (from another thread).
+#   If a content encoding is given, the G-code is compressed while it is written, in the writing thread.
+#   A spool can also be opened on an existing, complete file (eg. a queued job); if the spool doesn't own that
+#   file, it is left on disk by remove().
+@signalemitter
+class GCodeSpool:
+    ##  Supported HTTP content encodings, with the matching zlib window bits
+    ContentEncodings = {
+        "gzip": 16 + zlib.MAX_WBITS,
+        "deflate": zlib.MAX_WBITS
+    }
+
+    ##  Emitted whenever data was appended to the spool or writing has finished. This may be emitted from the
+    #   writing thread; the connected functions are called on the main thread.
+    dataWritten = Signal()
+
+    def __init__(self, directory: Optional[str] = None, content_encoding: Optional[str] = None,
+                 path: Optional[str] = None, owned: bool = True) -> None:
+        self._content_encoding = content_encoding
+        self._compressor = None
+        if content_encoding is not None:
+            self._compressor = zlib.compressobj(wbits = self.ContentEncodings[content_encoding])
+
+        self._hash = hashlib.sha256()
+        self._header = GCodeHeader()  # for the pre-flight check of a queued job
+        self._lock = threading.Lock()
+        self._owned = owned
+
+        self._raw_size = 0
+        self._size = 0
+        self._expected_size = -1
+        self._finished = False
+        self._failed = False
+
+        if path is None:
+            handle, self._path = tempfile.mkstemp(prefix = "fabweaver_", suffix = ".gcode", dir = directory)
+            self._file = os.fdopen(handle, "wb")  # type: Optional[IO[bytes]]
+        else:
+            self._path = path
+            self._file = None
+            self._size = self._raw_size = os.path.getsize(path)
+            self._finished = True
+
+        self._device = None  # type: Optional[GCodeSpoolReader]
+
+    ##  Called by GCodeWriter for every chunk of G-code it produces (in text mode)
+    def write(self, data: Union[str, bytes]) -> int:
+        if not self._header.isComplete():
+            self._header.write(data if isinstance(data, str) else data.decode("utf-8", "replace"))
+        body = data.encode() if isinstance(data, str) else data
+        with self._lock:
+            if self._file is None or self._file.closed:
+                raise OSError("G-code spool %s is no longer writable" % self._path)
+            self._raw_size += len(body)
+            self._hash.update(body)
+            if self._compressor is not None:
+                body = self._compressor.compress(body)
+            self._file.write(body)
+            self._file.flush()  # make the data visible to readers before announcing it
+            self._size += len(body)
+        self.dataWritten.emit()
+        return len(data)
+
+    def flush(self) -> None:
+        pass  # every write is flushed already
+
+    ##  Finish writing. The spool fails if writing failed or if less or more data was written than announced.
+    #   \return Whether the spool is complete.
+    def finish(self, success: bool = True) -> bool:
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                if self._compressor is not None:
+                    tail = self._compressor.flush()
+                    self._file.write(tail)
+                    self._size += len(tail)
+                    Logger.log("d", "Compressed %d bytes of G-code to %d bytes (%s)", self._raw_size, self._size, self._content_encoding)
+                self._file.close()
+            else:
+                success = False  # the spool was removed while writing
+            if self._expected_size >= 0 and self._size != self._expected_size:
+                Logger.log("e", "G-code spool size mismatch: expected %d bytes, got %d", self._expected_size, self._size)
+                success = False
+            self._failed = not success
+            self._finished = True
+        self.dataWritten.emit()
+        return success
+
+    def getPath(self) -> str:
+        return self._path
+
+    ##  Number of (compressed) bytes written to the file so far
+    def getSize(self) -> int:
+        return self._size
+
+    ##  Number of bytes of G-code written so far, before compression
+    def getRawSize(self) -> int:
+        return self._raw_size
+
+    def getContentEncoding(self) -> Optional[str]:
+        return self._content_encoding
+
+    ##  SHA-256 of the G-code written (before compression), as a hex string
+    def getDigest(self) -> str:
+        return self._hash.hexdigest()
+
+    ##  The header of the G-code written; empty for a spool opened on an existing file
+    def getHeader(self) -> GCodeHeader:
+        return self._header
+
+    ##  Announce the final size, so the upload can be started with a fixed Content-Length before writing finished
+    def setExpectedSize(self, size: int) -> None:
+        self._expected_size = size
+
+    ##  The final size of the spool, if known; -1 otherwise
+    def getExpectedSize(self) -> int:
+        if self._finished:
+            return self._size
+        return self._expected_size
+
+    ##  Whether the file is deleted with the spool; spools of queued jobs belong to the print queue
+    def isOwned(self) -> bool:
+        return self._owned
+
+    def isFinished(self) -> bool:
+        return self._finished
+
+    def hasFailed(self) -> bool:
+        return self._failed
+
+    ##  Open the spool as a QIODevice that can be handed to QNetworkAccessManager.post().
+    #   The device must stay referenced until the reply has finished.
+    def openDevice(self) -> Optional["GCodeSpoolReader"]:
+        if self._device is not None:
+            self._device.close()
+
+        self._device = self.openReader()
+        return self._device
+
+    ##  Open another reader on the spool, independent of openDevice(), eg. to upload the spool to several
+    #   instances at once. The caller has to close it.
+    def openReader(self) -> Optional["GCodeSpoolReader"]:
+        reader = GCodeSpoolReader(self)
+        if not reader.open(QIODeviceOpenModes.ReadOnly):
+            Logger.log("e", "Could not open G-code spool file %s", self._path)
+            return None
+        return reader
+
+    ##  Stop writing (a writing job will fail on its next write) and delete the file from disk, if it is ours
+    def remove(self) -> None:
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+        if not self._owned:
+            return
+        try:
+            os.remove(self._path)
+        except OSError:
+            Logger.log("w", "Could not remove G-code spool file %s", self._path)
+
+
+##  A sequential QIODevice that reads a GCodeSpool while it is being written, so an upload can be started
+#   before serialization has finished. Reading past the written data blocks the upload until readyRead.
+#   With a BandwidthScheduler, reading is held back the same way to keep the upload within its bandwidth limit.
+class GCodeSpoolReader(QIODevice):
+    def __init__(self, spool: GCodeSpool, parent = None) -> None:
+        super().__init__(parent)
+        self._spool = spool
+        self._file = None
+        self._position = 0
+        self._scheduler = None  # type: Optional[BandwidthScheduler]
+        self._throttled = False
+
+    def getSpool(self) -> GCodeSpool:
+        return self._spool
+
+    def setScheduler(self, scheduler: Optional[BandwidthScheduler]) -> None:
+        self._scheduler = scheduler
+
+    def open(self, mode) -> bool:
+        try:
+            self._file = open(self._spool.getPath(), "rb")
+        except OSError:
+            return False
+        self._spool.dataWritten.connect(self._onDataWritten)
+        return super().open(mode)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._spool.dataWritten.disconnect(self._onDataWritten)
+            self._file.close()
+            self._file = None
+        super().close()
+
+    def isSequential(self) -> bool:
+        return True
+
+    def size(self) -> int:
+        expected_size = self._spool.getExpectedSize()
+        if expected_size >= 0:
+            return expected_size
+        return super().size()
+
+    def bytesAvailable(self) -> int:
+        return self._spool.getSize() - self._position + super().bytesAvailable()
+
+    def atEnd(self) -> bool:
+        return self._spool.isFinished() and self._position >= self._spool.getSize() and super().bytesAvailable() == 0
+
+    def readData(self, max_size: int) -> Optional[bytes]:
+        if self._file is None or self._spool.hasFailed():
+            return None  # signals an error to the reading side
+
+        available = self._spool.getSize() - self._position
+        if available <= 0:
+            if self._spool.isFinished():
+                return None  # the end of a sequential device; Qt keeps waiting for data as long as read() returns 0
+            return b""
+        size = min(max_size, available)
+        if self._scheduler is not None:
+            size = self._scheduler.take(TrafficClass.Upload, size)
+            if size <= 0:
+                if not self._throttled:
+                    self._throttled = True
+                    QTimer.singleShot(self._scheduler.getDelay(TrafficClass.Upload), self._onThrottleTimeout)
+                return b""
+        data = self._file.read(size)
+        self._position += len(data)
+        return data
+
+    def writeData(self, data: bytes) -> int:
+        return -1
+
+    def _onThrottleTimeout(self) -> None:
+        self._throttled = False
+        self._onDataWritten()
+
+    def _onDataWritten(self) -> None:
+        if self.isOpen():
+            self.readyRead.emit()
+            if self.atEnd():
+                self.readChannelFinished.emit()
+
+
+##  A file-like sink that only counts the encoded size of what GCodeWriter writes to it, and hashes it if asked to.
+#   It also collects the G-code header, for the pre-flight check of the job.
+class GCodeSizeCounter:
+    def __init__(self, digest: bool = True) -> None:
+        self._size = 0
+        self._hash = hashlib.sha256() if digest else None
+        self._header = GCodeHeader()
+
+    def write(self, data: Union[str, bytes]) -> int:
+        if not self._header.isComplete():
+            self._header.write(data if isinstance(data, str) else data.decode("utf-8", "replace"))
+        if self._hash is None and isinstance(data, str) and data.isascii():
+            self._size += len(data)  # as long encoded; G-code nearly always is ASCII
+            return len(data)
+        body = data.encode() if isinstance(data, str) else data
+        if self._hash is not None:
+            self._hash.update(body)
+        self._size += len(body)
+        return len(data)
+
+    def getSize(self) -> int:
+        return self._size
+
+    def getHeader(self) -> GCodeHeader:
+        return self._header
+
+    ##  SHA-256 of the G-code, as a hex string; empty if it was not hashed
+    def getDigest(self) -> str:
+        return self._hash.hexdigest() if self._hash is not None else ""
+
+
+##  Runs GCodeWriter in a background thread, so serializing large jobs doesn't block the GUI.
+#   GCodeWriter writes through the job into the actual stream, which lets the job count the written chunks
+#   (for progress) and stop writing when it is cancelled. A GCodeSpool is finished when writing is done.
+#   As with any Job, the finished signal is handled on the main thread.
+class GCodeWriteJob(Job):
+    def __init__(self, writer: MeshWriter, stream: Union[GCodeSpool, GCodeSizeCounter, IO[str]]) -> None:
+        super().__init__()
+        self._writer = writer
+        self._stream = stream
+        self._write_count = 0
+        self._cancelled = False
+
+    def getStream(self) -> Union[GCodeSpool, GCodeSizeCounter, IO[str]]:
+        return self._stream
+
+    def getWriter(self) -> MeshWriter:
+        return self._writer
+
+    ##  Number of chunks GCodeWriter has written so far
+    def getWriteCount(self) -> int:
+        return self._write_count
+
+    ##  Make GCodeWriter fail on its next write
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def isCancelled(self) -> bool:
+        return self._cancelled
+
+    def write(self, data: str) -> int:
+        if self._cancelled:
+            raise OSError("Writing G-code was cancelled")
+        self._write_count += 1
+        return self._stream.write(data)
+
+    def run(self) -> None:
+        try:
+            result = self._writer.write(self, None)
+        except OSError as e:
+            Logger.log("w", "Writing G-code was stopped: %s", str(e))
+            result = False
+        if isinstance(self._stream, GCodeSpool):
+            result = self._stream.finish(result)
+        self.setResult(result)
+
+
+##  Measures the G-code GCodeWriter would write into a GCodeSizeCounter, without running GCodeWriter: the chunks the
+#   backend produced for the active build plate are fed to the counter as they are, followed by the settings that
+#   GCodeWriter appends (serialized the way it does). Unless the counter hashes, that only takes the length of every
+#   chunk, so the upload can start right away instead of after a full serialization pass.
+#   If the chunks can't be had this way, GCodeWriter is run after all.
+class GCodeMeasureJob(GCodeWriteJob):
+    def run(self) -> None:
+        gcode_list = getActiveGCodeList()
+        serialise_settings = getattr(self._writer, "_serialiseSettings", None)
+        if gcode_list is None or serialise_settings is None:
+            super().run()
+            return
+
+        setting_keyword = getattr(self._writer, "_setting_keyword", ";SETTING_")
+        try:
+            has_settings = False
+            for gcode in gcode_list:
+                if gcode[:len(setting_keyword)] == setting_keyword:
+                    has_settings = True
+                self.write(gcode)
+            if not has_settings:
+                self.write(serialise_settings(CuraApplication.getInstance().getGlobalContainerStack()))
+        except OSError as e:
+            Logger.log("w", "Measuring G-code was stopped: %s", str(e))
+            self.setResult(False)
+            return
+        self.setResult(True)
+
+
+##  The G-code chunks of the active build plate, as GCodeWriter writes them; None if there is no G-code
+def getActiveGCodeList() -> Optional[List[str]]:
+    application = CuraApplication.getInstance()
+    gcode_dict = getattr(application.getController().getScene(), "gcode_dict", None)
+    if not gcode_dict:
+        return None
+    return gcode_dict.get(application.getMultiBuildPlateModel().activeBuildPlate, None)
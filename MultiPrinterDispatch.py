@@ -0,0 +1,261 @@
+from UM.i18n import i18nCatalog
+from UM.Logger import Logger
+from UM.Message import Message
+from UM.Mesh.MeshWriter import MeshWriter
+from UM.PluginRegistry import PluginRegistry
+
+from cura.CuraApplication import CuraApplication
+
+from .GCodePreflight import GCodeHeader
+from .GCodeSpool import GCodeSpool, GCodeWriteJob, GCodeMeasureJob, GCodeSizeCounter
+
+import os.path
+
+from typing import cast, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .FabWeaverOutputDevice import FabWeaverOutputDevice
+    from .PrinterStatus import PrinterStatus
+
+i18n_catalog = i18nCatalog("cura")
+
+
+##  Sends the current job to several fabWeaver instances at once.
+#   The G-code is serialized only once: its size is measured from the chunks of the backend (see GCodeMeasureJob),
+#   after which it is written to a single spool file that all instances upload from concurrently, each through its
+#   own reader. So neither the time to serialize nor the memory used grows with the number of instances.
+#   As for a job sent to one instance, every instance is asked for a fresh status first: an instance that is busy
+#   or offline gets the job in its print queue (if jobs are queued) instead of a print command.
+class MultiPrinterDispatch:
+    def __init__(self, devices: List["FabWeaverOutputDevice"]) -> None:
+        self._devices = devices
+        self._connected_devices = []  # type: List[FabWeaverOutputDevice]  # connected for this dispatch only
+
+        self._file_name = ""
+        self._spool = None  # type: Optional[GCodeSpool]
+        self._spooled = False
+        self._header = None  # type: Optional[GCodeHeader]
+        self._job = None  # type: Optional[GCodeWriteJob]
+        self._cancelled = False
+        self._finished = False
+
+        # Instances whose fresh status allows sending the job now, and those that get it in their print queue
+        self._sending_devices = []  # type: List[FabWeaverOutputDevice]
+        self._queueing_devices = []  # type: List[FabWeaverOutputDevice]
+
+        self._progress = {}  # type: Dict[str, Tuple[int, int]]  # bytes sent and total, per instance
+        self._results = {}  # type: Dict[str, str]  # error string per finished instance, empty if it succeeded
+        self._queued = set()  # type: Set[str]  # instances that got the job in their print queue
+        self._progress_message = None  # type: Optional[Message]
+
+    def start(self) -> None:
+        for device in self._devices:
+            if not device.isConnected():
+                device.connect()
+                self._connected_devices.append(device)
+            # Make sure post-processing plugins are run on the G-code, as for a job sent to one device. They mark
+            # the G-code they processed, so it is only processed once.
+            device.writeStarted.emit(device)
+
+        print_info = CuraApplication.getInstance().getPrintInformation()
+        job_name = print_info.jobName.strip()
+        if job_name == "":
+            job_name = "untitled_print"
+        self._file_name = "%s.%s" % (os.path.basename(job_name), "gcode")
+
+        self._progress_message = Message(
+            i18n_catalog.i18nc("@info:status", "Preparing data for {0} fabWeaver printers").format(len(self._devices)),
+            title=i18n_catalog.i18nc("@label", "fabWeaver"),
+            progress=-1, lifetime=0, dismissable=False, use_inactivity_timer=False
+        )
+        self._progress_message.addAction(
+            "cancel", i18n_catalog.i18nc("@action:button", "Cancel"), "",
+            i18n_catalog.i18nc("@action:tooltip", "Abort the printjob")
+        )
+        self._progress_message.actionTriggered.connect(self._onMessageActionTriggered)
+        self._progress_message.show()
+
+        # The spool hashes the G-code for the upload index; measuring it doesn't need to
+        self._startJob(GCodeSizeCounter(digest = False), self._onMeasured)
+
+        # The printers may have been taken since their last poll; decide on their current status
+        for device in self._devices:
+            device.requestFreshStatus(lambda status, device = device: self._onDeviceStatus(device, status))
+
+    def isFinished(self) -> bool:
+        return self._finished
+
+    def cancel(self) -> None:
+        self._cancelled = True
+        for device in self._devices:
+            device.abortSharedUpload()
+        self._finish()
+
+    def _startJob(self, stream, on_finished) -> None:
+        gcode_writer = cast(MeshWriter, PluginRegistry.getInstance().getPluginObject("GCodeWriter"))
+        if isinstance(stream, GCodeSizeCounter):
+            self._job = GCodeMeasureJob(gcode_writer, stream)  # type: GCodeWriteJob
+        else:
+            self._job = GCodeWriteJob(gcode_writer, stream)
+        self._job.finished.connect(on_finished)
+        self._job.start()
+
+    def _onMeasured(self, job: GCodeWriteJob) -> None:
+        if job is not self._job or self._cancelled:
+            return
+        self._job = None
+        if not job.getResult():
+            Logger.log("e", "GCodeWrite failed: %s" % job.getWriter().getInformation())
+            self._fail(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver."))
+            return
+
+        try:
+            self._spool = GCodeSpool()
+        except OSError:
+            Logger.logException("e", "Could not create a spool file for the G-code")
+            self._fail(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver."))
+            return
+        size_counter = cast(GCodeSizeCounter, job.getStream())
+        self._header = size_counter.getHeader()
+        self._spool.setExpectedSize(size_counter.getSize())
+        self._startJob(self._spool, self._onSpooled)
+
+        if self._progress_message:
+            self._progress_message.setText(i18n_catalog.i18nc("@info:status", "Sending data to {0} fabWeaver printers").format(len(self._devices)))
+
+        # The uploads stream from the spool while it is being written
+        for device in list(self._sending_devices):
+            self._sendJob(device)
+
+    def _onSpooled(self, job: GCodeWriteJob) -> None:
+        if job is not self._job or self._cancelled:
+            return
+        self._job = None
+        if not job.getResult():
+            Logger.log("e", "GCodeWrite failed: %s" % job.getWriter().getInformation())
+            for device in self._devices:
+                device.abortSharedUpload()
+            self._fail(i18n_catalog.i18nc("@info:status", "Unable to send data to fabWeaver."))
+            return
+
+        # A queue gets a copy of the complete G-code
+        self._spooled = True
+        for device in list(self._queueing_devices):
+            self._queueJob(device)
+
+    ##  Send the job, queue it, or report why it can't be printed, as requestWrite does for one instance
+    def _onDeviceStatus(self, device: "FabWeaverOutputDevice", status: Optional["PrinterStatus"]) -> None:
+        if self._finished:
+            return
+        error_string = device.getWriteError(status)
+        if device.shouldQueueJob(error_string):
+            self._queueing_devices.append(device)
+            if self._spooled:
+                self._queueJob(device)
+        elif error_string:
+            self._onDeviceFinished(device.getId(), error_string)
+        else:
+            self._sending_devices.append(device)
+            if self._spool is not None:
+                self._sendJob(device)
+
+    def _sendJob(self, device: "FabWeaverOutputDevice") -> None:
+        device_id = device.getId()
+        # Checked against the status the instance just reported
+        error_string = device.findMaterialMismatch(self._header) if self._header is not None else ""
+        if error_string:
+            self._onDeviceFinished(device_id, error_string)
+            return
+        self._progress[device_id] = (0, self._spool.getExpectedSize())
+        started = device.sendSharedGCode(
+            self._spool, self._file_name,
+            on_finished = lambda success, error_string, device_id = device_id: self._onDeviceFinished(device_id, error_string),
+            on_progress = lambda bytes_sent, bytes_total, device_id = device_id: self._onDeviceProgress(device_id, bytes_sent, bytes_total)
+        )
+        if not started:
+            self._onDeviceFinished(device_id, i18n_catalog.i18nc("@info:status", "is busy sending another job."))
+
+    def _queueJob(self, device: "FabWeaverOutputDevice") -> None:
+        device_id = device.getId()
+        if not device.queueSharedGCode(self._spool, self._file_name):
+            self._onDeviceFinished(device_id, i18n_catalog.i18nc("@info:status", "Unable to add the job to the fabWeaver print queue."))
+            return
+        self._queued.add(device_id)
+        self._onDeviceFinished(device_id, "")
+
+    def _onDeviceProgress(self, device_id: str, bytes_sent: int, bytes_total: int) -> None:
+        if bytes_total <= 0 or not self._progress_message:
+            return
+        self._progress[device_id] = (bytes_sent, bytes_total)
+        self._updateProgressMessage()
+
+    def _onDeviceFinished(self, device_id: str, error_string: str) -> None:
+        if self._cancelled or device_id in self._results:
+            return
+        self._results[device_id] = error_string
+        self._updateProgressMessage()
+        if len(self._results) == len(self._devices):
+            self._showResults()
+            self._finish()
+
+    def _updateProgressMessage(self) -> None:
+        if not self._progress_message:
+            return
+
+        lines = []
+        for device in self._devices:
+            device_id = device.getId()
+            if device_id in self._queued:
+                status = i18n_catalog.i18nc("@info:status", "queued")
+            elif device_id in self._results:
+                status = i18n_catalog.i18nc("@info:status", "failed") if self._results[device_id] else i18n_catalog.i18nc("@info:status", "sent")
+            else:
+                bytes_sent, bytes_total = self._progress.get(device_id, (0, 0))
+                status = "%d%%" % (bytes_sent * 100 / bytes_total if bytes_total > 0 else 0)
+            lines.append("%s: %s" % (device_id, status))
+        self._progress_message.setText("\n".join(lines))
+
+        # The overall progress is that of the slowest instance that is still uploading
+        uploading = [bytes_sent * 100 / bytes_total for device_id, (bytes_sent, bytes_total) in self._progress.items()
+                     if device_id not in self._results and bytes_total > 0]
+        if uploading:
+            self._progress_message.setProgress(min(uploading))
+
+    def _showResults(self) -> None:
+        lines = []
+        for device in self._devices:
+            error_string = self._results.get(device.getId(), "")
+            if error_string:
+                lines.append(i18n_catalog.i18nc("@info:status", "{0}: {1}").format(device.getId(), error_string))
+            elif device.getId() in self._queued:
+                lines.append(i18n_catalog.i18nc("@info:status", "{0}: {1} was added to the print queue").format(device.getId(), self._file_name))
+            else:
+                lines.append(i18n_catalog.i18nc("@info:status", "{0}: printing {1}").format(device.getId(), self._file_name))
+        Message(
+            "\n".join(lines),
+            title=i18n_catalog.i18nc("@label", "fabWeaver")
+        ).show()
+
+    def _fail(self, error_string: str) -> None:
+        Message(error_string, title=i18n_catalog.i18nc("@label", "fabWeaver error")).show()
+        self._cancelled = True
+        self._finish()
+
+    def _finish(self) -> None:
+        self._finished = True
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        if self._progress_message:
+            self._progress_message.hide()
+            self._progress_message = None
+        if self._spool is not None:
+            self._spool.remove()
+            self._spool = None
+        for device in self._connected_devices:
+            device.close()
+        self._connected_devices = []
+
+    def _onMessageActionTriggered(self, message: Message, action_id: str) -> None:
+        if action_id == "cancel":
+            Logger.log("d", "Stopped sending to %d instances because the user pressed cancel.", len(self._devices))
+            self.cancel()
@@ -1,29 +1,33 @@
 try:
-    from PyQt6.QtCore import QUrl, pyqtProperty, pyqtSignal, pyqtSlot, QRect, QByteArray
+    from PyQt6.QtCore import QUrl, pyqtProperty, pyqtSignal, pyqtSlot, QRect, QByteArray, QTimer
     from PyQt6.QtGui import QImage, QPainter
     from PyQt6.QtQuick import QQuickPaintedItem
-    from PyQt6.QtNetwork import QNetworkRequest, QNetworkReply, QNetworkAccessManager, QSslConfiguration, QSslSocket
+    from PyQt6.QtNetwork import QNetworkRequest, QNetworkReply, QNetworkAccessManager
     QNetworkRequestAttributes = QNetworkRequest.Attribute
-    QSslSocketPeerVerifyModes = QSslSocket.PeerVerifyMode
 
 except ImportError:
-    from PyQt5.QtCore import QUrl, pyqtProperty, pyqtSignal, pyqtSlot, QRect, QByteArray
+    from PyQt5.QtCore import QUrl, pyqtProperty, pyqtSignal, pyqtSlot, QRect, QByteArray, QTimer
     from PyQt5.QtGui import QImage, QPainter
     from PyQt5.QtQuick import QQuickPaintedItem
-    from PyQt5.QtNetwork import QNetworkRequest, QNetworkReply, QNetworkAccessManager, QSslConfiguration, QSslSocket
+    from PyQt5.QtNetwork import QNetworkRequest, QNetworkReply, QNetworkAccessManager
     QNetworkRequestAttributes = QNetworkRequest.Attribute
-    QSslSocketPeerVerifyModes = QSslSocket
 
 from cura.CuraApplication import CuraApplication
 from UM.Logger import Logger
 
+from .BandwidthScheduler import BandwidthScheduler, TrafficClass
+from .NetworkTransport import NetworkTransport
+
 import base64
 
 #
 # A QQuickPaintedItem that progressively downloads a network mjpeg stream,
 # picks it apart in individual jpeg frames, and paints it.
+# The stream is read within the camera budget of the BandwidthScheduler of its host;
+# what isn't read stays in a bounded read buffer, so the stream is slowed down by TCP.
 #
 class NetworkMJPGImage(QQuickPaintedItem):
+    ReadBufferSize = 256 * 1024
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
@@ -33,6 +37,8 @@ class NetworkMJPGImage(QQuickPaintedItem):
         self._network_manager = None  # type: QNetworkAccessManager
         self._image_request = None  # type: QNetworkRequest
         self._image_reply = None  # type: QNetworkReply
+        self._scheduler = None  # type: BandwidthScheduler
+        self._read_pending = False
         self._image = QImage()
         self._image_rect = QRect()
 
@@ -115,16 +121,20 @@ class NetworkMJPGImage(QQuickPaintedItem):
         if auth_data:
             self._image_request.setRawHeader(b"Authorization", ("basic %s" % auth_data).encode())
 
-        if self._source_url.scheme().lower() == "https":
-            # ignore SSL errors (eg for self-signed certificates)
-            ssl_configuration = QSslConfiguration.defaultConfiguration()
-            ssl_configuration.setPeerVerifyMode(QSslSocketPeerVerifyModes.VerifyNone)
-            self._image_request.setSslConfiguration(ssl_configuration)
+        # ignores SSL errors (eg for self-signed certificates)
+        transport = NetworkTransport.getInstance()
+        transport.prepareRequest(self._image_request)
 
         if self._network_manager is None:
-            self._network_manager = QNetworkAccessManager()
+            # Shared with the devices, so a restarted stream can reuse the connection and TLS session
+            self._network_manager = transport.getManager()
+
+        self._scheduler = BandwidthScheduler.getInstance(self._source_url.host())
+        self._image_request.setPriority(self._scheduler.getRequestPriority(TrafficClass.Camera))
 
         self._image_reply = self._network_manager.get(self._image_request)
+        transport.track(self._image_reply)
+        self._image_reply.setReadBufferSize(self.ReadBufferSize)
         self._image_reply.downloadProgress.connect(self._onStreamDownloadProgress)
 
         self._started = True
@@ -134,6 +144,7 @@ class NetworkMJPGImage(QQuickPaintedItem):
     def stopStream(self) -> None:
         self._stream_buffer = QByteArray()
         self._stream_buffer_start_index = -1
+        self._read_pending = False  # or a restarted stream would wait for the read of the old one
 
         if not self._source_url:
             Logger.log("w", "Unable to start camera stream without target!")
@@ -166,11 +177,27 @@ class NetworkMJPGImage(QQuickPaintedItem):
         return False
 
     def _onStreamDownloadProgress(self, bytes_received: int, bytes_total: int) -> None:
+        if not self._read_pending:
+            self._readStream()
+
+    def _onReadTimeout(self) -> None:
+        self._read_pending = False
+        self._readStream()
+
+    def _readStream(self) -> None:
         # An MJPG stream is (for our purpose) a stream of concatenated JPG images.
         # JPG images start with the marker 0xFFD8, and end with 0xFFD9
         if self._image_reply is None:
             return
-        self._stream_buffer += self._image_reply.readAll()
+        available = self._image_reply.bytesAvailable()
+        allowed = self._scheduler.take(TrafficClass.Camera, available) if self._scheduler else available
+        if allowed < available:
+            # Over budget; read the rest later
+            self._read_pending = True
+            QTimer.singleShot(self._scheduler.getDelay(TrafficClass.Camera), self._onReadTimeout)
+        if allowed <= 0:
+            return
+        self._stream_buffer += self._image_reply.read(allowed)
 
         if len(self._stream_buffer) > 5000000:  # No single camera frame should be 5 MB or larger
             Logger.log("w", "MJPEG buffer exceeds reasonable size. Restarting stream...")
@@ -0,0 +1,125 @@
+try:
+    from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest, QSsl, QSslConfiguration, QSslSocket
+    QNetworkRequestAttributes = QNetworkRequest.Attribute
+    QSslSocketPeerVerifyModes = QSslSocket.PeerVerifyMode
+    QSslOptions = QSsl.SslOption
+    try:
+        from PyQt6.QtNetwork import QHttp1Configuration  # Qt 6.5 and later
+    except ImportError:
+        QHttp1Configuration = None
+
+except ImportError:
+    from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest, QSsl, QSslConfiguration, QSslSocket
+    QNetworkRequestAttributes = QNetworkRequest
+    QSslSocketPeerVerifyModes = QSslSocket
+    QSslOptions = QSsl
+    QHttp1Configuration = None
+
+from UM.Logger import Logger
+
+from cura.CuraApplication import CuraApplication
+
+from typing import Any, Dict, Optional
+
+
+##  The network transport shared by all instances and their camera streams, owned by the plugin.
+#   Qt keeps HTTP connections alive and reuses them for the next request to the same host, but only within one
+#   QNetworkAccessManager. With a single manager, the polls, commands and uploads of a device reuse each other's
+#   connections, a device that reconnects doesn't start from scratch, and a restarted camera stream doesn't need a
+#   new manager. TLS sessions are kept, so a new connection to an instance with useHttps resumes the session
+#   instead of doing a full handshake.
+#   The number of connections per host is capped where Qt allows it (6.5 and later), and HTTP/2 is used if the
+#   preference fabWeaver/http2 is set and the instance supports it.
+#   The requests, new connections and TLS handshakes are counted per host (new connections from Qt 6.3 on).
+#   Job commands (pause, resume, stop) have a manager of their own: Qt pools connections per manager, so a command
+#   gets its own connection and never waits behind an upload on the connections of the main manager.
+class NetworkTransport:
+    MaxConnectionsPerHost = 4
+
+    _instance = None  # type: Optional[NetworkTransport]
+
+    def __init__(self) -> None:
+        self._manager = QNetworkAccessManager()
+        self._manager.authenticationRequired.connect(self._onAuthenticationRequired)
+        self._command_manager = QNetworkAccessManager()
+        self._command_manager.authenticationRequired.connect(self._onAuthenticationRequired)
+        self._ssl_configuration = None  # type: Optional[QSslConfiguration]
+        self._statistics = {}  # type: Dict[str, Dict[str, int]]
+
+    @classmethod
+    def getInstance(cls) -> "NetworkTransport":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def getManager(self) -> QNetworkAccessManager:
+        return self._manager
+
+    ##  The manager for job commands, see FabWeaverOutputDevice._sendJobCommand
+    def getCommandManager(self) -> QNetworkAccessManager:
+        return self._command_manager
+
+    ##  Open the connection of the command manager to a host ahead of time, so a command doesn't have to wait for
+    #   the connection (and TLS handshake) to be set up
+    def warmUpCommandConnection(self, scheme: str, host: str, port: int) -> None:
+        if scheme.lower() == "https":
+            self._command_manager.connectToHostEncrypted(host, port, self.getSslConfiguration())
+        else:
+            self._command_manager.connectToHost(host, port)
+
+    ##  The SSL configuration for requests to instances: self-signed certificates are accepted, and sessions are kept
+    #   for resumption
+    def getSslConfiguration(self) -> QSslConfiguration:
+        if self._ssl_configuration is None:
+            ssl_configuration = QSslConfiguration.defaultConfiguration()
+            # ignore SSL errors (eg for self-signed certificates)
+            ssl_configuration.setPeerVerifyMode(QSslSocketPeerVerifyModes.VerifyNone)
+            ssl_configuration.setSslOption(QSslOptions.SslOptionDisableSessionPersistence, False)
+            self._ssl_configuration = ssl_configuration
+        return self._ssl_configuration
+
+    ##  Set what the transport decides for a request: the SSL configuration, HTTP/2 and the connection limit
+    def prepareRequest(self, request: QNetworkRequest) -> None:
+        if request.url().scheme().lower() == "https":
+            request.setSslConfiguration(self.getSslConfiguration())
+
+        http2_attribute = getattr(QNetworkRequestAttributes, "Http2AllowedAttribute", None) or \
+                          getattr(QNetworkRequestAttributes, "HTTP2AllowedAttribute", None)
+        if http2_attribute is not None:
+            request.setAttribute(http2_attribute, bool(CuraApplication.getInstance().getPreferences().getValue("fabWeaver/http2")))
+
+        if QHttp1Configuration is not None:
+            http1_configuration = QHttp1Configuration()
+            http1_configuration.setNumberOfConnectionsPerHost(self.MaxConnectionsPerHost)
+            request.setHttp1Configuration(http1_configuration)
+
+    ##  Count a request, and the connection and TLS handshake it may cause
+    def track(self, reply: QNetworkReply) -> None:
+        statistics = self._getStatistics(reply.url().host())
+        statistics["requests"] += 1
+        reply.encrypted.connect(lambda: self._increment(statistics, "tls_handshakes"))
+        if hasattr(reply, "socketStartedConnecting"):
+            reply.socketStartedConnecting.connect(lambda: self._increment(statistics, "connections"))
+
+    ##  The counts of requests, new connections and TLS handshakes, by host. New connections are only counted with
+    #   Qt 6.3 and later; "connections" is -1 otherwise.
+    def getStatistics(self) -> Dict[str, Dict[str, Any]]:
+        can_count_connections = hasattr(QNetworkReply, "socketStartedConnecting")
+        result = {}
+        for host, statistics in self._statistics.items():
+            result[host] = dict(statistics)
+            if not can_count_connections:
+                result[host]["connections"] = -1
+        return result
+
+    def _getStatistics(self, host: str) -> Dict[str, int]:
+        if host not in self._statistics:
+            self._statistics[host] = {"requests": 0, "connections": 0, "tls_handshakes": 0}
+        return self._statistics[host]
+
+    @staticmethod
+    def _increment(statistics: Dict[str, int], key: str) -> None:
+        statistics[key] += 1
+
+    def _onAuthenticationRequired(self, reply: QNetworkReply, authenticator: Any) -> None:
+        Logger.log("w", "Request to %s required authentication, which was not provided", reply.url().toString())
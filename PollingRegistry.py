@@ -0,0 +1,123 @@
+try:
+    from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestPriorities = QNetworkRequest.Priority
+except ImportError:
+    from PyQt5.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestPriorities = QNetworkRequest
+
+from time import monotonic
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+##  An endpoint of the instance that is polled, with its own interval, priority and decoder, and the statistics
+#   of its requests.
+class PolledEndPoint:
+    def __init__(self, end_point: str, decoder: Callable[[QNetworkReply], None], interval: Optional[int] = None,
+                 priority: "QNetworkRequest.Priority" = QNetworkRequestPriorities.NormalPriority) -> None:
+        self.end_point = end_point
+        self.decoder = decoder
+        self.interval = interval  # ms; None to poll on every tick of the update timer
+        self.priority = priority
+
+        # The poll in flight, if any; an endpoint is polled once at a time
+        self.reply = None  # type: Optional[QNetworkReply]
+        self.sequence = 0  # of the poll in flight
+        self.sent_time = 0.0
+        # The sequence number of the last reply (or pushed data) that was applied; older replies are discarded
+        self.applied_sequence = 0
+        self.last_poll_time = None  # type: Optional[float]
+
+        self.request_count = 0
+        self.reply_count = 0
+        self.error_count = 0
+        self.joined_count = 0  # polls that waited for the one in flight instead
+        self.discarded_count = 0  # replies older than what was applied already
+        self.last_latency = 0.0  # ms
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def isDue(self, now: float) -> bool:
+        if self.interval is None or self.last_poll_time is None:
+            return True
+        return (now - self.last_poll_time) * 1000 >= self.interval
+
+    def isInFlight(self) -> bool:
+        return self.reply is not None
+
+    def onSent(self, reply: QNetworkReply, sequence: int) -> None:
+        self.reply = reply
+        self.sequence = sequence
+        self.sent_time = self.last_poll_time = monotonic()
+        self.request_count += 1
+
+    ##  The reply of the poll in flight has finished
+    #   \param success Whether the instance answered with a reply that could be handled
+    def onFinished(self, success: bool) -> None:
+        latency = (monotonic() - self.sent_time) * 1000
+        self.reply = None
+        self.reply_count += 1
+        if not success:
+            self.error_count += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._total_latency += latency
+
+    ##  The poll in flight was given up on
+    def onAbandoned(self) -> None:
+        self.reply = None
+        self.error_count += 1
+
+    def getStatistics(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "requests": self.request_count,
+            "replies": self.reply_count,
+            "errors": self.error_count,
+            "joined": self.joined_count,
+            "discarded": self.discarded_count,
+            "last_latency": self.last_latency,
+            "mean_latency": self._total_latency / self.reply_count if self.reply_count else 0.0,
+            "max_latency": self.max_latency
+        }
+
+
+##  The endpoints a device polls. Fast changing data (the printer status) is polled on every tick of the update
+#   timer, whose interval follows the state of the printer (see PollingScheduler); slow changing data can be
+#   registered with an interval of its own, so it is fetched rarely.
+class PollingRegistry:
+    def __init__(self) -> None:
+        self._end_points = {}  # type: Dict[str, PolledEndPoint]
+
+    def register(self, end_point: str, decoder: Callable[[QNetworkReply], None], interval: Optional[int] = None,
+                 priority: "QNetworkRequest.Priority" = QNetworkRequestPriorities.NormalPriority) -> PolledEndPoint:
+        polled_end_point = PolledEndPoint(end_point, decoder, interval, priority)
+        self._end_points[end_point] = polled_end_point
+        return polled_end_point
+
+    ##  Stop polling an endpoint. The reply of a poll in flight is not handled anymore.
+    def unregister(self, end_point: str) -> None:
+        polled_end_point = self._end_points.pop(end_point, None)
+        if polled_end_point is not None and polled_end_point.reply is not None:
+            polled_end_point.reply.abort()
+
+    def get(self, end_point: str) -> Optional[PolledEndPoint]:
+        return self._end_points.get(end_point)
+
+    def getEndPoints(self) -> List[PolledEndPoint]:
+        return list(self._end_points.values())
+
+    ##  The endpoints that are due to be polled, most important first
+    def getDueEndPoints(self) -> List[PolledEndPoint]:
+        now = monotonic()
+        due = [polled_end_point for polled_end_point in self._end_points.values() if polled_end_point.isDue(now)]
+        return sorted(due, key = lambda polled_end_point: _priorityValue(polled_end_point.priority))
+
+    ##  The statistics of the requests of every endpoint, by endpoint
+    def getStatistics(self) -> Dict[str, Dict[str, Any]]:
+        return {end_point: polled_end_point.getStatistics() for end_point, polled_end_point in self._end_points.items()}
+
+
+##  Qt sends requests of a lower priority value first
+def _priorityValue(priority: "QNetworkRequest.Priority") -> int:
+    return getattr(priority, "value", priority)
@@ -0,0 +1,95 @@
+try:
+    from PyQt6.QtCore import QTimer
+except ImportError:
+    from PyQt5.QtCore import QTimer
+
+from UM.Logger import Logger
+
+from cura.CuraApplication import CuraApplication
+
+import json
+import random
+from time import monotonic
+
+from typing import Any, Dict
+
+from .PrinterStatus import PrinterStatus
+
+
+##  Picks the interval of the status polls of a device from the state of its printer:
+#   fast while it is printing or heating, slow while it is idle, and backing off exponentially (with jitter, so a shop
+#   full of printers doesn't poll in lockstep) while the instance is offline or failing. After a command of the user
+#   the printer is polled fast for a while, so the result shows up quickly.
+#   The intervals (in ms) can be set in the preference fabWeaver/polling_intervals, a JSON object with the intervals
+#   for all devices under "*" and those for a single device under its id, eg. {"*": {"idle": 20000}}.
+class PollingScheduler:
+    DefaultIntervals = {
+        "active": 2000,  # printing, heating, or busy otherwise
+        "idle": 10000,
+        "error": 5000,  # the first retry while offline; doubled after every failure
+        "max_error": 60000,
+        "command": 1000,  # after a command
+        "command_duration": 10000  # how long to poll at the command interval
+    }  # type: Dict[str, int]
+
+    Jitter = 0.2  # fraction of the interval
+
+    ActiveStates = ["printing", "paused", "pausing", "aborted", "error"]
+
+    def __init__(self, device_id: str, timer: QTimer) -> None:
+        self._device_id = device_id
+        self._timer = timer
+        self._failures = 0
+        self._state_interval = self.getInterval("active")
+        self._command_until = 0.0
+
+    ##  The configured interval of a kind, in ms
+    def getInterval(self, kind: str) -> int:
+        intervals = self._loadIntervals()
+        for key in [self._device_id, "*"]:
+            value = intervals.get(key, {}).get(kind) if isinstance(intervals.get(key), dict) else None
+            if isinstance(value, (int, float)) and value > 0:
+                return int(value)
+        return self.DefaultIntervals[kind]
+
+    ##  A status reply was received
+    def onStatus(self, status: PrinterStatus) -> None:
+        self._failures = 0
+        heating = status.bed_temperature_target > 0 or any(nozzle.temperature_target > 0 for nozzle in status.nozzles or [])
+        if status.printer_state in self.ActiveStates or heating:
+            self._state_interval = self.getInterval("active")
+        else:
+            self._state_interval = self.getInterval("idle")
+        self._apply()
+
+    ##  A poll failed: no reply, an error, or the instance is not operational
+    def onError(self) -> None:
+        self._failures += 1
+        interval = min(self.getInterval("max_error"), self.getInterval("error") * 2 ** (self._failures - 1))
+        self._state_interval = int(interval * random.uniform(1 - self.Jitter, 1 + self.Jitter))
+        if self._failures == 1:
+            Logger.log("d", "Polling fabWeaver on %s failed, backing off", self._device_id)
+        self._apply()
+
+    ##  The user sent a command; poll fast for a while
+    def onCommand(self) -> None:
+        self._command_until = monotonic() + self.getInterval("command_duration") / 1000
+        self._apply()
+
+    def getCurrentInterval(self) -> int:
+        if self._failures == 0 and monotonic() < self._command_until:
+            return min(self._state_interval, self.getInterval("command"))
+        return self._state_interval
+
+    def _apply(self) -> None:
+        interval = self.getCurrentInterval()
+        if interval != self._timer.interval():
+            self._timer.setInterval(interval)
+
+    @staticmethod
+    def _loadIntervals() -> Dict[str, Any]:
+        try:
+            intervals = json.loads(CuraApplication.getInstance().getPreferences().getValue("fabWeaver/polling_intervals"))
+        except (TypeError, ValueError):
+            return {}
+        return intervals if isinstance(intervals, dict) else {}
@@ -0,0 +1,94 @@
+from UM.Logger import Logger
+from UM.Resources import Resources
+
+import json
+import os
+import re
+
+from typing import Any, Dict, List, Optional
+
+
+##  A persistent, per-instance queue of print jobs waiting for the printer to become available.
+#   The G-code of every job is spooled into the queue directory, and the queue itself is kept in queue.json
+#   next to it, so queued jobs survive a restart of Cura.
+class PrintQueue:
+    def __init__(self, device_id: str) -> None:
+        self._directory = os.path.join(Resources.getCacheStoragePath(), "fabweaver_queue", re.sub(r"[^\w.-]", "_", device_id))
+        self._queue_file_path = os.path.join(self._directory, "queue.json")
+        self._jobs = []  # type: List[Dict[str, Any]]
+        self._load()
+
+    ##  The directory to spool the G-code of new jobs into
+    def getDirectory(self) -> str:
+        os.makedirs(self._directory, exist_ok = True)
+        return self._directory
+
+    def getJobCount(self) -> int:
+        return len(self._jobs)
+
+    def isEmpty(self) -> bool:
+        return not self._jobs
+
+    ##  \param header What the pre-flight check needs of the G-code header (see GCodeHeader.toDict)
+    def add(self, file_name: str, spool_path: str, digest: str, header: Optional[Dict[str, Any]] = None) -> None:
+        self._jobs.append({
+            "file_name": file_name,
+            "spool": spool_path,
+            "digest": digest,
+            "header": header,
+            "uploaded": False,      # the G-code was uploaded ahead of time, only the print command is left
+            "upload_failed": False  # uploading ahead of time failed (eg. not enough storage); upload when printing
+        })
+        self._save()
+
+    ##  The next job, without taking it from the queue
+    def peek(self) -> Optional[Dict[str, Any]]:
+        return self._jobs[0] if self._jobs else None
+
+    ##  Take the next job from the queue. Its spool file now belongs to the caller.
+    def pop(self) -> Optional[Dict[str, Any]]:
+        if not self._jobs:
+            return None
+        job = self._jobs.pop(0)
+        self._save()
+        return job
+
+    def setUploaded(self, spool_path: str, uploaded: bool) -> None:
+        self._update(spool_path, uploaded = uploaded, upload_failed = not uploaded)
+
+    ##  The G-code uploaded ahead of time for jobs with this name is overwritten by another upload
+    def clearUploaded(self, file_name: str) -> None:
+        for job in self._jobs:
+            if job["file_name"] == file_name and job["uploaded"]:
+                job["uploaded"] = False
+                self._save()
+
+    def _update(self, spool_path: str, **kwargs: Any) -> None:
+        for job in self._jobs:
+            if job["spool"] == spool_path:
+                job.update(kwargs)
+                self._save()
+                return
+
+    def _load(self) -> None:
+        try:
+            with open(self._queue_file_path) as queue_file:
+                jobs = json.load(queue_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            Logger.logException("w", "Could not read the print queue %s", self._queue_file_path)
+            return
+
+        if not isinstance(jobs, list):
+            return
+        self._jobs = [job for job in jobs if isinstance(job, dict) and os.path.exists(job.get("spool", ""))]
+        if self._jobs:
+            Logger.log("i", "Restored %d queued print jobs from %s", len(self._jobs), self._queue_file_path)
+
+    def _save(self) -> None:
+        try:
+            with open(os.path.join(self.getDirectory(), "queue.json"), "w") as queue_file:
+                json.dump(self._jobs, queue_file)
+        except OSError:
+            Logger.logException("w", "Could not save the print queue %s", self._queue_file_path)
@@ -0,0 +1,188 @@
+from UM.Logger import Logger
+
+import math
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+##  The status of the printer reported by /printer, mapped to (printer state, print job state) as used by
+#   PrinterOutputModel and PrintJobOutputModel
+StatusMap = {
+    "error": ("error", "error"),
+    "pausing": ("paused", "pausing"),
+    "paused": ("paused", "paused"),
+    "printing": ("printing", "printing"),
+    "endingAlert": ("printing", "wait_cleanup"),
+    "ready": ("idle", "ready"),
+    "resuming": ("printing", "resuming"),
+    "preparing": ("printing", "preparing"),
+    "chamberHeating": ("printing", "pre_print"),
+    "cancelablePreparing": ("printing", "pre_print"),
+    "cancelling": ("printing", "abort"),
+    "jobExtruderJog": ("printing", "notPrintable"),
+    "unknown": ("offline", "offline"),
+}  # type: Dict[str, Tuple[str, str]]
+
+# The printer is busy with something other than a job
+for _state in ["notPrintableScreen", "noSpool", "notLoaded", "levelingNeeded", "updating", "restoring", "loading",
+               "unloading", "swUpdate", "install", "extruderJog", "topDoorOpen", "frontDoorOpen", "userPopup", "zoffset",
+               "cartridgeChanging", "noFilament", "xyzJog", "nozzleCleaning", "leveling", "warning"]:
+    StatusMap[_state] = ("aborted", "abort")
+
+OfflineState = ("offline", "offline")
+
+
+class NozzleStatus(NamedTuple):
+    temperature: float
+    temperature_target: float
+    loaded_spool: Optional[Dict[str, Any]]  # the entry of fdm.spool loaded in this nozzle, if any
+
+
+##  A decoded /printer reply. Fields that were missing from the reply have their default value;
+#   the ones that are None when missing are left as they were by the device.
+class PrinterStatus(NamedTuple):
+    printer_name: Optional[str]
+    printer_model: Optional[str]
+    version: Optional[str]
+    has_fdm: bool
+    nozzles: Optional[List[NozzleStatus]]  # None if the reply has no nozzle data
+    spools: Optional[List[Any]]
+    open_material: bool
+    chamber_temperature: float
+    chamber_temperature_target: float
+    bed_temperature: float
+    bed_temperature_target: float
+    printer_state: str
+    job_state: str
+    job_name: str
+    job_total_time: float
+    job_elapsed_time: float
+    available: Optional[bool]
+
+
+def _number(value: Any, default: float) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return value
+    return default
+
+
+def _string(value: Any, default: Optional[str]) -> Optional[str]:
+    return value if isinstance(value, str) else default
+
+
+def _flag(value: Any, default: bool) -> bool:
+    return bool(value) if value is not None else default
+
+
+def _list(value: Any, default: Optional[List[Any]]) -> Optional[List[Any]]:
+    return value if isinstance(value, list) else default
+
+
+def _dict(value: Any, default: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return value if isinstance(value, dict) else default
+
+
+##  One field of the reply: (name, path in the JSON data, conversion, default if missing or of the wrong type)
+Field = Tuple[str, Tuple[str, ...], Callable[[Any, Any], Any], Any]
+
+PrinterFields = [
+    ("printer_name", ("display_name",), _string, None),
+    ("printer_model", ("model",), _string, None),
+    ("version", ("version",), _string, None),
+    ("fdm", ("fdm",), _dict, None),
+    ("open_material", ("open_material",), _flag, False),
+    ("status", ("status",), _string, None),
+    ("available", ("available",), _string, None),
+    ("job_name", ("job_name",), _string, ""),
+    ("job_running_time", ("job_running_time",), _number, 0),
+    ("job_left_time", ("job_left_time",), _number, 0),
+    ("job_progress", ("job_progress",), _number, 0),
+]  # type: List[Field]
+
+FdmFields = [
+    ("nozzles", ("nozzle",), _list, None),
+    ("spools", ("spool",), _list, None),
+    ("chamber_temperature", ("chamber_temperature",), _number, 0),
+    ("chamber_temperature_target", ("chamber_temperature_target",), _number, 0),
+    ("bed_temperature", ("bed_temperature",), _number, -1),
+    ("bed_temperature_target", ("bed_temperature_target",), _number, 0),
+]  # type: List[Field]
+
+NozzleFields = [
+    ("temperature", ("temperature",), _number, -1),
+    ("temperature_target", ("temperature_target",), _number, -1),
+    ("spool_connect", ("spool_connect",), _number, -1),
+    ("loaded_spoolno", ("loaded_spoolno",), _number, -1),
+]  # type: List[Field]
+
+
+def _decodeFields(fields: Sequence[Field], data: Any) -> Dict[str, Any]:
+    result = {}
+    for name, path, convert, default in fields:
+        value = data
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        result[name] = convert(value, default)
+    return result
+
+
+##  Decode a /printer reply into a PrinterStatus. Anything missing or malformed in the reply is decoded as missing,
+#   so this does not raise on unexpected data.
+def decodePrinterStatus(json_data: Any) -> PrinterStatus:
+    values = _decodeFields(PrinterFields, json_data)
+
+    fdm = values["fdm"]
+    fdm_values = _decodeFields(FdmFields, fdm)
+    spools = fdm_values["spools"] or []
+
+    nozzles = None  # type: Optional[List[NozzleStatus]]
+    if fdm_values["nozzles"] is not None:
+        nozzles = []
+        for nozzle_data in fdm_values["nozzles"]:
+            nozzle = _decodeFields(NozzleFields, nozzle_data)
+            loaded_spool = None
+            spool_number = int(nozzle["loaded_spoolno"])
+            if nozzle["spool_connect"] == 1 and 0 <= spool_number < len(spools):
+                loaded_spool = _dict(spools[spool_number], None)
+            nozzles.append(NozzleStatus(nozzle["temperature"], nozzle["temperature_target"], loaded_spool))
+
+    status = values["status"]
+    if status is None:
+        printer_state, job_state = OfflineState
+    elif status in StatusMap:
+        printer_state, job_state = StatusMap[status]
+    else:
+        Logger.log("w", "Encountered unexpected printer, job state: %s" % status)
+        printer_state, job_state = OfflineState
+
+    total_time = values["job_running_time"]
+    elapsed_time = 0  # type: float
+    if total_time:
+        if values["job_left_time"]:
+            elapsed_time = total_time - values["job_left_time"]
+        elif values["job_progress"]:
+            elapsed_time = total_time * (values["job_progress"] / 100)
+        if not math.isfinite(elapsed_time):
+            elapsed_time = 0  # the times are each finite, but too large to be real
+
+    available = None if values["available"] is None else values["available"] == "available"
+
+    return PrinterStatus(
+        printer_name = values["printer_name"],
+        printer_model = values["printer_model"],
+        version = values["version"],
+        has_fdm = fdm is not None,
+        nozzles = nozzles,
+        spools = fdm_values["spools"],
+        open_material = values["open_material"],
+        chamber_temperature = fdm_values["chamber_temperature"],
+        chamber_temperature_target = fdm_values["chamber_temperature_target"],
+        bed_temperature = fdm_values["bed_temperature"],
+        bed_temperature_target = fdm_values["bed_temperature_target"],
+        printer_state = printer_state,
+        job_state = job_state,
+        job_name = values["job_name"],
+        job_total_time = total_time,
+        job_elapsed_time = elapsed_time,
+        available = available
+    )
@@ -0,0 +1,54 @@
+try:
+    from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestKnownHeaders = QNetworkRequest.KnownHeaders
+except ImportError:
+    from PyQt5.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestKnownHeaders = QNetworkRequest
+
+import json
+
+try:
+    import orjson  # parses straight from a buffer, and much faster than json; used if it is installed
+except ImportError:
+    orjson = None
+
+from typing import Any, Optional
+
+MaxReplySize = 1024 * 1024  # a status reply is a few KiB; anything this large is not a reply we want to parse
+MaxErrorTextSize = 4096  # of an error reply, as shown to the user
+
+
+##  Whether a reply is, or announces to be, larger than a reply is allowed to be
+def isOversized(reply: QNetworkReply, bytes_received: int = 0, max_size: int = MaxReplySize) -> bool:
+    if bytes_received > max_size:
+        return True
+    content_length = reply.header(QNetworkRequestKnownHeaders.ContentLengthHeader)
+    return isinstance(content_length, int) and content_length > max_size
+
+
+##  Whether an HTTP status tells the request succeeded: any 2xx. An upload may be answered with 201 (created) or
+#   204 as well as 200.
+def isSuccessStatus(http_status_code: Optional[int]) -> bool:
+    return http_status_code is not None and 200 <= http_status_code < 300
+
+
+##  The body of a finished reply, without copying it out of the reply's buffer
+def getReplyBuffer(reply: QNetworkReply) -> memoryview:
+    data = reply.readAll()
+    try:
+        return memoryview(data)
+    except TypeError:
+        return memoryview(bytes(data))  # a QByteArray without the buffer protocol (old PyQt5)
+
+
+##  Parse JSON from a buffer. With orjson nothing is copied; with json the buffer is only decoded to a string once.
+#   \raise ValueError If the buffer is not valid UTF-8 encoded JSON
+def decodeJson(data: memoryview) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(str(data, "utf-8"))
+
+
+##  The text of an error reply, cut off at a size that still makes sense to show
+def readReplyText(reply: QNetworkReply, max_size: int = MaxErrorTextSize) -> str:
+    return bytes(reply.read(max_size)).decode("utf-8", "replace")
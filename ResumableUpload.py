@@ -0,0 +1,250 @@
+try:
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkReplyNetworkErrors = QNetworkReply.NetworkError
+    QNetworkRequestAttributes = QNetworkRequest.Attribute
+
+except ImportError:
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkReplyNetworkErrors = QNetworkReply
+    QNetworkRequestAttributes = QNetworkRequest
+
+from UM.Logger import Logger
+
+from .GCodeSpool import GCodeSpool
+from .ReplyDecoder import isSuccessStatus
+
+import json
+import os
+import re
+
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .FabWeaverOutputDevice import FabWeaverOutputDevice
+
+
+##  Uploads a GCodeSpool to a resource in fixed-size chunks, each sent with a Content-Range header.
+#   The offset up to which the instance acknowledged the data is kept in a checkpoint file next to the spool.
+#   After a transient network error the upload resumes from that offset, so only the missing chunks are sent again.
+#   A spool that outlives the upload (that of a queued job) keeps its checkpoint when the upload gives up, so the
+#   next upload of it starts from there; if the instance no longer has that data, it answers 416 and tells how much
+#   it does have.
+#   Chunks are sent as soon as the spool has been written far enough, so this also works while it is being written.
+class ResumableUpload:
+    ChunkSize = 8 * 1024 * 1024
+    MaxAttempts = 5
+    RetryDelay = 1000  # ms, doubled after every failed attempt
+
+    _range_regex = re.compile(r"bytes=\s*0-(\d+)")
+
+    # Errors after which it makes sense to resume the upload
+    TransientErrors = [
+        QNetworkReplyNetworkErrors.RemoteHostClosedError,
+        QNetworkReplyNetworkErrors.TimeoutError,
+        QNetworkReplyNetworkErrors.TemporaryNetworkFailureError,
+        QNetworkReplyNetworkErrors.NetworkSessionFailedError,
+        QNetworkReplyNetworkErrors.ConnectionRefusedError,
+        QNetworkReplyNetworkErrors.UnknownNetworkError,
+        QNetworkReplyNetworkErrors.ProxyConnectionClosedError,
+    ]
+
+    def __init__(self, device: "FabWeaverOutputDevice", spool: GCodeSpool, resource: str, headers: Dict[str, str],
+                 on_finished: Callable[[QNetworkReply], None], on_progress: Callable[[int, int], None],
+                 on_unsupported: Callable[[], None], on_failed: Callable[[str], None]) -> None:
+        self._device = device
+        self._spool = spool
+        self._resource = resource
+        self._headers = headers
+
+        self._on_finished = on_finished
+        self._on_progress = on_progress
+        self._on_unsupported = on_unsupported
+        self._on_failed = on_failed
+
+        self._checkpoint_path = spool.getPath() + ".json"
+        self._offset = 0
+        self._chunk_end = 0
+        self._attempts = 0
+        self._reply = None  # type: Optional[QNetworkReply]
+        self._running = False
+
+    def start(self) -> None:
+        self._running = True
+        self._spool.dataWritten.connect(self._sendNextChunk)
+        self._offset = self._readCheckpoint()
+        if self._offset > 0:
+            Logger.log("i", "Resuming the upload of %s at %d bytes", self._resource, self._offset)
+        self._writeCheckpoint()
+        self._sendNextChunk()
+
+    ##  Stop uploading, without telling anybody
+    def abort(self) -> None:
+        self._stop()
+        if self._reply is not None:
+            reply = self._reply
+            self._reply = None
+            reply.abort()
+
+    def getOffset(self) -> int:
+        return self._offset
+
+    def _stop(self, keep_checkpoint: bool = False) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._spool.dataWritten.disconnect(self._sendNextChunk)
+        if keep_checkpoint:
+            return
+        try:
+            os.remove(self._checkpoint_path)
+        except OSError:
+            pass
+
+    def _sendNextChunk(self) -> None:
+        if not self._running or self._reply is not None:
+            return
+
+        total_size = self._spool.getExpectedSize()
+        if total_size < 0:
+            return  # wait until the size of the spool is known
+
+        self._chunk_end = min(self._offset + self.ChunkSize, total_size)
+        if self._spool.getSize() < self._chunk_end:
+            return  # wait until the spool has been written far enough
+
+        try:
+            with open(self._spool.getPath(), "rb") as spool_file:
+                spool_file.seek(self._offset)
+                data = spool_file.read(self._chunk_end - self._offset)
+        except OSError:
+            Logger.logException("e", "Could not read chunk at offset %d from the G-code spool", self._offset)
+            self._stop()
+            self._on_failed("Could not read the G-code spool")
+            return
+
+        headers = dict(self._headers)
+        headers["Content-Range"] = "bytes %d-%d/%d" % (self._offset, self._chunk_end - 1, total_size)
+        # Handled on the finished signal of the reply itself: the device only calls back for replies with an HTTP
+        # status, and a dropped connection, which is what this is for, has none
+        reply = self._device.post(
+            "%s?override=true&offset=%d" % (self._resource, self._offset), data,
+            on_finished = None, on_progress = self._onChunkProgress, headers = headers
+        )
+        if reply is None:
+            self._stop(keep_checkpoint = True)
+            self._on_failed("No network manager")
+            return
+        self._reply = reply
+        reply.finished.connect(lambda: self._onChunkFinished(reply))
+
+    def _onChunkProgress(self, bytes_sent: int, bytes_total: int) -> None:
+        if bytes_total > 0:
+            self._on_progress(self._offset + bytes_sent, self._spool.getExpectedSize())
+
+    def _onChunkFinished(self, reply: QNetworkReply) -> None:
+        if reply is not self._reply:
+            return  # aborted
+        self._reply = None
+        if not self._running:
+            return
+
+        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+
+        # Without an HTTP status the instance was not reached, or the connection dropped before it answered
+        if http_status_code is None or reply.error() in self.TransientErrors or http_status_code in [502, 503, 504]:
+            self._attempts += 1
+            if self._attempts > self.MaxAttempts:
+                Logger.log("e", "Giving up on upload of %s after %d attempts", self._resource, self.MaxAttempts)
+                if http_status_code is None:
+                    self._stop(keep_checkpoint = not self._spool.isOwned())
+                    self._on_failed(reply.errorString())
+                else:
+                    self._finish(reply)
+                return
+
+            delay = self.RetryDelay * 2 ** (self._attempts - 1)
+            Logger.log("w", "Upload of %s was interrupted at %d bytes (%s), resuming in %d ms",
+                       self._resource, self._offset, reply.errorString(), delay)
+            QTimer.singleShot(delay, self._sendNextChunk)
+            return
+
+        # 308 (Resume Incomplete) acknowledges a chunk of an upload that is not complete yet
+        if isSuccessStatus(http_status_code) or http_status_code == 308:
+            self._attempts = 0
+            self._offset = self._getRangeOffset(reply, self._chunk_end)
+            self._writeCheckpoint()
+            if self._offset >= self._spool.getExpectedSize():
+                self._finish(reply)
+            else:
+                self._sendNextChunk()
+            return
+
+        if http_status_code in [416, 501] and self._offset == 0:
+            # The instance does not understand Content-Range
+            self._stop()
+            self._on_unsupported()
+            return
+
+        if http_status_code == 416 and self._attempts < self.MaxAttempts:
+            # Resumed from a checkpoint, but the instance has less (or other) data stored than it says
+            self._attempts += 1
+            self._offset = self._getRangeOffset(reply, 0)
+            Logger.log("w", "fabWeaver does not have the upload of %s up to the checkpoint, continuing at %d bytes",
+                       self._resource, self._offset)
+            self._writeCheckpoint()
+            self._sendNextChunk()
+            return
+
+        self._finish(reply)
+
+    ##  The instance may tell how much it has stored in a Range header
+    #   \param default The offset if it doesn't: the end of the chunk after a success, 0 after a 416
+    def _getRangeOffset(self, reply: QNetworkReply, default: int) -> int:
+        if reply.hasRawHeader(b"Range"):
+            match = self._range_regex.match(bytes(reply.rawHeader(b"Range")).decode("utf-8"))
+            if match:
+                return int(match.group(1)) + 1
+        return default
+
+    def _finish(self, reply: QNetworkReply) -> None:
+        self._stop()
+        self._on_finished(reply)
+
+    ##  What a checkpoint must match to resume from it
+    def _getCheckpointKey(self) -> Dict[str, Any]:
+        return {
+            "resource": self._resource,
+            "spool": self._spool.getPath(),
+            "content_encoding": self._spool.getContentEncoding(),
+            "size": self._spool.getExpectedSize()
+        }
+
+    ##  The offset stored by an earlier upload of this spool to this resource, or 0
+    def _readCheckpoint(self) -> int:
+        try:
+            with open(self._checkpoint_path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError):
+            Logger.log("w", "Could not read upload checkpoint %s", self._checkpoint_path)
+            return 0
+
+        if not isinstance(checkpoint, dict) or self._spool.getExpectedSize() < 0:
+            return 0
+        if any(checkpoint.get(key) != value for key, value in self._getCheckpointKey().items()):
+            return 0  # of another upload
+        offset = checkpoint.get("offset")
+        if not isinstance(offset, int) or not 0 <= offset < self._spool.getExpectedSize():
+            return 0
+        return offset
+
+    def _writeCheckpoint(self) -> None:
+        checkpoint = self._getCheckpointKey()
+        checkpoint["offset"] = self._offset
+        try:
+            with open(self._checkpoint_path, "w") as checkpoint_file:
+                json.dump(checkpoint, checkpoint_file)
+        except OSError:
+            Logger.log("w", "Could not write upload checkpoint %s", self._checkpoint_path)
@@ -0,0 +1,208 @@
+try:
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestAttributes = QNetworkRequest.Attribute
+    QNetworkRequestKnownHeaders = QNetworkRequest.KnownHeaders
+
+except ImportError:
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtNetwork import QNetworkReply, QNetworkRequest
+    QNetworkRequestAttributes = QNetworkRequest
+    QNetworkRequestKnownHeaders = QNetworkRequest
+
+from UM.Logger import Logger
+
+import copy
+import json
+from time import monotonic
+
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .FabWeaverOutputDevice import FabWeaverOutputDevice
+
+
+##  Receives the printer status pushed by the instance as Server-Sent Events, instead of polling /printer.
+#   An event of type "status" (or without a type) carries the whole status, an event of type "delta" only what
+#   changed since the previous event; deltas are merged into the last status. Comments serve as keep-alive.
+#   As long as the stream is live, the device skips its /printer polls. If the instance doesn't support the stream,
+#   or the stream drops or stalls, the device simply polls again; a dropped or stalled stream is closed and retried
+#   after a while, backing off while it keeps failing.
+class StatusStream:
+    EndPoint = "printer/events"
+    StaleTimeout = 30  # s without any event after which the stream is not trusted anymore
+    RetryDelay = 30000  # ms, doubled after every stream that failed without delivering an event
+    MaxRetryDelay = 600000
+    MaxBufferSize = 1024 * 1024  # an event should never be this large
+
+    # Replies that tell the instance has no status stream
+    UnsupportedStatusCodes = [404, 405, 406, 501]
+
+    def __init__(self, device: "FabWeaverOutputDevice", on_status: Callable[[Dict[str, Any]], None]) -> None:
+        self._device = device
+        self._on_status = on_status
+
+        self._reply = None  # type: Optional[QNetworkReply]
+        self._running = False
+        self._supported = None  # type: Optional[bool]  # None until the instance has answered
+        self._buffer = b""
+        self._status = {}  # type: Dict[str, Any]
+        self._last_event_time = None  # type: Optional[float]
+        self._failures = 0  # streams in a row that ended without an event
+
+        self._retry_timer = QTimer()
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._open)
+
+        # Restarted on every event; if it runs out, the stream has stalled
+        self._stale_timer = QTimer()
+        self._stale_timer.setSingleShot(True)
+        self._stale_timer.timeout.connect(self._onStalled)
+
+    ##  Open the stream. The instance is asked again whether it has one: it may have been updated since it said no.
+    def start(self) -> None:
+        self._running = True
+        self._supported = None
+        self._failures = 0
+        self._retry_timer.stop()
+        self._open()
+
+    def stop(self) -> None:
+        self._running = False
+        self._retry_timer.stop()
+        self._close()
+
+    ##  Whether the stream delivers the status, so it doesn't need to be polled
+    def isLive(self) -> bool:
+        return self._reply is not None and self._last_event_time is not None and \
+               monotonic() - self._last_event_time < self.StaleTimeout
+
+    def _open(self) -> None:
+        if not self._running or self._reply is not None:
+            return
+        self._buffer = b""
+        self._status = {}
+        self._last_event_time = None
+        self._reply = self._device.openStream(self.EndPoint)
+        if self._reply is None:
+            return
+        self._reply.readyRead.connect(self._onReadyRead)
+        self._reply.finished.connect(self._onFinished)
+        self._stale_timer.start(int(self.StaleTimeout * 1000))
+
+    def _close(self) -> None:
+        self._stale_timer.stop()
+        if self._reply is None:
+            return
+        reply = self._reply
+        self._reply = None
+        self._last_event_time = None
+        try:
+            reply.readyRead.disconnect(self._onReadyRead)
+            reply.finished.disconnect(self._onFinished)
+        except TypeError:
+            pass
+        reply.abort()
+
+    def _isEventStream(self, reply: QNetworkReply) -> bool:
+        content_type = reply.header(QNetworkRequestKnownHeaders.ContentTypeHeader) or ""
+        return str(content_type).startswith("text/event-stream")
+
+    def _onReadyRead(self) -> None:
+        reply = self._reply
+        if reply is None:
+            return
+        if not self._isEventStream(reply):
+            return  # handled when the reply has finished
+
+        if self._supported is None:
+            Logger.log("i", "fabWeaver on %s pushes its status, polling /printer only as a fallback", self._device.getId())
+        self._supported = True
+
+        self._buffer += bytes(reply.readAll()).replace(b"\r\n", b"\n")
+        if len(self._buffer) > self.MaxBufferSize:
+            Logger.log("w", "Status stream of %s sent an oversized event, reconnecting", self._device.getId())
+            self._close()
+            self._scheduleRetry()
+            return
+
+        while b"\n\n" in self._buffer:
+            event, self._buffer = self._buffer.split(b"\n\n", 1)
+            self._onEvent(event.decode("utf-8", "replace"))
+
+    def _onEvent(self, event: str) -> None:
+        self._last_event_time = monotonic()  # keep-alive comments count too
+        self._failures = 0
+        self._stale_timer.start(int(self.StaleTimeout * 1000))
+
+        event_type = "status"
+        data_lines = []
+        for line in event.split("\n"):
+            if not line or line.startswith(":"):
+                continue
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event_type = value
+            elif field == "data":
+                data_lines.append(value)
+        if not data_lines:
+            return
+
+        try:
+            data = json.loads("\n".join(data_lines))
+        except ValueError:
+            Logger.log("w", "Received an invalid status event from %s", self._device.getId())
+            return
+        if not isinstance(data, dict):
+            return
+
+        if event_type == "delta":
+            _mergeDelta(self._status, data)
+        else:
+            self._status = data
+        self._on_status(copy.deepcopy(self._status))  # the snapshots of the device must not change with later deltas
+
+    def _onFinished(self) -> None:
+        reply = self._reply
+        self._reply = None
+        self._last_event_time = None
+        self._stale_timer.stop()
+        if reply is None:
+            return
+
+        http_status_code = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+        if self._supported is not True and (http_status_code in self.UnsupportedStatusCodes or
+                                            (http_status_code == 200 and not self._isEventStream(reply))):
+            Logger.log("i", "fabWeaver on %s does not push its status, polling /printer", self._device.getId())
+            self._supported = False
+            return
+
+        if self._running:
+            Logger.log("d", "Status stream of %s ended (%s), polling until it is reopened", self._device.getId(), http_status_code)
+            self._scheduleRetry()
+
+    ##  Nothing arrived for StaleTimeout, not even a keep-alive: the connection is gone without Qt noticing, or the
+    #   instance stopped sending. Abort the reply, or the stream could never be opened again.
+    def _onStalled(self) -> None:
+        if self._reply is None:
+            return
+        Logger.log("w", "Status stream of %s stalled, polling until it is reopened", self._device.getId())
+        self._close()
+        self._scheduleRetry()
+
+    ##  Reopen the stream after a while; the delay doubles with every stream in a row that delivered nothing
+    def _scheduleRetry(self) -> None:
+        if not self._running:
+            return
+        delay = min(self.MaxRetryDelay, self.RetryDelay * 2 ** self._failures)
+        self._failures += 1
+        self._retry_timer.start(int(delay))
+
+
+##  Merge a status delta into a status: objects are merged recursively, anything else replaces the old value
+def _mergeDelta(status: Dict[str, Any], delta: Dict[str, Any]) -> None:
+    for key, value in delta.items():
+        if isinstance(value, dict) and isinstance(status.get(key), dict):
+            _mergeDelta(status[key], value)
+        else:
+            status[key] = value
@@ -0,0 +1,140 @@
+import numpy
+
+from typing import Dict, List, Optional, Tuple
+
+from .PrinterStatus import PrinterStatus
+
+
+##  The recent telemetry of a printer: temperatures of the nozzles, bed and chamber, and the progress of the job.
+#   Samples are kept in a ring buffer of a fixed number of rows, so the memory it takes is bounded no matter how
+#   long Cura runs; the oldest samples are overwritten first.
+#   Values are stored in channels, eg. "bed", "bed_target", "nozzle0", "nozzle0_target", "progress". Values that
+#   were not reported are NaN, and are left out of the statistics.
+class TelemetryHistory:
+    DefaultCapacity = 10800  # 6 hours at the polling interval while printing; see fabWeaver/telemetry_history_capacity
+
+    FixedChannels = ["bed", "bed_target", "chamber", "chamber_target", "progress"]
+
+    def __init__(self, capacity: int = DefaultCapacity) -> None:
+        self._capacity = max(1, capacity)
+        self._channels = list(self.FixedChannels)  # type: List[str]
+        self._times = numpy.zeros(self._capacity, dtype = numpy.float64)
+        self._values = numpy.full((self._capacity, len(self._channels)), numpy.nan, dtype = numpy.float32)
+        self._next = 0  # the row the next sample is written to
+        self._length = 0
+
+    def getCapacity(self) -> int:
+        return self._capacity
+
+    def getLength(self) -> int:
+        return self._length
+
+    def getChannels(self) -> List[str]:
+        return list(self._channels)
+
+    def clear(self) -> None:
+        self._values.fill(numpy.nan)
+        self._next = 0
+        self._length = 0
+
+    ##  Add a sample of a status
+    #   \param timestamp The time of the sample, in seconds (eg. time.time())
+    def append(self, timestamp: float, status: PrinterStatus) -> None:
+        nozzles = status.nozzles or []
+        self._ensureNozzleChannels(len(nozzles))
+
+        row = numpy.full(len(self._channels), numpy.nan, dtype = numpy.float32)
+        row[0] = _temperature(status.bed_temperature)
+        row[1] = _temperature(status.bed_temperature_target)
+        row[2] = _temperature(status.chamber_temperature)
+        row[3] = _temperature(status.chamber_temperature_target)
+        if status.job_total_time > 0:
+            row[4] = min(100.0, max(0.0, 100 * status.job_elapsed_time / status.job_total_time))
+        for index, nozzle in enumerate(nozzles):
+            column = len(self.FixedChannels) + 2 * index
+            row[column] = _temperature(nozzle.temperature)
+            row[column + 1] = _temperature(nozzle.temperature_target)
+
+        self._times[self._next] = timestamp
+        self._values[self._next] = row
+        self._next = (self._next + 1) % self._capacity
+        self._length = min(self._length + 1, self._capacity)
+
+    ##  The samples of a channel, oldest first
+    #   \param start Only samples from this time on, if given
+    #   \param end Only samples up to this time, if given
+    #   \return The times and the values of the samples
+    def getSeries(self, channel: str, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        column = self._getColumn(channel)
+        order = self._getOrder()
+        times = self._times[order]
+        values = self._values[order, column] if column is not None else numpy.full(len(order), numpy.nan, dtype = numpy.float32)
+
+        mask = numpy.ones(len(times), dtype = bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        return times[mask], values[mask]
+
+    ##  Minimum, maximum and mean of a channel over the last seconds of samples (of all samples if not given).
+    #   All are NaN if there are no values in the window.
+    def getWindowStatistics(self, channel: str, seconds: Optional[float] = None) -> Dict[str, float]:
+        start = None
+        if seconds is not None and self._length > 0:
+            start = self._times[(self._next - 1) % self._capacity] - seconds
+        _, values = self.getSeries(channel, start = start)
+        values = values[~numpy.isnan(values)]
+        if len(values) == 0:
+            return {"min": float("nan"), "max": float("nan"), "mean": float("nan"), "count": 0}
+        return {
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "mean": float(values.mean(dtype = numpy.float64)),
+            "count": len(values)
+        }
+
+    ##  A channel reduced to at most max_points samples for a chart. The samples are divided into buckets, and of
+    #   every bucket the lowest and the highest sample are kept, so spikes still show.
+    def getDecimatedSeries(self, channel: str, max_points: int,
+                           start: Optional[float] = None, end: Optional[float] = None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        times, values = self.getSeries(channel, start, end)
+        valid = ~numpy.isnan(values)
+        times, values = times[valid], values[valid]
+        if len(values) <= max_points or max_points < 2:
+            return times, values
+
+        bucket_count = max_points // 2
+        edges = numpy.linspace(0, len(values), bucket_count + 1).astype(numpy.int64)
+        # Every bucket has at least one sample, as there are more samples than buckets
+        low = numpy.array([edges[i] + numpy.argmin(values[edges[i]:edges[i + 1]]) for i in range(bucket_count)])
+        high = numpy.array([edges[i] + numpy.argmax(values[edges[i]:edges[i + 1]]) for i in range(bucket_count)])
+        indices = numpy.unique(numpy.concatenate((low, high)))  # sorted, so in time order
+        return times[indices], values[indices]
+
+    ##  The rows of the samples in the buffer, oldest first
+    def _getOrder(self) -> numpy.ndarray:
+        if self._length < self._capacity:
+            return numpy.arange(self._length)
+        return (numpy.arange(self._capacity) + self._next) % self._capacity
+
+    def _getColumn(self, channel: str) -> Optional[int]:
+        try:
+            return self._channels.index(channel)
+        except ValueError:
+            return None
+
+    ##  Add the channels of nozzles the buffer doesn't have yet; the existing samples have no values for them
+    def _ensureNozzleChannels(self, nozzle_count: int) -> None:
+        known = (len(self._channels) - len(self.FixedChannels)) // 2
+        if nozzle_count <= known:
+            return
+        for index in range(known, nozzle_count):
+            self._channels += ["nozzle%d" % index, "nozzle%d_target" % index]
+        extra = numpy.full((self._capacity, len(self._channels) - self._values.shape[1]), numpy.nan, dtype = numpy.float32)
+        self._values = numpy.hstack((self._values, extra))
+
+
+##  Temperatures below zero mean the printer did not report one
+def _temperature(value: float) -> float:
+    return value if value >= 0 else numpy.nan
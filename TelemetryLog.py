@@ -0,0 +1,256 @@
+from UM.Job import Job
+from UM.Logger import Logger
+from UM.Resources import Resources
+
+import collections
+import csv
+import mmap
+import numpy
+import os
+import re
+import struct
+import threading
+from time import monotonic
+
+from typing import Any, Dict, Iterator, List, Optional
+
+from .PrinterStatus import PrinterStatus
+from .TelemetryHistory import _temperature
+
+
+##  The states as they are stored in the log. Only ever append to this list, or older logs read wrong.
+States = ["offline", "idle", "printing", "paused", "aborted", "error", "ready", "pausing", "wait_cleanup", "resuming",
+          "preparing", "pre_print", "abort", "notPrintable"]
+UnknownState = 0xFFFF
+
+MaxNozzles = 4
+
+##  A record of the log: time, printer state, job state, progress (%), bed, bed target, chamber, chamber target and
+#   the temperature and target of MaxNozzles nozzles. Values that were not reported are NaN.
+RecordStruct = struct.Struct("<dHHfffff" + "ff" * MaxNozzles)
+RecordDType = numpy.dtype([
+    ("time", "<f8"), ("printer_state", "<u2"), ("job_state", "<u2"), ("progress", "<f4"),
+    ("bed", "<f4"), ("bed_target", "<f4"), ("chamber", "<f4"), ("chamber_target", "<f4")
+] + [(name % index, "<f4") for index in range(MaxNozzles) for name in ["nozzle%d", "nozzle%d_target"]])
+
+##  Every file starts with a header: magic, format version and record size
+HeaderStruct = struct.Struct("<4sHH8x")
+Magic = b"FWTL"
+Version = 1
+
+
+##  An append-only, binary log of the status of a printer, for the analysis of failed prints afterwards.
+#   Records have a fixed width, so the log can be read with mmap (see TelemetryLogFile) without parsing. The log is
+#   split into files of at most MaxFileSize; when there are more than MaxFiles, the oldest is removed.
+#   Records are collected in memory and written in batches by a background job, so a status poll never waits for
+#   the disk. Batches are written in the order they were collected, whether by the job or by close().
+class TelemetryLog:
+    MaxFileSize = 8 * 1024 * 1024
+    MaxFiles = 8
+    BatchSize = 64  # records
+    FlushInterval = 60  # s
+
+    _file_name_regex = re.compile(r"telemetry-(\d+)\.bin")
+
+    def __init__(self, device_id: str, directory: Optional[str] = None) -> None:
+        if directory is None:
+            directory = os.path.join(Resources.getCacheStoragePath(), "fabweaver_telemetry", re.sub(r"[^\w.-]", "_", device_id))
+        self._directory = directory
+        self._buffer = bytearray()
+        self._last_flush = monotonic()
+        self._flush_job = None  # type: Optional[TelemetryFlushJob]
+        self._pending = collections.deque()  # type: collections.deque  # batches that are not written yet, oldest first
+        self._lock = threading.Lock()  # held while writing files
+
+    def getDirectory(self) -> str:
+        return self._directory
+
+    ##  The files of the log, oldest first
+    def getFiles(self) -> List[str]:
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return []
+        numbered = [(int(match.group(1)), name) for name, match in ((name, self._file_name_regex.fullmatch(name)) for name in names) if match]
+        return [os.path.join(self._directory, name) for _, name in sorted(numbered)]
+
+    ##  Add a record of a status. It is written with the next batch.
+    def append(self, timestamp: float, status: PrinterStatus) -> None:
+        self._buffer += packRecord(timestamp, status)
+        if len(self._buffer) >= self.BatchSize * RecordStruct.size or monotonic() - self._last_flush >= self.FlushInterval:
+            self.flush()
+
+    ##  Write the collected records in a background job
+    def flush(self) -> None:
+        if not self._buffer or self._flush_job is not None:
+            return  # records collected meanwhile go with the next batch
+        self._pending.append(bytes(self._buffer))
+        self._flush_job = TelemetryFlushJob(self)
+        self._flush_job.finished.connect(self._onFlushJobFinished)
+        self._buffer = bytearray()
+        self._last_flush = monotonic()
+        self._flush_job.start()
+
+    ##  Write the collected records now; for when the device is closed. If a flush job is writing, this waits for
+    #   it, so the records of the job come first.
+    def close(self) -> None:
+        if self._buffer:
+            self._pending.append(bytes(self._buffer))
+            self._buffer = bytearray()
+        self.writePending()
+
+    def _onFlushJobFinished(self, job: "TelemetryFlushJob") -> None:
+        self._flush_job = None
+
+    ##  Write the batches that are not written yet, in order. A batch that another thread already took is written
+    #   by that thread before this one gets the lock.
+    def writePending(self) -> None:
+        with self._lock:
+            while self._pending:
+                self._write(self._pending.popleft())
+
+    ##  Append records to the current file, starting a new one if it is full
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            self._write(data)
+
+    def _write(self, data: bytes) -> None:
+        try:
+            os.makedirs(self._directory, exist_ok = True)
+            files = self.getFiles()
+            path = files[-1] if files else None
+            if path is None or os.path.getsize(path) + len(data) > self.MaxFileSize:
+                number = int(self._file_name_regex.fullmatch(os.path.basename(path)).group(1)) + 1 if path else 0
+                path = os.path.join(self._directory, "telemetry-%06d.bin" % number)
+                with open(path, "wb") as f:
+                    f.write(HeaderStruct.pack(Magic, Version, RecordStruct.size))
+                files.append(path)
+                for old_path in files[:-self.MaxFiles]:
+                    os.remove(old_path)
+
+            with open(path, "ab") as f:
+                f.write(data)
+        except OSError:
+            Logger.logException("w", "Could not write the telemetry log in %s", self._directory)
+
+    ##  Export the records of all files of the log to a CSV file
+    def exportCsv(self, output_path: str) -> int:
+        count = 0
+        with open(output_path, "w", newline = "") as f:
+            writer = csv.writer(f)
+            writer.writerow(RecordDType.names)
+            for record in self.iterRecords():
+                writer.writerow([record[name] for name in RecordDType.names])
+                count += 1
+        return count
+
+    ##  Export the records of all files of the log column by column to a NumPy .npz file, one array per field.
+    #   As with Parquet, a column can be loaded without reading the others.
+    def exportColumns(self, output_path: str) -> int:
+        parts = []
+        for path in self.getFiles():
+            with TelemetryLogFile(path) as log_file:
+                parts.append(numpy.array(log_file.getRecords()))  # copied, as the file is closed after this
+        records = numpy.concatenate(parts) if parts else numpy.zeros(0, dtype = RecordDType)
+        numpy.savez(output_path, **{name: records[name] for name in RecordDType.names})
+        return len(records)
+
+    ##  All records of the log, oldest first, as dicts with the states decoded
+    def iterRecords(self) -> Iterator[Dict[str, Any]]:
+        for path in self.getFiles():
+            with TelemetryLogFile(path) as log_file:
+                for index in range(log_file.getRecordCount()):
+                    yield log_file.getRecord(index)
+
+
+class TelemetryFlushJob(Job):
+    def __init__(self, log: TelemetryLog) -> None:
+        super().__init__()
+        self._log = log
+
+    def run(self) -> None:
+        self._log.writePending()
+
+
+##  A file of the telemetry log, mapped into memory. Use it as a context manager; the arrays it returns are only
+#   valid while the file is open.
+class TelemetryLogFile:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._file = None  # type: Optional[Any]
+        self._map = None  # type: Optional[mmap.mmap]
+        self._records = numpy.zeros(0, dtype = RecordDType)
+
+    def __enter__(self) -> "TelemetryLogFile":
+        self.open()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def open(self) -> None:
+        self._file = open(self._path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HeaderStruct.size:
+            return
+        self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, record_size = HeaderStruct.unpack_from(self._map, 0)
+        if magic != Magic or version != Version or record_size != RecordStruct.size:
+            Logger.log("w", "%s is not a telemetry log this version can read", self._path)
+            return
+        # A record that was cut off (eg. by a crash) is left out
+        count = (size - HeaderStruct.size) // RecordStruct.size
+        self._records = numpy.frombuffer(self._map, dtype = RecordDType, count = count, offset = HeaderStruct.size)
+
+    def close(self) -> None:
+        self._records = numpy.zeros(0, dtype = RecordDType)  # release the buffer, or the map can't be closed
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def getRecordCount(self) -> int:
+        return len(self._records)
+
+    ##  The records, as a structured array on the mapped file; nothing is copied
+    def getRecords(self) -> numpy.ndarray:
+        return self._records
+
+    def getRecord(self, index: int) -> Dict[str, Any]:
+        record = self._records[index]
+        result = {name: record[name].item() for name in RecordDType.names}  # type: Dict[str, Any]
+        result["printer_state"] = _decodeState(result["printer_state"])
+        result["job_state"] = _decodeState(result["job_state"])
+        return result
+
+
+def packRecord(timestamp: float, status: PrinterStatus) -> bytes:
+    progress = float("nan")
+    if status.job_total_time > 0:
+        progress = min(100.0, max(0.0, 100 * status.job_elapsed_time / status.job_total_time))
+    nozzle_values = []  # type: List[float]
+    nozzles = status.nozzles or []
+    for index in range(MaxNozzles):
+        if index < len(nozzles):
+            nozzle_values += [_temperature(nozzles[index].temperature), _temperature(nozzles[index].temperature_target)]
+        else:
+            nozzle_values += [float("nan"), float("nan")]
+    return RecordStruct.pack(
+        timestamp, _encodeState(status.printer_state), _encodeState(status.job_state), progress,
+        _temperature(status.bed_temperature), _temperature(status.bed_temperature_target),
+        _temperature(status.chamber_temperature), _temperature(status.chamber_temperature_target),
+        *nozzle_values
+    )
+
+
+def _encodeState(state: str) -> int:
+    try:
+        return States.index(state)
+    except ValueError:
+        return UnknownState
+
+
+def _decodeState(value: int) -> str:
+    return States[value] if value < len(States) else ""
@@ -0,0 +1,63 @@
+from UM.Logger import Logger
+
+from cura.CuraApplication import CuraApplication
+
+import json
+
+from typing import Any, Dict, Optional
+
+
+##  Remembers which G-code (by SHA-256 digest) has been stored on an instance and under which resource name,
+#   so printing the same G-code again does not need another upload. The index is kept in the preferences.
+#   G-code is stored under the name of its job, so a job that is sliced again replaces its earlier version on the
+#   instance. Uploads of this plugin drop the entry of the name they overwrite, but the index can't tell when
+#   another client stores a job under the same name; that is why skipping uploads is opt-in.
+class UploadIndex:
+    MaxEntries = 32  # per instance; the oldest entries are dropped first
+
+    def __init__(self, device_id: str) -> None:
+        self._device_id = device_id
+        self._preferences = CuraApplication.getInstance().getPreferences()
+
+    ##  The name of the resource holding the G-code with this digest, or None if it is not known to be stored
+    def getFileName(self, digest: str) -> Optional[str]:
+        file_name = self._load().get(self._device_id, {}).get(digest)
+        return file_name if isinstance(file_name, str) else None
+
+    ##  Remember that the G-code with this digest was stored under file_name. Any other G-code that was stored
+    #   under the same name has been overwritten.
+    def add(self, digest: str, file_name: str) -> None:
+        if not digest:
+            return  # the G-code was not hashed
+        index = self._load()
+        entries = {key: value for key, value in index.get(self._device_id, {}).items() if value != file_name and key != digest}
+        entries[digest] = file_name
+        while len(entries) > self.MaxEntries:
+            entries.pop(next(iter(entries)))
+        index[self._device_id] = entries
+        self._save(index)
+
+    def remove(self, digest: str) -> None:
+        index = self._load()
+        if index.get(self._device_id, {}).pop(digest, None) is not None:
+            self._save(index)
+
+    def removeFileName(self, file_name: str) -> None:
+        index = self._load()
+        entries = index.get(self._device_id, {})
+        for digest in [key for key, value in entries.items() if value == file_name]:
+            del entries[digest]
+        self._save(index)
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            index = json.loads(self._preferences.getValue("fabWeaver/uploaded_gcode"))  # type: Any
+        except (ValueError, TypeError):
+            Logger.log("w", "Could not read the index of uploaded G-code, starting a new one")
+            index = {}
+        if not isinstance(index, dict):
+            index = {}
+        return index
+
+    def _save(self, index: Dict[str, Dict[str, str]]) -> None:
+        self._preferences.setValue("fabWeaver/uploaded_gcode", json.dumps(index))
@@ -11,6 +11,7 @@ Cura.MachineAction
     id: base
     anchors.fill: parent;
     property var selectedInstance: null
+    property var checkedInstanceIds: []  // the instances "Send to checked printers" sends the current job to
     property string activeMachineId:
     {
         if (Cura.MachineManager.activeMachineId != undefined)
@@ -27,6 +28,16 @@ Cura.MachineAction
         return "";
     }
 
+    function setInstanceChecked(instanceId, checked)
+    {
+        var instanceIds = base.checkedInstanceIds.filter(function(id) { return id != instanceId; });
+        if (checked)
+        {
+            instanceIds.push(instanceId);
+        }
+        base.checkedInstanceIds = instanceIds;
+    }
+
     Column
     {
         anchors.fill: parent;
@@ -96,6 +107,14 @@ Cura.MachineAction
                 enabled: base.selectedInstance != null && base.selectedInstance.getProperty("manual") == "true"
                 onClicked: manager.removeManualInstance(base.selectedInstance.name)
             }
+
+            Button
+            {
+                id: sendToCheckedButton
+                text: catalog.i18nc("@action:button", "Send to checked printers")
+                enabled: base.checkedInstanceIds.length > 0
+                onClicked: manager.sendToPrinters(base.checkedInstanceIds)
+            }
         }
 
         Row
@@ -159,7 +178,7 @@ Cura.MachineAction
                             {
                                 anchors.left: parent.left
                                 anchors.leftMargin: UM.Theme.getSize("default_margin").width
-                                anchors.right: parent.right
+                                anchors.right: instanceCheckBox.left
                                 text: listview.model[index].name
                                 color: parent.ListView.isCurrentItem ? palette.highlightedText : palette.text
                                 elide: Text.ElideRight
@@ -177,6 +196,15 @@ Cura.MachineAction
                                     }
                                 }
                             }
+
+                            CheckBox
+                            {
+                                id: instanceCheckBox
+                                anchors.right: parent.right
+                                anchors.rightMargin: UM.Theme.getSize("default_margin").width
+                                checked: base.checkedInstanceIds.indexOf(listview.model[index].getId()) >= 0
+                                onClicked: base.setInstanceChecked(listview.model[index].getId(), checked)
+                            }
                         }
                     }
                 }
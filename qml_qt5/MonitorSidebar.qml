@@ -228,6 +228,87 @@ Item
             }
         }
 
+        Rectangle
+        {
+            color: UM.Theme.getColor("wide_lining")
+            width: parent.width
+            height: UM.Theme.getSize("thick_lining").width
+            visible: activePrinter != null
+        }
+
+        Item
+        {
+            implicitWidth: parent.width
+            height: 70
+            visible: activePrinter != null
+
+            Rectangle
+            {
+                color: UM.Theme.getColor("main_background")
+                anchors.fill: parent
+
+                // Connection label.
+                Label
+                {
+                    text: catalog.i18nc("@label", "Connection")
+                    color: UM.Theme.getColor("text")
+                    font: UM.Theme.getFont("default")
+                    anchors.left: parent.left
+                    anchors.top: parent.top
+                    anchors.margins: UM.Theme.getSize("default_margin").width
+                }
+
+                // Time the last job command (pause, resume, stop) took to be acknowledged.
+                Label
+                {
+                    text: catalog.i18nc("@label", "%1 acknowledged in %2 ms").arg(OutputDevice.lastCommand).arg(Math.round(OutputDevice.lastCommandLatency))
+                    visible: OutputDevice.lastCommandLatency > 0
+                    color: UM.Theme.getColor("text_inactive")
+                    font: UM.Theme.getFont("default")
+                    anchors.left: parent.left
+                    anchors.bottom: parent.bottom
+                    anchors.margins: UM.Theme.getSize("default_margin").width
+                }
+
+                // Round trip time of requests, or that the connection is unstable.
+                Label
+                {
+                    id: connectionRoundTripTime
+                    text: OutputDevice.connectionHealthy ? Math.round(OutputDevice.roundTripTime) + " ms" : catalog.i18nc("@label", "Unstable")
+                    color: UM.Theme.getColor("text")
+                    font: UM.Theme.getFont("default")
+                    anchors.right: parent.right
+                    anchors.top: parent.top
+                    anchors.margins: UM.Theme.getSize("default_margin").width
+
+                    //For tooltip.
+                    MouseArea
+                    {
+                        hoverEnabled: true
+                        anchors.fill: parent
+                        onHoveredChanged:
+                        {
+                            if (containsMouse)
+                            {
+                                var stats = OutputDevice.connectionStats
+                                base.showTooltip(
+                                    base,
+                                    {x: 0, y: parent.mapToItem(base, 0, Math.floor(-parent.height / 4)).y},
+                                    catalog.i18nc("@tooltip", "Round trip time of requests to fabWeaver: %1 ms typical, %2 ms (p95), %3 ms (p99). Failed requests: %4%.")
+                                        .arg(Math.round(stats.rtt_p50)).arg(Math.round(stats.rtt_p95))
+                                        .arg(Math.round(stats.rtt_p99)).arg(Math.round(stats.error_rate * 100))
+                                );
+                            }
+                            else
+                            {
+                                base.hideTooltip();
+                            }
+                        }
+                    }
+                }
+            }
+        }
+
         UM.SettingPropertyProvider
         {
             id: bedTemperature
@@ -368,7 +449,9 @@ Item
                 model: 4
                 Column{
                     width: Math.round( parent.width / 4)
-                    property string spoolStatus: OutputDevice.spoolData[index]["status"]
+                    // Read the spool once; its properties below only depend on this
+                    property var spool: (OutputDevice.spoolData && index < OutputDevice.spoolData.length) ? OutputDevice.spoolData[index] : ({})
+                    property string spoolStatus: spool["status"] || ""
                     property string textcolor:
                     {
                         if (spoolStatus == "load")
@@ -395,14 +478,14 @@ Item
                         size: 80
                         width: parent.width
                         lineWidth: 10
-                        value:  (OutputDevice.spoolData[index]["filament_left"]/OutputDevice.spoolData[index]["filament_capacity"])
+                        value:  (parent.spool["filament_left"]/parent.spool["filament_capacity"])
                         primaryColor:{
-                            if (OutputDevice.spoolData[index]["filament_color"] == "#ffffff")
+                            if (parent.spool["filament_color"] == "#ffffff")
                                 return "#f8f8f8"
                             else
-                                return OutputDevice.spoolData[index]["filament_color"]
+                                return parent.spool["filament_color"]
                         }
-                        property string material: OutputDevice.spoolData[index]["material"]
+                        property string material: parent.spool["material"] || ""
                         secondaryColor: "#f0f0f0"
                         Text {
                             text: 
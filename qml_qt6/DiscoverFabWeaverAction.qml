@@ -13,6 +13,7 @@ Cura.MachineAction
     id: base
     anchors.fill: parent;
     property var selectedInstance: null
+    property var checkedInstanceIds: []  // the instances "Send to checked printers" sends the current job to
     property string activeMachineId:
     {
         if (Cura.MachineManager.activeMachineId != undefined)
@@ -29,6 +30,16 @@ Cura.MachineAction
         return "";
     }
 
+    function setInstanceChecked(instanceId, checked)
+    {
+        var instanceIds = base.checkedInstanceIds.filter(function(id) { return id != instanceId; });
+        if (checked)
+        {
+            instanceIds.push(instanceId);
+        }
+        base.checkedInstanceIds = instanceIds;
+    }
+
     Column
     {
         anchors.fill: parent;
@@ -98,6 +109,14 @@ Cura.MachineAction
                 enabled: base.selectedInstance != null && base.selectedInstance.getProperty("manual") == "true"
                 onClicked: manager.removeManualInstance(base.selectedInstance.name)
             }
+
+            Cura.SecondaryButton
+            {
+                id: sendToCheckedButton
+                text: catalog.i18nc("@action:button", "Send to checked printers")
+                enabled: base.checkedInstanceIds.length > 0
+                onClicked: manager.sendToPrinters(base.checkedInstanceIds)
+            }
         }
 
         Row
@@ -153,7 +172,7 @@ Cura.MachineAction
                         {
                             anchors.left: parent.left
                             anchors.leftMargin: UM.Theme.getSize("default_margin").width
-                            anchors.right: parent.right
+                            anchors.right: instanceCheckBox.left
                             text: listview.model[index].name
                             elide: Text.ElideRight
                             font.italic: listview.model[index].key == manager.instanceId
@@ -171,6 +190,15 @@ Cura.MachineAction
                                 }
                             }
                         }
+
+                        UM.CheckBox
+                        {
+                            id: instanceCheckBox
+                            anchors.right: parent.right
+                            anchors.rightMargin: UM.Theme.getSize("default_margin").width
+                            checked: base.checkedInstanceIds.indexOf(listview.model[index].getId()) >= 0
+                            onClicked: base.setInstanceChecked(listview.model[index].getId(), checked)
+                        }
                     }
                 }
             }
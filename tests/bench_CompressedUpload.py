@@ -0,0 +1,155 @@
+##  Uploads synthetic G-code through a GCodeSpool to a local stand-in for an instance, uncompressed and with every
+#   content encoding, and reports the size on the wire, the CPU time spent writing the spool and the time until
+#   the upload was answered. The stand-in decompresses what it receives and checks it against the G-code, and
+#   can read at the rate of a slow link.
+#   Run with: python3 bench_CompressedUpload.py [--size MiB] [--link Mbit/s]
+import argparse
+import gzip
+import hashlib
+import http.server
+import random
+import threading
+import time
+import zlib
+
+try:
+    from PyQt6.QtCore import QEventLoop, QUrl
+    from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest
+    QNetworkRequestKnownHeaders = QNetworkRequest.KnownHeaders
+    QNetworkRequestAttributes = QNetworkRequest.Attribute
+except ImportError:
+    from PyQt5.QtCore import QEventLoop, QUrl
+    from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
+    QNetworkRequestKnownHeaders = QNetworkRequest
+    QNetworkRequestAttributes = QNetworkRequest
+
+import harness
+from FabWeaverPlugin.GCodeSpool import GCodeSpool
+
+from typing import List, Optional
+
+ChunkSize = 64 * 1024  # read by the stand-in at a time
+
+
+##  G-code as a slicer writes it: mostly extrusion moves, with travels, layer changes and comments
+def makeGCode(size: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    chunks = []  # type: List[str]
+    written = 0
+    layer = 0
+    extruded = 0.0
+    while written < size:
+        layer += 1
+        lines = [";LAYER:%d\n" % layer, "G0 F9000 Z%.2f\n" % (0.2 * layer), ";TYPE:WALL-OUTER\n"]
+        x, y = rng.uniform(50, 150), rng.uniform(50, 150)
+        for _ in range(2000):
+            if rng.random() < 0.05:
+                x, y = rng.uniform(50, 150), rng.uniform(50, 150)
+                lines.append("G0 F9000 X%.3f Y%.3f\n" % (x, y))
+                continue
+            x += rng.uniform(-2, 2)
+            y += rng.uniform(-2, 2)
+            extruded += rng.uniform(0.01, 0.1)
+            lines.append("G1 F1800 X%.3f Y%.3f E%.5f\n" % (x, y, extruded))
+        chunk = "".join(lines)
+        chunks.append(chunk)
+        written += len(chunk)
+    return chunks
+
+
+##  The stand-in for an instance: accepts one upload per request, and checks it
+class UploadHandler(http.server.BaseHTTPRequestHandler):
+    server_version = "fabWeaverStandIn"
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        encoding = self.headers.get("Content-Encoding")
+        received = bytearray()
+        started = time.monotonic()
+        while len(received) < length:
+            received += self.rfile.read(min(ChunkSize, length - len(received)))
+            link_rate = self.server.link_rate
+            if link_rate:
+                # hold the read back until the link could have carried what was read so far
+                delay = started + len(received) / link_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+        if encoding == "gzip":
+            body = gzip.decompress(bytes(received))
+        elif encoding == "deflate":
+            body = zlib.decompress(bytes(received))
+        else:
+            body = bytes(received)
+        self.server.received_digest = hashlib.sha256(body).hexdigest()
+
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def upload(manager: QNetworkAccessManager, url: str, spool: GCodeSpool) -> Optional[int]:
+    request = QNetworkRequest(QUrl(url))
+    request.setHeader(QNetworkRequestKnownHeaders.ContentTypeHeader, "application/octet-stream")
+    request.setHeader(QNetworkRequestKnownHeaders.ContentLengthHeader, spool.getSize())
+    if spool.getContentEncoding() is not None:
+        request.setRawHeader(b"Content-Encoding", spool.getContentEncoding().encode())
+
+    device = spool.openDevice()
+    reply = manager.post(request, device)
+    loop = QEventLoop()
+    reply.finished.connect(loop.quit)
+    loop.exec()
+    status = reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute)
+    device.close()
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type = float, default = 20, help = "MiB of G-code")
+    parser.add_argument("--link", type = float, default = 20, help = "Mbit/s the stand-in reads at; 0 for no limit")
+    arguments = parser.parse_args()
+
+    harness.getApplication()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), UploadHandler)
+    server.link_rate = arguments.link * 1000 * 1000 / 8
+    server.received_digest = None
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    url = "http://127.0.0.1:%d/api/v1/upload" % server.server_address[1]
+    manager = QNetworkAccessManager()
+
+    chunks = makeGCode(int(arguments.size * 1024 * 1024))
+    print("%.1f MiB of G-code, link %s" % (sum(map(len, chunks)) / 1024 / 1024, "%g Mbit/s" % arguments.link if arguments.link else "unlimited"))
+    print("%-10s %12s %8s %14s %12s %12s" % ("encoding", "wire (MiB)", "ratio", "write CPU (s)", "upload (s)", "total (s)"))
+
+    for content_encoding in [None] + list(GCodeSpool.ContentEncodings):
+        spool = GCodeSpool(content_encoding = content_encoding)
+        started = time.monotonic()
+        cpu_started = time.process_time()
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.finish()
+        write_cpu_time = time.process_time() - cpu_started
+
+        upload_started = time.monotonic()
+        server.received_digest = None
+        status = upload(manager, url, spool)
+        finished = time.monotonic()
+        if status != 201 or server.received_digest != spool.getDigest():
+            raise RuntimeError("The upload with %s encoding was not received intact (status %s)" % (content_encoding, status))
+
+        print("%-10s %12.2f %8.2f %14.2f %12.2f %12.2f" % (
+            content_encoding or "identity", spool.getSize() / 1024 / 1024, spool.getRawSize() / spool.getSize(),
+            write_cpu_time, finished - upload_started, finished - started))
+        spool.remove()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
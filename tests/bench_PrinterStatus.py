@@ -0,0 +1,31 @@
+##  The cost of decoding a /printer reply, per reply: parsing the JSON, and turning it into a PrinterStatus.
+#   Run with: python3 bench_PrinterStatus.py [number of replies]
+import sys
+import timeit
+
+import harness  # noqa: F401 (makes FabWeaverPlugin importable)
+import printer_payloads
+from FabWeaverPlugin.PrinterStatus import decodePrinterStatus
+from FabWeaverPlugin import ReplyDecoder
+from FabWeaverPlugin.ReplyDecoder import decodeJson
+
+
+def main(number: int) -> None:
+    print("%-10s %12s %12s %12s" % ("payload", "json (us)", "decode (us)", "total (us)"))
+    for name, payload in printer_payloads.Payloads.items():
+        data = memoryview(printer_payloads.encode(payload))
+        parse_time = min(timeit.repeat(lambda: decodeJson(data), number = number, repeat = 5)) / number
+        decode_time = min(timeit.repeat(lambda: decodePrinterStatus(payload), number = number, repeat = 5)) / number
+        print("%-10s %12.2f %12.2f %12.2f" % (name, parse_time * 1e6, decode_time * 1e6, (parse_time + decode_time) * 1e6))
+
+    # A reply of which the fields are of the wrong type takes the slow paths of the decoder (the status is kept,
+    # or the warning about it is what's measured)
+    malformed = {key: "?" for key in printer_payloads.Printing}
+    malformed["status"] = "printing"
+    decode_time = min(timeit.repeat(lambda: decodePrinterStatus(malformed), number = number, repeat = 5)) / number
+    print("%-10s %12s %12.2f" % ("malformed", "", decode_time * 1e6))
+    print("JSON parsed with %s" % ("orjson" if ReplyDecoder.orjson is not None else "json"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,65 @@
+##  The cost of turning the body of a reply into objects: the way /printer replies used to be parsed
+#   (json.loads(bytes(reply.readAll()).decode())) against decodeJson on the reply buffer, with json and with
+#   orjson (if it is installed). Includes readAll(), as the device does it once per reply.
+#   Run with: python3 bench_ReplyDecoder.py [number of replies of 1 KiB; larger ones are repeated less]
+try:
+    from PyQt6.QtCore import QByteArray
+except ImportError:
+    from PyQt5.QtCore import QByteArray
+
+import copy
+import json
+import sys
+import timeit
+
+import harness  # noqa: F401 (makes FabWeaverPlugin importable)
+import printer_payloads
+from FabWeaverPlugin import ReplyDecoder
+from FabWeaverPlugin.ReplyDecoder import decodeJson, getReplyBuffer
+
+from typing import Any, Callable, Dict
+
+
+##  Hands out the body the way a finished QNetworkReply does
+class RecordedReply:
+    def __init__(self, data: bytes) -> None:
+        self._data = QByteArray(data)
+
+    def readAll(self) -> QByteArray:
+        return QByteArray(self._data)
+
+
+def _decodeCopying(reply: RecordedReply) -> Any:
+    return json.loads(bytes(reply.readAll()).decode())
+
+
+def _decodeBuffer(reply: RecordedReply) -> Any:
+    return decodeJson(getReplyBuffer(reply))
+
+
+def _time(function: Callable[[RecordedReply], Any], reply: RecordedReply, number: int) -> float:
+    return min(timeit.repeat(lambda: function(reply), number = number, repeat = 5)) / number * 1e6
+
+
+def main(number: int) -> None:
+    payloads = dict(printer_payloads.Payloads)  # type: Dict[str, Any]
+    # A status with the history of many jobs, as some firmware sends it; the size where the copies would show
+    large = copy.deepcopy(printer_payloads.Printing)
+    large["jobs"] = [dict(printer_payloads.Printing, job_name = "job_%04d.gcode" % index) for index in range(200)]
+    payloads["large"] = large
+
+    orjson = ReplyDecoder.orjson
+    print("%-10s %10s %14s %14s %14s" % ("payload", "size (B)", "copying (us)", "json (us)", "orjson (us)"))
+    for name, payload in payloads.items():
+        reply = RecordedReply(printer_payloads.encode(payload))
+        count = max(50, number * 1024 // len(printer_payloads.encode(payload)))  # about the same time per payload
+        copying_time = _time(_decodeCopying, reply, count)
+        ReplyDecoder.orjson = None
+        json_time = _time(_decodeBuffer, reply, count)
+        ReplyDecoder.orjson = orjson
+        orjson_time = _time(_decodeBuffer, reply, count) if orjson is not None else float("nan")
+        print("%-10s %10d %14.2f %14.2f %14.2f" % (name, len(printer_payloads.encode(payload)), copying_time, json_time, orjson_time))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,96 @@
+##  The cost of creating the request of a status poll: built from scratch, as _createEmptyRequest used to do
+#   (a new SSL configuration and encoded headers every time), against a copy of the prototype request with a
+#   cached URL, as it does now.
+#   Run with: python3 bench_RequestPrototype.py [number of polls]
+try:
+    from PyQt6.QtCore import QUrl
+    from PyQt6.QtNetwork import QNetworkRequest, QSslConfiguration, QSslSocket
+    QNetworkRequestAttributes = QNetworkRequest.Attribute
+    QNetworkRequestKnownHeaders = QNetworkRequest.KnownHeaders
+    QNetworkRequestPriorities = QNetworkRequest.Priority
+    QSslSocketPeerVerifyModes = QSslSocket.PeerVerifyMode
+except ImportError:
+    from PyQt5.QtCore import QUrl
+    from PyQt5.QtNetwork import QNetworkRequest, QSslConfiguration, QSslSocket
+    QNetworkRequestAttributes = QNetworkRequest
+    QNetworkRequestKnownHeaders = QNetworkRequest
+    QNetworkRequestPriorities = QNetworkRequest
+    QSslSocketPeerVerifyModes = QSslSocket
+
+import base64
+import sys
+import timeit
+
+import harness
+
+from typing import Dict
+
+ApiUrl = "https://192.168.1.42/api/v1/"
+UserAgent = "fabWeaverPlugin/1.4.0 (Cura 5.7.0; Linux)"
+AuthData = b"Basic " + base64.b64encode(b"operator:secret")
+
+
+##  How _createEmptyRequest built every request before it used a prototype
+def createRequest(target: str) -> QNetworkRequest:
+    request = QNetworkRequest(QUrl(ApiUrl + target))
+    request.setPriority(QNetworkRequestPriorities.HighPriority)
+    try:
+        request.setAttribute(QNetworkRequestAttributes.FollowRedirectsAttribute, True)
+    except AttributeError:
+        pass
+    request.setRawHeader(b"User-Agent", UserAgent.encode())
+    request.setHeader(QNetworkRequestKnownHeaders.ContentTypeHeader, "application/json")
+    ssl_configuration = QSslConfiguration.defaultConfiguration()
+    ssl_configuration.setPeerVerifyMode(QSslSocketPeerVerifyModes.VerifyNone)
+    request.setSslConfiguration(ssl_configuration)
+    request.setRawHeader(b"Authorization", AuthData)
+    return request
+
+
+##  How _createEmptyRequest builds a request now
+class PrototypeFactory:
+    def __init__(self) -> None:
+        request = QNetworkRequest(QUrl(ApiUrl))
+        try:
+            request.setAttribute(QNetworkRequestAttributes.FollowRedirectsAttribute, True)
+        except AttributeError:
+            pass
+        request.setRawHeader(b"User-Agent", UserAgent.encode())
+        ssl_configuration = QSslConfiguration.defaultConfiguration()
+        ssl_configuration.setPeerVerifyMode(QSslSocketPeerVerifyModes.VerifyNone)
+        request.setSslConfiguration(ssl_configuration)
+        request.setRawHeader(b"Authorization", AuthData)
+        self._prototype = request
+        self._urls = {}  # type: Dict[str, QUrl]
+
+    def createRequest(self, target: str) -> QNetworkRequest:
+        request = QNetworkRequest(self._prototype)
+        url = self._urls.get(target)
+        if url is None:
+            url = self._urls[target] = QUrl(ApiUrl + target)
+        request.setUrl(url)
+        request.setPriority(QNetworkRequestPriorities.HighPriority)
+        request.setHeader(QNetworkRequestKnownHeaders.ContentTypeHeader, "application/json")
+        return request
+
+
+def main(number: int) -> None:
+    harness.getApplication()
+    factory = PrototypeFactory()
+    # Both must make the same request
+    old, new = createRequest("printer"), factory.createRequest("printer")
+    assert old.url() == new.url() and sorted(map(bytes, old.rawHeaderList())) == sorted(map(bytes, new.rawHeaderList()))
+    assert old.sslConfiguration().peerVerifyMode() == new.sslConfiguration().peerVerifyMode()
+
+    results = [
+        ("from scratch", min(timeit.repeat(lambda: createRequest("printer"), number = number, repeat = 5))),
+        ("prototype", min(timeit.repeat(lambda: factory.createRequest("printer"), number = number, repeat = 5))),
+    ]
+    print("%d polls" % number)
+    print("%-14s %12s %12s" % ("", "total (ms)", "per poll (us)"))
+    for name, total in results:
+        print("%-14s %12.2f %12.2f" % (name, total * 1000, total / number * 1e6))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,193 @@
+##  Compares pushing the status with StatusStream to polling /printer, against a local stand-in for an instance
+#   whose status changes at random times. Reports the number of requests and how long it took until a change
+#   was seen by the plugin.
+#   Run with: python3 bench_StatusStream.py [--duration s] [--interval ms]
+import argparse
+import http.server
+import json
+import random
+import statistics
+import threading
+import time
+
+try:
+    from PyQt6.QtCore import QEventLoop, QTimer, QUrl
+    from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+except ImportError:
+    from PyQt5.QtCore import QEventLoop, QTimer, QUrl
+    from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+import harness
+import printer_payloads
+from FabWeaverPlugin.PollingScheduler import PollingScheduler
+from FabWeaverPlugin.StatusStream import StatusStream
+
+from typing import Any, Dict, List, Optional
+
+
+##  The status of the stand-in, changed by a thread of its own; every change gets the next sequence number
+class InstanceState:
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.change_times = {0: time.monotonic()}  # type: Dict[int, float]
+        self.requests = {"printer": 0, "printer/events": 0}
+        self.running = True
+
+    def getStatus(self) -> Dict[str, Any]:
+        status = dict(printer_payloads.Printing)
+        status["job_progress"] = self.sequence
+        return status
+
+    def change(self) -> None:
+        with self.condition:
+            self.sequence += 1
+            self.change_times[self.sequence] = time.monotonic()
+            self.condition.notify_all()
+
+    def stop(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+
+class InstanceHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        state = self.server.state  # type: InstanceState
+        if self.path == "/api/v1/printer":
+            state.requests["printer"] += 1
+            with state.condition:
+                body = printer_payloads.encode(state.getStatus())
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/v1/printer/events":
+            state.requests["printer/events"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self._sendEvents(state)
+        else:
+            self.send_error(404)
+
+    def _sendEvents(self, state: InstanceState) -> None:
+        sent_sequence = -1
+        with state.condition:
+            while state.running:
+                if state.sequence != sent_sequence:
+                    sent_sequence = state.sequence
+                    event = b"data: " + printer_payloads.encode(state.getStatus()) + b"\n\n"
+                else:
+                    event = b": keep-alive\n\n"
+                try:
+                    self.wfile.write(event)
+                    self.wfile.flush()
+                except OSError:
+                    return
+                state.condition.wait(timeout = 10)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+##  The part of the device StatusStream needs
+class StreamDevice:
+    def __init__(self, manager: QNetworkAccessManager, base_url: str) -> None:
+        self._manager = manager
+        self._base_url = base_url
+
+    def getId(self) -> str:
+        return "bench"
+
+    def openStream(self, url: str) -> Optional[QNetworkReply]:
+        request = QNetworkRequest(QUrl(self._base_url + url))
+        request.setRawHeader(b"Accept", b"text/event-stream")
+        request.setRawHeader(b"Cache-Control", b"no-cache")
+        return self._manager.get(request)
+
+
+##  Collects when each status change was seen
+class Observer:
+    def __init__(self, state: InstanceState) -> None:
+        self._state = state
+        self.latencies = []  # type: List[float]
+        self._seen = 0
+
+    def onStatus(self, status: Dict[str, Any]) -> None:
+        sequence = status["job_progress"]
+        now = time.monotonic()
+        if sequence > self._seen:
+            # changes in between were not seen at all; they count from the time they were made
+            for missed in range(self._seen + 1, sequence + 1):
+                self.latencies.append((now - self._state.change_times[missed]) * 1000)
+            self._seen = sequence
+
+    def report(self, name: str, requests: int) -> None:
+        latencies = sorted(self.latencies)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        print("%-8s %9d %8d %12.1f %12.1f %12.1f" % (
+            name, requests, len(latencies), statistics.mean(latencies) if latencies else 0.0, p95,
+            latencies[-1] if latencies else 0.0))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type = float, default = 60, help = "s")
+    parser.add_argument("--interval", type = int, default = PollingScheduler.DefaultIntervals["active"], help = "poll interval (ms)")
+    parser.add_argument("--seed", type = int, default = 0)
+    arguments = parser.parse_args()
+
+    harness.getApplication()
+    state = InstanceState()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), InstanceHandler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    base_url = "http://127.0.0.1:%d/api/v1/" % server.server_address[1]
+
+    def changeStatus() -> None:
+        rng = random.Random(arguments.seed)
+        end = time.monotonic() + arguments.duration
+        while time.monotonic() < end:
+            time.sleep(rng.uniform(0.2, 3.0))
+            state.change()
+    changer = threading.Thread(target = changeStatus, daemon = True)
+
+    manager = QNetworkAccessManager()
+    stream_observer = Observer(state)
+    stream = StatusStream(StreamDevice(manager, base_url), stream_observer.onStatus)
+
+    poll_observer = Observer(state)
+    poll_timer = QTimer()
+    poll_timer.setInterval(arguments.interval)
+
+    def poll() -> None:
+        reply = manager.get(QNetworkRequest(QUrl(base_url + "printer")))
+        reply.finished.connect(lambda: poll_observer.onStatus(json.loads(bytes(reply.readAll()).decode())))
+    poll_timer.timeout.connect(poll)
+
+    stream.start()
+    poll_timer.start()
+    changer.start()
+    loop = QEventLoop()
+    QTimer.singleShot(int(arguments.duration * 1000) + 500, loop.quit)
+    loop.exec()
+
+    stream.stop()
+    poll_timer.stop()
+    state.stop()
+    server.shutdown()
+
+    print("%d status changes in %g s, polled every %d ms" % (state.sequence, arguments.duration, arguments.interval))
+    print("%-8s %9s %8s %12s %12s %12s" % ("", "requests", "changes", "mean (ms)", "p95 (ms)", "max (ms)"))
+    poll_observer.report("polling", state.requests["printer"])
+    stream_observer.report("stream", state.requests["printer/events"])
+
+
+if __name__ == "__main__":
+    main()
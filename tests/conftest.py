@@ -0,0 +1 @@
+import harness  # noqa: F401  # sets up the FabWeaverPlugin package
@@ -0,0 +1,34 @@
+##  Makes the plugin importable without Cura, for the tests and benchmarks in this directory.
+#   The plugin is imported as the package FabWeaverPlugin. Uranium and Cura are replaced by the stand-ins in stubs/
+#   when they are not installed; PyQt is needed, as it is for Cura.
+import os
+import sys
+import types
+
+TestsDirectory = os.path.dirname(os.path.abspath(__file__))
+PluginDirectory = os.path.dirname(TestsDirectory)
+
+try:
+    import UM
+    import cura
+except ImportError:
+    sys.path.append(os.path.join(TestsDirectory, "stubs"))
+
+if "FabWeaverPlugin" not in sys.modules:
+    _package = types.ModuleType("FabWeaverPlugin")
+    _package.__path__ = [PluginDirectory]
+    sys.modules["FabWeaverPlugin"] = _package
+
+_application = None
+
+
+##  The Qt application, for tests and benchmarks that need an event loop
+def getApplication():
+    global _application
+    try:
+        from PyQt6.QtCore import QCoreApplication
+    except ImportError:
+        from PyQt5.QtCore import QCoreApplication
+    if _application is None:
+        _application = QCoreApplication.instance() or QCoreApplication([])
+    return _application
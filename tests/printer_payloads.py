@@ -0,0 +1,46 @@
+##  /printer replies as a fabWeaver instance sends them, for the tests and benchmarks
+import copy
+import json
+
+from typing import Any, Dict
+
+
+def _spool(material: str, color: str) -> Dict[str, Any]:
+    return {"material": material, "filament_color": color, "remain_length": 212.5, "serial": "SP-%s-0042" % material}
+
+
+Printing = {
+    "display_name": "fabWeaver 3DWOX",
+    "model": "3DWOX 2X",
+    "version": "2.4.1",
+    "status": "printing",
+    "available": "available",
+    "open_material": False,
+    "job_name": "bracket_v3.gcode",
+    "job_running_time": 5400,
+    "job_left_time": 2340,
+    "job_progress": 56.7,
+    "fdm": {
+        "nozzle": [
+            {"temperature": 214.8, "temperature_target": 215, "spool_connect": 1, "loaded_spoolno": 0},
+            {"temperature": 24.1, "temperature_target": 0, "spool_connect": 1, "loaded_spoolno": 1},
+        ],
+        "spool": [_spool("PLA", "#FFFFFF"), _spool("PETG", "#202020"), None, None],
+        "chamber_temperature": 31.5,
+        "chamber_temperature_target": 0,
+        "bed_temperature": 60.2,
+        "bed_temperature_target": 60,
+    },
+}  # type: Dict[str, Any]
+
+Idle = copy.deepcopy(Printing)
+Idle.update({"status": "ready", "job_name": "", "job_running_time": 0, "job_left_time": 0, "job_progress": 0})
+Idle["fdm"].update({"bed_temperature": 23.9, "bed_temperature_target": 0})
+Idle["fdm"]["nozzle"][0].update({"temperature": 25.2, "temperature_target": 0})
+
+Payloads = {"printing": Printing, "idle": Idle}
+
+
+##  A payload as the bytes of a reply
+def encode(payload: Any) -> bytes:
+    return json.dumps(payload).encode("utf-8")
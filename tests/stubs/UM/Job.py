@@ -0,0 +1,21 @@
+from UM.Signal import Signal
+
+
+##  Runs synchronously when started, and emits finished right after
+class Job:
+    def __init__(self) -> None:
+        self.finished = Signal()
+        self._result = None
+
+    def run(self) -> None:
+        pass
+
+    def start(self) -> None:
+        self.run()
+        self.finished.emit(self)
+
+    def setResult(self, result) -> None:
+        self._result = result
+
+    def getResult(self):
+        return self._result
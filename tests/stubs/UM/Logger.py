@@ -0,0 +1,13 @@
+import logging
+
+_levels = {"d": logging.DEBUG, "i": logging.INFO, "w": logging.WARNING, "e": logging.ERROR, "c": logging.CRITICAL}
+
+
+class Logger:
+    @classmethod
+    def log(cls, log_type: str, message: str, *args) -> None:
+        logging.getLogger("UM").log(_levels.get(log_type, logging.INFO), message % args if args else message)
+
+    @classmethod
+    def logException(cls, log_type: str, message: str, *args) -> None:
+        logging.getLogger("UM").log(_levels.get(log_type, logging.INFO), message % args if args else message, exc_info = True)
@@ -0,0 +1,9 @@
+class MeshWriter:
+    def __init__(self) -> None:
+        self._information = ""
+
+    def getInformation(self) -> str:
+        return self._information
+
+    def setInformation(self, information: str) -> None:
+        self._information = information
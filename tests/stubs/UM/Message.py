@@ -0,0 +1,37 @@
+from UM.Signal import Signal, signalemitter
+
+from typing import List
+
+
+##  Keeps the messages that were shown, so tests can check them
+@signalemitter
+class Message:
+    actionTriggered = Signal()
+
+    shown = []  # type: List[Message]
+
+    def __init__(self, text: str = "", lifetime: int = 30, dismissable: bool = True, progress: float = None,
+                 title: str = None, **kwargs) -> None:
+        self._text = text
+        self._title = title
+        self._progress = progress
+        self.visible = False
+
+    def getText(self) -> str:
+        return self._text
+
+    def setText(self, text: str) -> None:
+        self._text = text
+
+    def addAction(self, action_id: str, name: str, icon: str, description: str, **kwargs) -> None:
+        pass
+
+    def setProgress(self, progress: float) -> None:
+        self._progress = progress
+
+    def show(self) -> None:
+        self.visible = True
+        Message.shown.append(self)
+
+    def hide(self, send_signal: bool = True) -> None:
+        self.visible = False
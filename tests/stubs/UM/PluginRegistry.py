@@ -0,0 +1,17 @@
+from typing import Any, Dict
+
+
+class PluginRegistry:
+    _instance = None
+
+    def __init__(self) -> None:
+        self.plugin_objects = {}  # type: Dict[str, Any]
+
+    @classmethod
+    def getInstance(cls) -> "PluginRegistry":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def getPluginObject(self, plugin_id: str) -> Any:
+        return self.plugin_objects.get(plugin_id)
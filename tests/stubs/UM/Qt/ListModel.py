@@ -0,0 +1,34 @@
+try:
+    from PyQt6.QtCore import QAbstractListModel, QModelIndex
+except ImportError:
+    from PyQt5.QtCore import QAbstractListModel, QModelIndex
+
+from typing import Any, Dict, List
+
+
+class ListModel(QAbstractListModel):
+    def __init__(self, parent = None) -> None:
+        super().__init__(parent)
+        self._items = []  # type: List[Dict[str, Any]]
+        self._role_names = {}  # type: Dict[int, bytes]
+
+    def addRoleName(self, role: int, name: str) -> None:
+        self._role_names[role] = name.encode("utf-8")
+
+    def roleNames(self) -> Dict[int, bytes]:
+        return self._role_names
+
+    def rowCount(self, parent = QModelIndex()) -> int:
+        return len(self._items)
+
+    def data(self, index, role) -> Any:
+        return self._items[index.row()].get(self._role_names.get(role, b"").decode("utf-8"))
+
+    def setItems(self, items: List[Dict[str, Any]]) -> None:
+        self.beginResetModel()
+        self._items = items
+        self.endResetModel()
+
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        return self._items
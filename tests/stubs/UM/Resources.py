@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+
+class Resources:
+    @staticmethod
+    def getCacheStoragePath() -> str:
+        return os.path.join(tempfile.gettempdir(), "fabweaver_tests")
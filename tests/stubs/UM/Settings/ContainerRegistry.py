@@ -0,0 +1,11 @@
+class ContainerRegistry:
+    _instance = None
+
+    @classmethod
+    def getInstance(cls) -> "ContainerRegistry":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def findInstanceContainersMetadata(self, **kwargs):
+        return []
@@ -0,0 +1,29 @@
+##  Calls the connected functions right away, on the thread that emits
+class Signal:
+    def __init__(self, *args, **kwargs) -> None:
+        self._callbacks = []
+
+    def connect(self, callback) -> None:
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback) -> None:
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def emit(self, *args) -> None:
+        for callback in list(self._callbacks):
+            callback(*args)
+
+
+##  Gives every instance signals of its own, as Uranium does
+def signalemitter(cls):
+    original_init = cls.__init__
+
+    def __init__(self, *args, **kwargs):
+        for name in dir(cls):
+            if isinstance(getattr(cls, name, None), Signal):
+                setattr(self, name, Signal())
+        original_init(self, *args, **kwargs)
+
+    cls.__init__ = __init__
+    return cls
@@ -0,0 +1 @@
+##  Stand-ins for the parts of Uranium the plugin uses, for running the tests without Cura
@@ -0,0 +1,9 @@
+class i18nCatalog:
+    def __init__(self, name: str = "") -> None:
+        pass
+
+    def i18nc(self, context: str, text: str, *args) -> str:
+        return text.format(*args) if args else text
+
+    def i18n(self, text: str, *args) -> str:
+        return text.format(*args) if args else text
@@ -0,0 +1,62 @@
+from typing import Any, Dict
+
+
+class _Preferences:
+    def __init__(self) -> None:
+        self._values = {}  # type: Dict[str, Any]
+
+    def addPreference(self, key: str, default: Any) -> None:
+        self._values.setdefault(key, default)
+
+    def getValue(self, key: str) -> Any:
+        return self._values.get(key)
+
+    def setValue(self, key: str, value: Any) -> None:
+        self._values[key] = value
+
+
+class _PrintInformation:
+    def __init__(self) -> None:
+        self.jobName = "part"
+
+
+class _Controller:
+    def __init__(self) -> None:
+        self.active_stage = ""
+
+    def setActiveStage(self, stage: str) -> None:
+        self.active_stage = stage
+
+
+class CuraApplication:
+    _instance = None
+
+    def __init__(self) -> None:
+        self._preferences = _Preferences()
+        self._print_information = _PrintInformation()
+        self._controller = _Controller()
+        self.global_container_stack = None  # type: Any
+
+    @classmethod
+    def getInstance(cls) -> "CuraApplication":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def getPreferences(self) -> _Preferences:
+        return self._preferences
+
+    def getGlobalContainerStack(self) -> Any:
+        return self.global_container_stack
+
+    def getApplicationName(self) -> str:
+        return "cura"
+
+    def getVersion(self) -> str:
+        return "5.7.0"
+
+    def getPrintInformation(self) -> _PrintInformation:
+        return self._print_information
+
+    def getController(self) -> _Controller:
+        return self._controller
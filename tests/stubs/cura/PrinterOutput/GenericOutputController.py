@@ -0,0 +1,6 @@
+class GenericOutputController:
+    def __init__(self, output_device) -> None:
+        self._output_device = output_device
+        self.can_control_manually = True
+        self.can_pre_heat_hotends = True
+        self.can_pre_heat_bed = True
@@ -0,0 +1,7 @@
+class MaterialOutputModel:
+    def __init__(self, guid: str, type: str, color: str, brand: str, name: str, parent = None) -> None:
+        self.guid = guid
+        self.type = type
+        self.color = color
+        self.brand = brand
+        self.name = name
@@ -0,0 +1,27 @@
+from typing import Optional
+
+
+class PrintJobOutputModel:
+    def __init__(self, output_controller, key: str = "", name: str = "", parent = None) -> None:
+        self._output_controller = output_controller
+        self.key = key
+        self.name = name
+        self.state = ""
+        self.timeTotal = 0
+        self.timeElapsed = 0
+        self.assignedPrinter = None  # type: Optional[object]
+
+    def updateName(self, name: str) -> None:
+        self.name = name
+
+    def updateState(self, state: str) -> None:
+        self.state = state
+
+    def updateTimeTotal(self, time_total: int) -> None:
+        self.timeTotal = time_total
+
+    def updateTimeElapsed(self, time_elapsed: int) -> None:
+        self.timeElapsed = time_elapsed
+
+    def updateAssignedPrinter(self, printer) -> None:
+        self.assignedPrinter = printer
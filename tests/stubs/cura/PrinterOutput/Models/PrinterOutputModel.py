@@ -0,0 +1,48 @@
+from typing import List, Optional
+
+
+class ExtruderOutputModel:
+    def __init__(self, printer: "PrinterOutputModel", position: int) -> None:
+        self._printer = printer
+        self.position = position
+        self.hotendTemperature = 0.0
+        self.targetHotendTemperature = 0.0
+        self.activeMaterial = None
+
+    def updateHotendTemperature(self, temperature: float) -> None:
+        self.hotendTemperature = temperature
+
+    def updateTargetHotendTemperature(self, temperature: float) -> None:
+        self.targetHotendTemperature = temperature
+
+    def updateActiveMaterial(self, material) -> None:
+        self.activeMaterial = material
+
+
+class PrinterOutputModel:
+    def __init__(self, output_controller, number_of_extruders: int = 1, parent = None, firmware_version: str = "") -> None:
+        self._controller = output_controller
+        self.name = ""
+        self.state = ""
+        self.bedTemperature = 0.0
+        self.targetBedTemperature = 0.0
+        self.activePrintJob = None  # type: Optional[object]
+        self.extruders = [ExtruderOutputModel(self, position) for position in range(number_of_extruders)]  # type: List[ExtruderOutputModel]
+
+    def updateName(self, name: str) -> None:
+        self.name = name
+
+    def updateState(self, state: str) -> None:
+        self.state = state
+
+    def updateBedTemperature(self, temperature: float) -> None:
+        self.bedTemperature = temperature
+
+    def updateTargetBedTemperature(self, temperature: float) -> None:
+        self.targetBedTemperature = temperature
+
+    def updateActivePrintJob(self, print_job) -> None:
+        self.activePrintJob = print_job
+
+    def stopPreheatTimers(self) -> None:
+        pass
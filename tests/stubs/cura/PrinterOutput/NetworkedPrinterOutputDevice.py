@@ -0,0 +1,55 @@
+try:
+    from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+    QNetworkRequestAttributes = QNetworkRequest.Attribute
+except ImportError:
+    from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+    QNetworkRequestAttributes = QNetworkRequest
+
+from UM.Logger import Logger
+
+from cura.PrinterOutput.PrinterOutputDevice import ConnectionState, ConnectionType, PrinterOutputDevice
+
+from time import time
+from typing import Callable, Dict, Optional
+
+
+##  As in Cura: callbacks are registered per URL and operation, and only called for replies with an HTTP status
+class NetworkedPrinterOutputDevice(PrinterOutputDevice):
+    def __init__(self, device_id: str, address: str, properties: Dict[bytes, bytes],
+                 connection_type: ConnectionType = ConnectionType.NetworkConnection, parent = None) -> None:
+        super().__init__(device_id = device_id, connection_type = connection_type, parent = parent)
+        self._manager = None  # type: Optional[QNetworkAccessManager]
+        self._last_manager_create_time = None  # type: Optional[float]
+        self._last_response_time = None  # type: Optional[float]
+        self._address = address
+        self._properties = properties
+        self._name = properties.get(b"name", device_id.encode("utf-8")).decode("utf-8")
+        self._onFinishedCallbacks = {}  # type: Dict[str, Callable[[QNetworkReply], None]]
+
+    def _validateManager(self) -> None:
+        if self._manager is None:
+            self._createNetworkManager()
+
+    def _createNetworkManager(self) -> None:
+        self._manager = QNetworkAccessManager()
+        self._last_manager_create_time = time()
+
+    def _checkCorrectGroupName(self, device_id: str, group_name: str) -> None:
+        pass
+
+    def _registerOnFinishedCallback(self, reply: QNetworkReply, on_finished: Optional[Callable[[QNetworkReply], None]]) -> None:
+        if on_finished is not None:
+            self._onFinishedCallbacks[reply.url().toString() + str(reply.operation())] = on_finished
+
+    def _handleOnFinished(self, reply: QNetworkReply) -> None:
+        if reply.attribute(QNetworkRequestAttributes.HttpStatusCodeAttribute) is None:
+            return
+        self._last_response_time = time()
+        if self._connection_state == ConnectionState.Connecting:
+            self.setConnectionState(ConnectionState.Connected)
+        callback_key = reply.url().toString() + str(reply.operation())
+        try:
+            if callback_key in self._onFinishedCallbacks:
+                self._onFinishedCallbacks[callback_key](reply)
+        except Exception:
+            Logger.logException("w", "something went wrong with callback")
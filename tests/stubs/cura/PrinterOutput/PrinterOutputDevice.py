@@ -0,0 +1,85 @@
+try:
+    from PyQt6.QtCore import QObject, pyqtSignal
+except ImportError:
+    from PyQt5.QtCore import QObject, pyqtSignal
+
+from UM.Signal import Signal, signalemitter
+
+from enum import IntEnum
+from typing import List, Optional
+
+
+class ConnectionState(IntEnum):
+    Closed = 0
+    Connecting = 1
+    Connected = 2
+    Busy = 3
+    Error = 4
+
+
+class ConnectionType(IntEnum):
+    NotConnected = 0
+    UsbConnection = 1
+    NetworkConnection = 2
+    CloudConnection = 3
+
+
+@signalemitter
+class PrinterOutputDevice(QObject):
+    printersChanged = pyqtSignal()
+    connectionStateChanged = pyqtSignal(str)
+    acceptsCommandsChanged = pyqtSignal()
+
+    writeStarted = Signal()
+
+    def __init__(self, device_id: str, connection_type: ConnectionType = ConnectionType.NotConnected, parent = None) -> None:
+        super().__init__(parent)
+        self._id = device_id
+        self._name = device_id
+        self._printers = []  # type: List[object]
+        self._connection_state = ConnectionState.Closed
+        self._connection_type = connection_type
+        self._connection_text = ""
+        self._accepts_commands = False
+        self._priority = 0
+        self._description = ""
+
+    @property
+    def activePrinter(self) -> Optional[object]:
+        return self._printers[0] if self._printers else None
+
+    @property
+    def acceptsCommands(self) -> bool:
+        return self._accepts_commands
+
+    def _setAcceptsCommands(self, accepts_commands: bool) -> None:
+        self._accepts_commands = accepts_commands
+
+    @property
+    def connectionState(self) -> ConnectionState:
+        return self._connection_state
+
+    def isConnected(self) -> bool:
+        return self._connection_state != ConnectionState.Closed and self._connection_state != ConnectionState.Error
+
+    def setConnectionState(self, connection_state: ConnectionState) -> None:
+        self._connection_state = connection_state
+        self.connectionStateChanged.emit(self._id)
+
+    def setConnectionText(self, connection_text: str) -> None:
+        self._connection_text = connection_text
+
+    def setPriority(self, priority: int) -> None:
+        self._priority = priority
+
+    def setName(self, name: str) -> None:
+        self._name = name
+
+    def setShortDescription(self, description: str) -> None:
+        pass
+
+    def setDescription(self, description: str) -> None:
+        self._description = description
+
+    def setIconName(self, name: str) -> None:
+        pass
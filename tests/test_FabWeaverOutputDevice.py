@@ -0,0 +1,271 @@
+try:
+    from PyQt6.QtCore import QEventLoop, QTimer
+except ImportError:
+    from PyQt5.QtCore import QEventLoop, QTimer
+
+import http.server
+import os
+import threading
+
+import pytest
+
+import harness
+import printer_payloads
+from test_ResumableUpload import ChunkSize, Delivery, FakeInstance, GCode
+from FabWeaverPlugin import ResumableUpload as ResumableUploadModule
+from FabWeaverPlugin.FabWeaverOutputDevice import FabWeaverOutputDevice
+from FabWeaverPlugin.GCodePreflight import GCodeHeader
+from FabWeaverPlugin.GCodeSpool import GCodeSpool
+from FabWeaverPlugin.ResumableUpload import ResumableUpload
+from FabWeaverPlugin.TelemetryHistory import TelemetryHistory
+
+from cura.CuraApplication import CuraApplication
+from UM.Message import Message
+from UM.Resources import Resources
+
+from typing import Any, Callable, Dict, List, Tuple
+
+Preferences = {
+    "fabWeaver/compress_uploads": False,
+    "fabWeaver/resumable_uploads": True,
+    "fabWeaver/skip_duplicate_uploads": True,
+    "fabWeaver/uploaded_gcode": "{}",
+    "fabWeaver/queue_jobs": True,
+    "fabWeaver/pre_upload_queued_jobs": True,
+    "fabWeaver/status_stream": False,
+    "fabWeaver/telemetry_log": False,
+    "fabWeaver/telemetry_history_capacity": 100,
+    "fabWeaver/polling_intervals": "{}",
+}  # type: Dict[str, Any]
+
+
+@pytest.fixture
+def delivery(monkeypatch) -> Delivery:
+    delivery = Delivery()
+    monkeypatch.setattr(ResumableUploadModule.QTimer, "singleShot", lambda delay, callback: delivery.add(callback))
+    monkeypatch.setattr(ResumableUpload, "ChunkSize", ChunkSize)
+    return delivery
+
+
+@pytest.fixture
+def createDevice(monkeypatch, tmp_path) -> Callable[..., FabWeaverOutputDevice]:
+    harness.getApplication()
+    monkeypatch.setattr(Resources, "getCacheStoragePath", staticmethod(lambda: str(tmp_path)))
+    preferences = CuraApplication.getInstance().getPreferences()
+    for key, value in Preferences.items():
+        monkeypatch.setitem(preferences._values, key, value)
+    devices = []  # type: List[FabWeaverOutputDevice]
+
+    def create(port: int = 8080, device_id: str = "fabweaver-test") -> FabWeaverOutputDevice:
+        device = FabWeaverOutputDevice(device_id, "127.0.0.1", port, {b"path": b"/"})
+        device._createPrinterList()  # as the first status does
+        devices.append(device)
+        return device
+    yield create
+    for device in devices:
+        device.close()
+
+
+@pytest.fixture
+def device(createDevice) -> FabWeaverOutputDevice:
+    return createDevice()
+
+
+##  Records the requests that are not uploads
+class RequestLog:
+    def __init__(self) -> None:
+        self.patches = []  # type: List[Tuple[str, Any]]
+
+    def patch(self, url: str, data: Any, on_finished: Any, on_progress: Any = None) -> None:
+        self.patches.append((url, on_finished))
+        return None
+
+
+def _queueJob(device: FabWeaverOutputDevice, gcode: str = GCode) -> Tuple[str, GCodeSpool]:
+    spool = GCodeSpool(directory = device._print_queue.getDirectory())
+    spool.write(gcode)
+    spool.finish()
+    file_name = "part.gcode"
+    device._print_queue.add(file_name, spool.getPath(), spool.getDigest(), spool.getHeader().toDict())
+    return file_name, spool
+
+
+def test_preUploadEndingWith201(device, delivery, monkeypatch):
+    file_name, spool = _queueJob(device)
+    instance = FakeInstance(delivery)  # answers the last chunk with 201
+    monkeypatch.setattr(device, "post", instance.post)
+
+    device._preUploadQueuedJob()
+    delivery.run()
+
+    assert bytes(instance.stored) == GCode.encode()
+    job = device._print_queue.peek()
+    assert job["uploaded"] and not job["upload_failed"]
+    assert device._upload_index.getFileName(spool.getDigest()) == file_name
+
+    # Once the printer is ready, only the print command is left
+    requests = RequestLog()
+    monkeypatch.setattr(device, "patch", requests.patch)
+    device._printer_available = True
+    device._processPrintQueue("idle")
+    assert [url for url, _ in requests.patches] == ["resources/%s?action=print" % file_name]
+    assert len(instance.posts) == -(-len(GCode) // ChunkSize)  # nothing was uploaded again
+
+
+def test_uploadEndingWith201(device, delivery, monkeypatch):
+    file_name, spool = _queueJob(device)
+    instance = FakeInstance(delivery)
+    monkeypatch.setattr(device, "post", instance.post)
+    requests = RequestLog()
+    monkeypatch.setattr(device, "patch", requests.patch)
+
+    device._printer_available = True
+    device._processPrintQueue("idle")
+    delivery.run()
+
+    assert bytes(instance.stored) == GCode.encode()
+    assert [url for url, _ in requests.patches] == ["resources/%s?action=print" % file_name]
+    assert device._upload_index.getFileName(spool.getDigest()) == file_name
+
+
+# A job that extrudes with the second extruder only
+TwoExtruderGCode = (";FLAVOR:Griffin\n;EXTRUDER_TRAIN.0.MATERIAL.VOLUME_USED:0\n;EXTRUDER_TRAIN.1.MATERIAL.VOLUME_USED:1234\n"
+                    ";END_OF_HEADER\n" + GCode)
+
+
+def test_queuedJobKeepsHeader(device):
+    _queueJob(device, TwoExtruderGCode)
+    header = GCodeHeader.fromDict(device._print_queue.peek()["header"])
+    assert header.getUsedExtruders() == [1]
+
+
+def test_preUploadChecksMaterials(device, delivery, monkeypatch):
+    _queueJob(device, TwoExtruderGCode)
+    instance = FakeInstance(delivery)
+    monkeypatch.setattr(device, "post", instance.post)
+    device._loaded_spools = [{"material": "PLA"}]  # the printer has one extruder
+
+    device._preUploadQueuedJob()
+    delivery.run()
+    assert instance.posts == []
+    job = device._print_queue.peek()
+    assert not job["uploaded"] and job["upload_failed"]  # checked again when the printer is ready
+
+
+def test_dispatchChecksMaterials(device, delivery, monkeypatch):
+    file_name, spool = _queueJob(device, TwoExtruderGCode)
+    instance = FakeInstance(delivery)
+    monkeypatch.setattr(device, "post", instance.post)
+    requests = RequestLog()
+    monkeypatch.setattr(device, "patch", requests.patch)
+    device._loaded_spools = [{"material": "PLA"}, None]  # nothing loaded in the extruder the job uses
+
+    device._printer_available = True
+    device._processPrintQueue("idle")
+    delivery.run()
+    assert instance.posts == [] and requests.patches == []
+    assert device._print_queue.isEmpty()
+    assert not os.path.exists(spool.getPath())
+    assert file_name in Message.shown[-1].getText()
+
+    # With the material loaded, the next job is sent
+    _queueJob(device, TwoExtruderGCode)
+    device._loaded_spools = [{"material": "PLA"}, {"material": "PLA"}]
+    device._processPrintQueue("idle")
+    delivery.run()
+    assert bytes(instance.stored) == TwoExtruderGCode.encode()
+
+
+def test_uploadReplacesPreUploadedJob(device, delivery, monkeypatch):
+    file_name, spool = _queueJob(device)
+    instance = FakeInstance(delivery)
+    monkeypatch.setattr(device, "post", instance.post)
+    device._preUploadQueuedJob()
+    delivery.run()
+    assert device._print_queue.peek()["uploaded"]
+
+    # Another job stored under the same name overwrites the one of the queued job
+    device._gcode_spool = None
+    device._gcode_stream.write("G28\n")
+    device._file_name = file_name
+    device._upload_digest = ""
+    device._print_after_upload = False
+    device._uploadGCode()
+    assert not device._print_queue.peek()["uploaded"]
+    assert device._upload_index.getFileName(spool.getDigest()) is None
+
+
+##  Answers every PATCH with the next status of the list
+class PatchHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_PATCH(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.paths.append(self.path)
+        self.send_response(self.server.statuses.pop(0))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> http.server.ThreadingHTTPServer:
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PatchHandler)
+    server.daemon_threads = True
+    server.paths = []  # type: List[str]
+    server.statuses = []  # type: List[int]
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    yield server
+    server.shutdown()
+
+
+def _processEvents(until: Callable[[], bool], timeout: int = 5000) -> None:
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(lambda: loop.quit() if until() else None)
+    timer.start(10)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+    timer.stop()
+
+
+def test_printStoredGCodeOnce(createDevice, server, monkeypatch):
+    device = createDevice(server.server_address[1])
+    finished = []  # type: List[int]
+    monkeypatch.setattr(device, "_onRequestFinished", lambda reply: finished.append(len(server.paths)))
+
+    # An upload that was printed before leaves its callback for the same URL and operation
+    server.statuses = [204, 204]
+    device.patch("resources/part.gcode?action=print", "", on_finished=device._onRequestFinished)
+    _processEvents(lambda: len(finished) == 1)
+    assert finished == [1]
+
+    device._printStoredGCode("part.gcode")
+    _processEvents(lambda: len(finished) > 1)
+    _processEvents(lambda: False, 200)  # a second call would come right after the first
+    assert server.paths == ["/api/v1/resources/part.gcode?action=print"] * 2
+    assert finished == [1, 2]
+
+
+def test_printStoredGCodeUnreachable(createDevice, monkeypatch):
+    device = createDevice(1)  # nothing listens there
+    monkeypatch.setattr(device, "_onRequestFinished", lambda reply: pytest.fail("not a reply of the instance"))
+    shown = len(Message.shown)
+    device._printStoredGCode("part.gcode")
+    _processEvents(lambda: len(Message.shown) > shown)
+    assert "Unable to send data" in Message.shown[-1].getText()
+
+
+def test_telemetryHistoryOnFirstStatus(device, monkeypatch):
+    assert device._telemetry_history is None  # a device that never connects takes no memory for it
+    device._onPrinterStatus(device._printers[0], printer_payloads.Printing)
+    history = device.getTelemetryHistory()
+    assert history.getCapacity() == 100
+    assert history.getLength() == 1
+
+
+def test_telemetryHistoryInvalidCapacity(device, monkeypatch):
+    monkeypatch.setitem(CuraApplication.getInstance().getPreferences()._values, "fabWeaver/telemetry_history_capacity", "many")
+    assert device.getTelemetryHistory().getCapacity() == TelemetryHistory.DefaultCapacity
@@ -0,0 +1,146 @@
+import copy
+
+import pytest
+
+import printer_payloads
+from test_FabWeaverOutputDevice import createDevice  # noqa: F401 (fixture)
+from test_ResumableUpload import GCode
+from FabWeaverPlugin.FabWeaverOutputDevice import FabWeaverOutputDevice
+from FabWeaverPlugin.MultiPrinterDispatch import MultiPrinterDispatch
+from FabWeaverPlugin.PrinterStatus import PrinterStatus
+
+from cura.CuraApplication import CuraApplication
+from UM.Message import Message
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+##  Stands in for the jobs that measure and spool the G-code; the test finishes them
+class FakeWriteJob:
+    def __init__(self, stream: Any, on_finished: Callable[["FakeWriteJob"], None]) -> None:
+        self._stream = stream
+        self._on_finished = on_finished
+
+    def getStream(self) -> Any:
+        return self._stream
+
+    def getResult(self) -> bool:
+        return True
+
+    def cancel(self) -> None:
+        pass
+
+    def finish(self) -> None:
+        self._stream.write(GCode)
+        if hasattr(self._stream, "finish"):
+            self._stream.finish()
+        self._on_finished(self)
+
+
+##  A device of the dispatch, whose fresh status is handed out by the test
+class DispatchedDevice:
+    def __init__(self, device: FabWeaverOutputDevice, monkeypatch) -> None:
+        self.device = device
+        self.status_callbacks = []  # type: List[Callable[[Optional[PrinterStatus]], None]]
+        self.sent = []  # type: List[str]
+        monkeypatch.setattr(device, "requestFreshStatus", self.status_callbacks.append)
+        monkeypatch.setattr(device, "sendSharedGCode", self._sendSharedGCode)
+
+    def answer(self, payload: Optional[Dict[str, Any]]) -> None:
+        if payload is not None:
+            self.device._onPrinterStatus(self.device._printers[0], copy.deepcopy(payload))
+        callback = self.status_callbacks.pop()
+        callback(self.device._last_status if payload is not None else None)
+
+    def _sendSharedGCode(self, spool, file_name, on_finished, on_progress) -> bool:
+        self.sent.append(file_name)
+        on_finished(True, "")
+        return True
+
+
+class DispatchRun:
+    def __init__(self, devices: List[DispatchedDevice], monkeypatch) -> None:
+        self.devices = devices
+        self.jobs = []  # type: List[FakeWriteJob]
+        self.dispatch = MultiPrinterDispatch([device.device for device in devices])
+        monkeypatch.setattr(self.dispatch, "_startJob", self._startJob)
+        monkeypatch.setattr(self.dispatch, "_file_name", "")
+
+    def _startJob(self, stream, on_finished) -> None:
+        self.dispatch._job = FakeWriteJob(stream, on_finished)
+        self.jobs.append(self.dispatch._job)
+
+    def finishJob(self) -> None:
+        self.jobs.pop(0).finish()
+
+
+@pytest.fixture
+def run(createDevice, monkeypatch) -> DispatchRun:
+    devices = [DispatchedDevice(createDevice(device_id = device_id), monkeypatch) for device_id in ["idle", "busy", "offline"]]
+    for device in devices:
+        monkeypatch.setattr(device.device, "isConnected", lambda: True)
+    run = DispatchRun(devices, monkeypatch)
+    run.dispatch.start()
+    return run
+
+
+def _answerStatuses(run: DispatchRun) -> None:
+    idle, busy, offline = run.devices
+    idle.answer(printer_payloads.Idle)
+    busy.answer(printer_payloads.Printing)
+    offline.answer(None)
+
+
+def test_waitsForStatus(run):
+    run.finishJob()  # measured
+    assert [device.sent for device in run.devices] == [[], [], []]
+    _answerStatuses(run)
+    run.finishJob()  # spooled
+    idle, busy, offline = run.devices
+    assert idle.sent == ["part.gcode"]
+    assert busy.sent == [] and offline.sent == []
+    assert run.dispatch.isFinished()
+
+
+def test_queuesOnBusyPrinters(run):
+    _answerStatuses(run)
+    run.finishJob()
+    run.finishJob()
+    idle, busy, offline = run.devices
+    assert idle.sent == ["part.gcode"] and idle.device._print_queue.isEmpty()
+    for device in [busy, offline]:
+        assert device.sent == []
+        job = device.device._print_queue.peek()
+        assert job["file_name"] == "part.gcode"
+        with open(job["spool"]) as spool_file:
+            assert spool_file.read() == GCode
+    assert run.dispatch.isFinished()
+    assert "busy: part.gcode was added to the print queue" in Message.shown[-1].getText()
+
+
+def test_reportsBusyPrinters(run, monkeypatch):
+    monkeypatch.setitem(CuraApplication.getInstance().getPreferences()._values, "fabWeaver/queue_jobs", False)
+    _answerStatuses(run)
+    assert not run.dispatch.isFinished()  # the idle printer is waiting for the G-code
+    run.finishJob()  # the upload streams from the spool, and is done at once here
+    idle, busy, offline = run.devices
+    assert idle.sent == ["part.gcode"]
+    assert busy.sent == [] and busy.device._print_queue.isEmpty()
+    assert offline.sent == [] and offline.device._print_queue.isEmpty()
+    assert run.dispatch.isFinished()
+    text = Message.shown[-1].getText()
+    assert "busy: fabWeaver is busy" in text and "offline: The printer is offline" in text
+
+
+def test_materialsOfFreshStatus(run):
+    idle, busy, offline = run.devices
+    payload = copy.deepcopy(printer_payloads.Idle)
+    payload["fdm"]["spool"] = [None, None, None, None]  # unloaded since the last poll
+    idle.answer(payload)
+    busy.answer(printer_payloads.Printing)
+    offline.answer(None)
+    run.finishJob()
+    run.finishJob()
+    assert idle.sent == []
+    assert busy.device._print_queue.getJobCount() == 1
+    assert "No material is loaded" in Message.shown[-1].getText()
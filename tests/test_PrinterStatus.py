@@ -0,0 +1,155 @@
+import copy
+import math
+import random
+
+import pytest
+
+import printer_payloads
+from FabWeaverPlugin.PrinterStatus import NozzleStatus, OfflineState, PrinterStatus, StatusMap, decodePrinterStatus
+
+States = {printer_state for printer_state, _ in StatusMap.values()} | {OfflineState[0]}
+JobStates = {job_state for _, job_state in StatusMap.values()} | {OfflineState[1]}
+
+
+def test_decodePrinting():
+    status = decodePrinterStatus(printer_payloads.Printing)
+    assert status.printer_name == "fabWeaver 3DWOX"
+    assert status.printer_model == "3DWOX 2X"
+    assert status.version == "2.4.1"
+    assert (status.printer_state, status.job_state) == ("printing", "printing")
+    assert status.job_name == "bracket_v3.gcode"
+    assert status.job_total_time == 5400
+    assert status.job_elapsed_time == 5400 - 2340
+    assert status.available is True
+    assert status.bed_temperature == 60.2
+    assert status.chamber_temperature == 31.5
+    assert status.nozzles[0] == NozzleStatus(214.8, 215, printer_payloads.Printing["fdm"]["spool"][0])
+    assert status.nozzles[1].loaded_spool["material"] == "PETG"
+
+
+def test_elapsedTimeFromProgress():
+    payload = copy.deepcopy(printer_payloads.Printing)
+    del payload["job_left_time"]
+    payload["job_progress"] = 25
+    assert decodePrinterStatus(payload).job_elapsed_time == 5400 * 0.25
+
+
+@pytest.mark.parametrize("key", ["job_name", "job_progress", "job_left_time", "job_running_time", "status", "available",
+                                 "fdm", "display_name", "open_material"])
+def test_missingField(key):
+    # The parser this replaced raised KeyError on a missing job_name or job_progress
+    payload = copy.deepcopy(printer_payloads.Printing)
+    del payload[key]
+    assert isinstance(decodePrinterStatus(payload), PrinterStatus)
+
+
+def test_missingJobFieldsDecodeAsNoJob():
+    payload = copy.deepcopy(printer_payloads.Idle)
+    for key in ["job_name", "job_progress", "job_left_time", "job_running_time"]:
+        del payload[key]
+    status = decodePrinterStatus(payload)
+    assert (status.job_name, status.job_total_time, status.job_elapsed_time) == ("", 0, 0)
+
+
+@pytest.mark.parametrize("status, states", sorted(StatusMap.items()))
+def test_statusMap(status, states):
+    payload = dict(printer_payloads.Idle, status = status)
+    decoded = decodePrinterStatus(payload)
+    assert (decoded.printer_state, decoded.job_state) == states
+
+
+def test_unknownStatusIsOffline():
+    decoded = decodePrinterStatus(dict(printer_payloads.Idle, status = "somethingNew"))
+    assert (decoded.printer_state, decoded.job_state) == OfflineState
+
+
+@pytest.mark.parametrize("payload", [None, [], "printing", 42, 1.5, True, {"fdm": []}, {"fdm": {"nozzle": {}}}])
+def test_notAnObject(payload):
+    decoded = decodePrinterStatus(payload)
+    assert (decoded.printer_state, decoded.job_state) == OfflineState
+
+
+@pytest.mark.parametrize("value", ["215", None, True, float("nan"), float("inf"), [], {}])
+def test_malformedTemperature(value):
+    payload = copy.deepcopy(printer_payloads.Printing)
+    payload["fdm"]["nozzle"][0]["temperature"] = value
+    payload["fdm"]["bed_temperature"] = value
+    status = decodePrinterStatus(payload)
+    assert status.nozzles[0].temperature == -1
+    assert status.bed_temperature == -1
+
+
+@pytest.mark.parametrize("loaded_spoolno", [-1, 4, 99, "0", None, 0.5])
+def test_loadedSpoolOutOfRange(loaded_spoolno):
+    payload = copy.deepcopy(printer_payloads.Printing)
+    payload["fdm"]["nozzle"][1]["loaded_spoolno"] = loaded_spoolno
+    assert decodePrinterStatus(payload).nozzles[1].loaded_spool in [None, payload["fdm"]["spool"][0]]
+
+
+def test_spoolNotConnected():
+    payload = copy.deepcopy(printer_payloads.Printing)
+    payload["fdm"]["nozzle"][0]["spool_connect"] = 0
+    assert decodePrinterStatus(payload).nozzles[0].loaded_spool is None
+
+
+##  Values of any JSON type, nested a few levels deep
+def _randomValue(rng: random.Random, depth: int = 0):
+    kinds = ["null", "bool", "int", "float", "string"] + (["list", "object"] if depth < 3 else [])
+    kind = rng.choice(kinds)
+    if kind == "null":
+        return None
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "int":
+        return rng.choice([0, 1, -1, 4, 2 ** 31, -(2 ** 63), rng.randint(-1000, 1000)])
+    if kind == "float":
+        return rng.choice([0.0, -0.5, 1e308, float("nan"), float("inf"), float("-inf"), rng.uniform(-500, 500)])
+    if kind == "string":
+        return rng.choice(["", "printing", "ready", "available", "é漢", "0", "null"])
+    if kind == "list":
+        return [_randomValue(rng, depth + 1) for _ in range(rng.randint(0, 5))]
+    return {rng.choice(["status", "fdm", "nozzle", "spool", "temperature", "x"]): _randomValue(rng, depth + 1)
+            for _ in range(rng.randint(0, 5))}
+
+
+##  Replace, remove or add a value somewhere in a payload
+def _mutate(rng: random.Random, payload):
+    if isinstance(payload, dict) and payload:
+        key = rng.choice(list(payload.keys()))
+        action = rng.random()
+        if action < 0.3:
+            del payload[key]
+        elif action < 0.6 and isinstance(payload[key], (dict, list)):
+            _mutate(rng, payload[key])
+        else:
+            payload[key] = _randomValue(rng)
+    elif isinstance(payload, list) and payload:
+        index = rng.randrange(len(payload))
+        if isinstance(payload[index], (dict, list)) and rng.random() < 0.5:
+            _mutate(rng, payload[index])
+        else:
+            payload[index] = _randomValue(rng)
+
+
+def _checkStatus(status: PrinterStatus) -> None:
+    assert status.printer_state in States
+    assert status.job_state in JobStates
+    for value in [status.chamber_temperature, status.chamber_temperature_target, status.bed_temperature,
+                  status.bed_temperature_target, status.job_total_time, status.job_elapsed_time]:
+        assert isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    assert isinstance(status.job_name, str)
+    assert status.nozzles is None or all(isinstance(nozzle, NozzleStatus) for nozzle in status.nozzles)
+    for nozzle in status.nozzles or []:
+        assert nozzle.loaded_spool is None or isinstance(nozzle.loaded_spool, dict)
+
+
+def test_fuzz():
+    rng = random.Random(20261018)
+    for iteration in range(20000):
+        if iteration % 4 == 0:
+            payload = _randomValue(rng)
+        else:
+            payload = copy.deepcopy(rng.choice([printer_payloads.Printing, printer_payloads.Idle]))
+            for _ in range(rng.randint(1, 8)):
+                _mutate(rng, payload)
+        _checkStatus(decodePrinterStatus(payload))
@@ -0,0 +1,74 @@
+try:
+    from PyQt6.QtCore import QByteArray
+except ImportError:
+    from PyQt5.QtCore import QByteArray
+
+import pytest
+
+import harness  # noqa: F401 (makes FabWeaverPlugin importable)
+import printer_payloads
+from FabWeaverPlugin import ReplyDecoder
+from FabWeaverPlugin.ReplyDecoder import MaxReplySize, decodeJson, getReplyBuffer, isOversized, readReplyText
+
+from typing import Any, Optional
+
+
+class FakeReply:
+    def __init__(self, data: bytes, content_length: Optional[Any] = None) -> None:
+        self._data = data
+        self._content_length = content_length
+
+    def header(self, header: Any) -> Optional[Any]:
+        return self._content_length
+
+    def readAll(self) -> QByteArray:
+        data, self._data = self._data, b""
+        return QByteArray(data)
+
+    def read(self, max_size: int) -> QByteArray:
+        data, self._data = self._data[:max_size], self._data[max_size:]
+        return QByteArray(data)
+
+
+@pytest.fixture(params = ["json", "orjson"])
+def parser(request, monkeypatch) -> str:
+    if request.param == "json":
+        monkeypatch.setattr(ReplyDecoder, "orjson", None)
+    elif ReplyDecoder.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+@pytest.mark.parametrize("name", sorted(printer_payloads.Payloads))
+def test_decodeReply(parser, name):
+    body = getReplyBuffer(FakeReply(printer_payloads.encode(printer_payloads.Payloads[name])))
+    assert isinstance(body, memoryview)
+    assert decodeJson(body) == printer_payloads.Payloads[name]
+
+
+def test_decodeUnicode(parser):
+    assert decodeJson(memoryview('{"job_name": "Zahnrad é漢.gcode"}'.encode("utf-8"))) == {"job_name": "Zahnrad é漢.gcode"}
+
+
+@pytest.mark.parametrize("data", [b"", b"{", b'{"status": }', b"\xff\xfe{}", b'{"a": "\xc3"}', b"nan"])
+def test_invalidJson(parser, data):
+    with pytest.raises(ValueError):
+        decodeJson(memoryview(data))
+
+
+@pytest.mark.parametrize("content_length, bytes_received, oversized", [
+    (None, 0, False),
+    (None, MaxReplySize, False),
+    (None, MaxReplySize + 1, True),
+    (MaxReplySize, 0, False),
+    (MaxReplySize + 1, 0, True),
+    ("huge", 0, False),  # not a length Qt could parse
+])
+def test_isOversized(content_length, bytes_received, oversized):
+    assert isOversized(FakeReply(b"", content_length), bytes_received) is oversized
+
+
+def test_readReplyText():
+    assert readReplyText(FakeReply(b"Not found")) == "Not found"
+    assert readReplyText(FakeReply(b"x" * 10000)) == "x" * ReplyDecoder.MaxErrorTextSize
+    assert readReplyText(FakeReply(b"bad \xff byte")) == "bad � byte"
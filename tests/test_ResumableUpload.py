@@ -0,0 +1,273 @@
+import json
+import os
+import re
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import harness  # noqa: F401 (makes FabWeaverPlugin importable)
+from FabWeaverPlugin import ResumableUpload as ResumableUploadModule
+from FabWeaverPlugin.GCodeSpool import GCodeSpool
+from FabWeaverPlugin.ResumableUpload import QNetworkReplyNetworkErrors, ResumableUpload
+
+from typing import Any, Callable, Dict, List, Optional
+
+ChunkSize = 1000
+GCode = "".join("G1 X%d Y%d E%.4f\n" % (index % 200, index % 150, index * 0.01) for index in range(1000))
+
+
+##  A reply as the device hands it to ResumableUpload. It finishes when the Delivery it was queued on gets to it.
+class FakeReply:
+    def __init__(self, status: Optional[int], error: Any = QNetworkReplyNetworkErrors.NoError,
+                 headers: Optional[Dict[bytes, bytes]] = None) -> None:
+        self.finished = _Callbacks()
+        self.uploadProgress = _Callbacks()
+        self._status = status
+        self._error = error
+        self._headers = headers or {}
+        self.aborted = False
+
+    def attribute(self, attribute: Any) -> Optional[int]:
+        return self._status
+
+    def error(self) -> Any:
+        return self._error
+
+    def errorString(self) -> str:
+        return "Connection closed" if self._status is None else ""
+
+    def hasRawHeader(self, name: bytes) -> bool:
+        return name in self._headers
+
+    def rawHeader(self, name: bytes) -> bytes:
+        return self._headers[name]
+
+    def abort(self) -> None:
+        self.aborted = True
+
+
+class _Callbacks:
+    def __init__(self) -> None:
+        self._callbacks = []  # type: List[Callable[[], None]]
+
+    def connect(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback: Callable[[], None]) -> None:
+        if callback not in self._callbacks:
+            raise TypeError("not connected")  # as PyQt does
+        self._callbacks.remove(callback)
+
+    def emit(self) -> None:
+        for callback in self._callbacks:
+            callback()
+
+
+##  Stands in for the event loop: replies finish and timers fire in the order they were queued
+class Delivery:
+    def __init__(self) -> None:
+        self._queue = []  # type: List[Callable[[], None]]
+
+    def add(self, callback: Callable[[], None]) -> None:
+        self._queue.append(callback)
+
+    def run(self, limit: int = 1000) -> None:
+        while self._queue:
+            limit -= 1
+            assert limit > 0, "the upload does not come to an end"
+            self._queue.pop(0)()
+
+
+##  A fabWeaver instance that stores chunks sent with a Content-Range, and a connection to it that can drop.
+#   \param drops For each post, in order, whether the connection drops: "before" the chunk was stored, "after" it
+#   was stored but before the reply arrived, or None to answer normally. Posts past the list are answered.
+class FakeInstance:
+    _content_range_regex = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+    def __init__(self, delivery: Delivery, drops: Optional[List[Optional[str]]] = None, stored: bytes = b"",
+                 supports_ranges: bool = True) -> None:
+        self._delivery = delivery
+        self._drops = list(drops or [])
+        self._supports_ranges = supports_ranges
+        self.stored = bytearray(stored)
+        self.posts = []  # type: List[int]  # the offsets of the chunks that were sent
+
+    def post(self, url: str, data: bytes, on_finished: Any, on_progress: Any = None,
+             headers: Optional[Dict[str, str]] = None) -> FakeReply:
+        assert on_finished is None  # a dropped connection has no status, which the device doesn't call back for
+        start, end, total = map(int, self._content_range_regex.match(headers["Content-Range"]).groups())
+        assert int(parse_qs(urlparse(url).query)["offset"][0]) == start
+        assert end - start + 1 == len(data)
+        self.posts.append(start)
+
+        drop = self._drops.pop(0) if self._drops else None
+        if drop == "before":
+            reply = FakeReply(None, QNetworkReplyNetworkErrors.RemoteHostClosedError)
+        else:
+            reply = self._store(start, data, total)
+            if drop == "after":
+                reply = FakeReply(None, QNetworkReplyNetworkErrors.RemoteHostClosedError)
+        self._delivery.add(reply.finished.emit)
+        return reply
+
+    def _store(self, start: int, data: bytes, total: int) -> FakeReply:
+        if not self._supports_ranges:
+            return FakeReply(501)
+        if start > len(self.stored):
+            headers = {b"Range": b"bytes=0-%d" % (len(self.stored) - 1)} if self.stored else {}
+            return FakeReply(416, QNetworkReplyNetworkErrors.ContentNotFoundError, headers)
+        self.stored[start:] = data
+        if len(self.stored) == total:
+            return FakeReply(201)
+        return FakeReply(308, headers = {b"Range": b"bytes=0-%d" % (len(self.stored) - 1)})
+
+
+##  Runs uploads of a spool against a FakeInstance, and records how they ended
+class UploadRun:
+    def __init__(self, instance: FakeInstance, spool: GCodeSpool) -> None:
+        self.instance = instance
+        self.spool = spool
+        self.finished = []  # type: List[int]
+        self.failed = []  # type: List[str]
+        self.unsupported = 0
+        self.upload = ResumableUpload(
+            instance, spool, "resources/part.gcode", {},
+            on_finished = lambda reply: self.finished.append(reply.attribute(None)),
+            on_progress = lambda bytes_sent, bytes_total: None,
+            on_unsupported = self._onUnsupported,
+            on_failed = self.failed.append
+        )
+
+    def _onUnsupported(self) -> None:
+        self.unsupported += 1
+
+
+@pytest.fixture
+def delivery(monkeypatch) -> Delivery:
+    delivery = Delivery()
+    monkeypatch.setattr(ResumableUploadModule.QTimer, "singleShot", lambda delay, callback: delivery.add(callback))
+    monkeypatch.setattr(ResumableUpload, "ChunkSize", ChunkSize)
+    return delivery
+
+
+def _makeSpool(directory: str, owned: bool = True) -> GCodeSpool:
+    spool = GCodeSpool(directory = directory)
+    spool.write(GCode)
+    spool.finish()
+    if owned:
+        return spool
+    return GCodeSpool(path = spool.getPath(), owned = False)  # as a queued job is opened
+
+
+def _checkpointPath(spool: GCodeSpool) -> str:
+    return spool.getPath() + ".json"
+
+
+def test_uploadInChunks(delivery, tmp_path):
+    spool = _makeSpool(str(tmp_path))
+    run = UploadRun(FakeInstance(delivery), spool)
+    run.upload.start()
+    delivery.run()
+
+    assert run.finished == [201]
+    assert bytes(run.instance.stored) == GCode.encode()
+    assert run.instance.posts == list(range(0, len(GCode), ChunkSize))
+    assert not os.path.exists(_checkpointPath(spool))
+
+
+@pytest.mark.parametrize("drops", [
+    [None, "before", None, "before", "before"],
+    [None, "after", None, "after"],
+    ["before", "after", "before", "after"],
+])
+def test_resumeAfterDrops(delivery, tmp_path, drops):
+    spool = _makeSpool(str(tmp_path))
+    run = UploadRun(FakeInstance(delivery, drops), spool)
+    run.upload.start()
+    delivery.run()
+
+    assert run.finished == [201]
+    assert not run.failed
+    assert bytes(run.instance.stored) == GCode.encode()
+    # Only the chunk that was in flight when the connection dropped is sent again
+    chunk_count = -(-len(GCode) // ChunkSize)
+    assert len(run.instance.posts) == chunk_count + sum(drop is not None for drop in drops)
+    for offset in range(0, len(GCode), ChunkSize):
+        assert run.instance.posts.count(offset) == 1 + _dropsAt(run.instance.posts, drops, offset)
+
+
+def _dropsAt(posts: List[int], drops: List[Optional[str]], offset: int) -> int:
+    return sum(1 for index, drop in enumerate(drops) if drop is not None and posts[index] == offset)
+
+
+def test_giveUpAfterMaxAttempts(delivery, tmp_path):
+    spool = _makeSpool(str(tmp_path))
+    run = UploadRun(FakeInstance(delivery, [None, None] + ["before"] * 100), spool)
+    run.upload.start()
+    delivery.run()
+
+    assert run.failed == ["Connection closed"]
+    assert not run.finished
+    assert len(run.instance.posts) == 2 + ResumableUpload.MaxAttempts + 1
+    assert not os.path.exists(_checkpointPath(spool))  # the spool is removed with the job anyway
+
+
+def test_resumeQueuedSpoolFromCheckpoint(delivery, tmp_path):
+    spool = _makeSpool(str(tmp_path), owned = False)
+    instance = FakeInstance(delivery, [None, None, None] + ["before"] * (ResumableUpload.MaxAttempts + 1))
+    run = UploadRun(instance, spool)
+    run.upload.start()
+    delivery.run()
+    assert run.failed
+
+    with open(_checkpointPath(spool)) as checkpoint_file:
+        assert json.load(checkpoint_file)["offset"] == 3 * ChunkSize
+
+    # The next upload of the queued job starts where the instance has the data up to
+    run = UploadRun(FakeInstance(delivery, stored = bytes(instance.stored)), spool)
+    run.upload.start()
+    delivery.run()
+    assert run.finished == [201]
+    assert run.instance.posts[0] == 3 * ChunkSize
+    assert bytes(run.instance.stored) == GCode.encode()
+
+
+def test_ignoreCheckpointOfOtherUpload(delivery, tmp_path):
+    spool = _makeSpool(str(tmp_path), owned = False)
+    with open(_checkpointPath(spool), "w") as checkpoint_file:
+        json.dump({"resource": "resources/other.gcode", "spool": spool.getPath(), "content_encoding": None,
+                   "size": spool.getSize(), "offset": 2 * ChunkSize}, checkpoint_file)
+
+    run = UploadRun(FakeInstance(delivery), spool)
+    run.upload.start()
+    delivery.run()
+    assert run.instance.posts[0] == 0
+    assert run.finished == [201]
+
+
+@pytest.mark.parametrize("stored_size", [0, ChunkSize])
+def test_recoverFrom416(delivery, tmp_path, stored_size):
+    spool = _makeSpool(str(tmp_path), owned = False)
+    with open(_checkpointPath(spool), "w") as checkpoint_file:
+        json.dump({"resource": "resources/part.gcode", "spool": spool.getPath(), "content_encoding": None,
+                   "size": spool.getSize(), "offset": 4 * ChunkSize}, checkpoint_file)
+
+    # The instance lost (some of) the data since the checkpoint was written, and tells how much it has left
+    run = UploadRun(FakeInstance(delivery, stored = GCode.encode()[:stored_size]), spool)
+    run.upload.start()
+    delivery.run()
+
+    assert run.instance.posts[:2] == [4 * ChunkSize, stored_size]
+    assert run.finished == [201]
+    assert bytes(run.instance.stored) == GCode.encode()
+
+
+def test_rangesUnsupported(delivery, tmp_path):
+    spool = _makeSpool(str(tmp_path))
+    run = UploadRun(FakeInstance(delivery, supports_ranges = False), spool)
+    run.upload.start()
+    delivery.run()
+
+    assert run.unsupported == 1
+    assert not run.finished and not run.failed
+    assert run.instance.posts == [0]
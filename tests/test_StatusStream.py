@@ -0,0 +1,269 @@
+try:
+    from PyQt6.QtCore import QEventLoop, QTimer
+except ImportError:
+    from PyQt5.QtCore import QEventLoop, QTimer
+
+import pytest
+
+import harness
+from FabWeaverPlugin.StatusStream import StatusStream
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Callbacks:
+    def __init__(self) -> None:
+        self._callbacks = []  # type: List[Callable[[], None]]
+
+    def connect(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback: Callable[[], None]) -> None:
+        self._callbacks.remove(callback)
+
+    def emit(self) -> None:
+        for callback in list(self._callbacks):
+            callback()
+
+
+##  The reply of a stream request; the test pushes the data the instance sends
+class FakeStreamReply:
+    def __init__(self, content_type: Optional[str] = "text/event-stream") -> None:
+        self.readyRead = _Callbacks()
+        self.finished = _Callbacks()
+        self.aborted = False
+        self._content_type = content_type
+        self._status = None  # type: Optional[int]
+        self._data = b""
+
+    def header(self, header: Any) -> Optional[str]:
+        return self._content_type
+
+    def attribute(self, attribute: Any) -> Optional[int]:
+        return self._status
+
+    def readAll(self) -> bytes:
+        data, self._data = self._data, b""
+        return data
+
+    def abort(self) -> None:
+        self.aborted = True
+
+    def send(self, data: bytes) -> None:
+        self._status = 200
+        self._data += data
+        self.readyRead.emit()
+
+    def finish(self, status: Optional[int] = 200, data: bytes = b"") -> None:
+        self._status = status
+        self._data += data
+        if data:
+            self.readyRead.emit()
+        self.finished.emit()
+
+
+class FakeDevice:
+    def __init__(self, content_type: Optional[str] = "text/event-stream") -> None:
+        self._content_type = content_type
+        self.replies = []  # type: List[FakeStreamReply]
+
+    def getId(self) -> str:
+        return "fake"
+
+    def openStream(self, url: str) -> FakeStreamReply:
+        assert url == StatusStream.EndPoint
+        reply = FakeStreamReply(self._content_type)
+        self.replies.append(reply)
+        return reply
+
+
+class StreamRun:
+    def __init__(self, content_type: Optional[str] = "text/event-stream") -> None:
+        self.device = FakeDevice(content_type)
+        self.statuses = []  # type: List[Dict[str, Any]]
+        self.stream = StatusStream(self.device, self.statuses.append)
+
+    @property
+    def reply(self) -> FakeStreamReply:
+        return self.device.replies[-1]
+
+    def isRetrying(self) -> bool:
+        return self.stream._retry_timer.isActive()
+
+
+def _processEvents(duration: int) -> None:
+    loop = QEventLoop()
+    QTimer.singleShot(duration, loop.quit)
+    loop.exec()
+
+
+@pytest.fixture
+def run() -> StreamRun:
+    harness.getApplication()
+    run = StreamRun()
+    run.stream.start()
+    yield run
+    run.stream.stop()
+
+
+def test_statusEvents(run):
+    assert not run.stream.isLive()
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    assert run.statuses == [{"status": "ready"}]
+    assert run.stream.isLive()
+
+    run.reply.send(b'event: status\r\ndata: {"status": "printing",\r\ndata: "job_name": "a.gcode"}\r\n\r\n')
+    assert run.statuses[-1] == {"status": "printing", "job_name": "a.gcode"}
+
+
+def test_eventSplitOverReads(run):
+    run.reply.send(b'data: {"status": ')
+    run.reply.send(b'"ready"}\n')
+    assert run.statuses == []
+    run.reply.send(b'\ndata: {"status": "printing"}\n\ndata: {"st')
+    assert run.statuses == [{"status": "ready"}, {"status": "printing"}]
+
+
+def test_deltas(run):
+    run.reply.send(b'data: {"status": "printing", "fdm": {"bed_temperature": 20, "bed_temperature_target": 60}}\n\n')
+    run.reply.send(b'event: delta\ndata: {"fdm": {"bed_temperature": 45.5}, "job_progress": 3}\n\n')
+    assert run.statuses[-1] == {"status": "printing", "job_progress": 3,
+                                "fdm": {"bed_temperature": 45.5, "bed_temperature_target": 60}}
+    # The status handed out before is a snapshot, not changed by the delta
+    assert run.statuses[0]["fdm"]["bed_temperature"] == 20
+
+
+def test_keepAliveAndInvalidEvents(run):
+    run.reply.send(b": keep-alive\n\n")
+    assert run.stream.isLive()
+    assert run.statuses == []
+
+    run.reply.send(b"data: {not json\n\ndata: [1, 2]\n\n")
+    assert run.statuses == []
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    assert run.statuses == [{"status": "ready"}]
+
+
+def test_staleStream(run, monkeypatch):
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    assert run.stream.isLive()
+    monkeypatch.setattr(StatusStream, "StaleTimeout", -1)
+    assert not run.stream.isLive()
+
+
+def test_oversizedEvent(run, monkeypatch):
+    monkeypatch.setattr(StatusStream, "MaxBufferSize", 1024)
+    run.reply.send(b"data: " + b"x" * 2048)
+    assert run.reply.aborted
+    assert not run.stream.isLive()
+    assert run.isRetrying()
+
+
+@pytest.mark.parametrize("status", [404, 405, 406, 501])
+def test_unsupported(run, status):
+    run.reply.finish(status)
+    assert run.stream._supported is False
+    assert not run.isRetrying()  # the device keeps polling; the stream is not tried again
+
+
+def test_unsupportedPlainReply():
+    harness.getApplication()
+    run = StreamRun(content_type = "application/json")
+    run.stream.start()
+    run.reply.finish(200, b'{"status": "ready"}')
+    assert run.statuses == []
+    assert run.stream._supported is False
+    assert not run.isRetrying()
+
+
+def test_askAgainOnStart(run):
+    run.reply.finish(404)
+    assert run.stream._supported is False
+    run.stream.stop()
+
+    # The instance may have been updated while the device was disconnected
+    run.stream.start()
+    assert len(run.device.replies) == 2
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    assert run.stream._supported is True
+    assert run.stream.isLive()
+
+
+def test_reconnectAfterDrop(run):
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    run.reply.finish(None)  # the connection dropped
+    assert not run.stream.isLive()
+    assert run.isRetrying()
+
+    run.stream._retry_timer.stop()
+    run.stream._open()  # what the retry timer does
+    assert len(run.device.replies) == 2
+    run.reply.send(b'event: delta\ndata: {"job_progress": 3}\n\n')
+    assert run.statuses[-1] == {"job_progress": 3}  # a delta on a new stream doesn't apply to the old status
+
+
+def test_reconnectAfterStall(run):
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    stalled = run.reply
+    assert run.stream._stale_timer.isActive()
+    assert run.stream._stale_timer.interval() == StatusStream.StaleTimeout * 1000
+
+    # Nothing arrives anymore: the connection is gone without the reply finishing
+    run.stream._onStalled()  # what the stale timer does
+    assert stalled.aborted
+    assert not run.stream.isLive()
+    assert run.isRetrying()
+
+    run.stream._retry_timer.stop()
+    run.stream._open()  # what the retry timer does
+    assert len(run.device.replies) == 2
+    assert run.stream._stale_timer.isActive()
+    run.reply.send(b'data: {"status": "printing"}\n\n')
+    assert run.stream.isLive()
+    assert run.statuses[-1] == {"status": "printing"}
+    stalled.send(b'data: {"status": "idle"}\n\n')  # the stalled reply is not listened to anymore
+    assert run.statuses[-1] == {"status": "printing"}
+
+
+def test_staleTimer(monkeypatch):
+    harness.getApplication()
+    monkeypatch.setattr(StatusStream, "StaleTimeout", 0.2)
+    run = StreamRun()
+    run.stream.start()
+    run.reply.send(b'data: {"status": "ready"}\n\n')
+    _processEvents(100)
+    run.reply.send(b": keep-alive\n\n")  # every event restarts the timer
+    assert run.stream._stale_timer.remainingTime() > 150
+    _processEvents(400)
+    assert run.device.replies[0].aborted
+    run.stream.stop()
+
+
+def test_retryBackoff(monkeypatch):
+    harness.getApplication()
+    monkeypatch.setattr(StatusStream, "MaxRetryDelay", 100000)
+    run = StreamRun()
+    run.stream.start()
+    delays = []
+    for _ in range(4):
+        run.stream._onStalled()  # a stream that never delivers
+        delays.append(run.stream._retry_timer.interval())
+        run.stream._retry_timer.stop()
+        run.stream._open()
+    assert delays == [min(100000, StatusStream.RetryDelay * 2 ** failures) for failures in range(4)]
+    assert delays[-1] == 100000
+
+    # A stream that delivered starts the backoff over
+    run.reply.send(b": keep-alive\n\n")
+    run.reply.finish(None)
+    assert run.stream._retry_timer.interval() == StatusStream.RetryDelay
+    run.stream.stop()
+
+
+def test_stop(run):
+    reply = run.reply
+    run.stream.stop()
+    assert reply.aborted
+    assert not run.isRetrying()
+    reply.send(b'data: {"status": "ready"}\n\n')
+    assert run.statuses == []
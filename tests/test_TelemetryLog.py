@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+import harness  # noqa: F401 (makes FabWeaverPlugin importable)
+import printer_payloads
+from FabWeaverPlugin.PrinterStatus import decodePrinterStatus
+from FabWeaverPlugin.TelemetryLog import TelemetryFlushJob, TelemetryLog
+
+from typing import List
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch) -> TelemetryLog:
+    monkeypatch.setattr(TelemetryLog, "BatchSize", 2)
+    return TelemetryLog("fabweaver-test", directory = str(tmp_path))
+
+
+##  Flush jobs that run on threads of their own, when the test starts them
+@pytest.fixture
+def jobs(monkeypatch) -> List[threading.Thread]:
+    jobs = []  # type: List[threading.Thread]
+    monkeypatch.setattr(TelemetryFlushJob, "start", lambda job: jobs.append(threading.Thread(target = job.run)))
+    return jobs
+
+
+def _append(log: TelemetryLog, *timestamps: float) -> None:
+    status = decodePrinterStatus(printer_payloads.Printing)
+    for timestamp in timestamps:
+        log.append(timestamp, status)
+
+
+def _times(log: TelemetryLog) -> List[float]:
+    return [record["time"] for record in log.iterRecords()]
+
+
+def test_record(log):
+    _append(log, 1)
+    log.close()
+    record = next(log.iterRecords())
+    assert record["printer_state"] == "printing"
+    assert record["bed"] == pytest.approx(60.2)
+    assert record["nozzle1_target"] == 0
+    assert record["nozzle2"] != record["nozzle2"]  # NaN, the printer has two nozzles
+
+
+def test_closeBeforeFlushJobRuns(log, jobs):
+    _append(log, 1, 2)  # a batch for the flush job
+    _append(log, 3)
+    log.close()
+    assert _times(log) == [1, 2, 3]
+    jobs[0].start()
+    jobs[0].join()
+    assert _times(log) == [1, 2, 3]  # the job found its batch written already
+
+
+def test_closeWhileFlushJobWrites(log, jobs, monkeypatch):
+    writing = threading.Event()
+    proceed = threading.Event()
+    write = TelemetryLog._write
+
+    def slowWrite(self, data: bytes) -> None:
+        writing.set()
+        proceed.wait(5)
+        write(self, data)
+    monkeypatch.setattr(TelemetryLog, "_write", slowWrite)
+
+    _append(log, 1, 2)
+    _append(log, 3)
+    jobs[0].start()
+    assert writing.wait(5)
+    closing = threading.Thread(target = log.close)
+    closing.start()
+    closing.join(0.1)
+    assert closing.is_alive()  # waits for the job
+    proceed.set()
+    jobs[0].join()
+    closing.join()
+    assert _times(log) == [1, 2, 3]